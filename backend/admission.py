@@ -0,0 +1,159 @@
+"""Controlo de admissão por concorrência (middleware ASGI).
+
+Cada pedido pertence a uma classe de rota (por método + expressão regular do
+caminho) com um limite de pedidos em simultâneo e uma fila curta. Há também um
+limite global partilhado; quando uma vaga abre, é entregue ao pedido em espera
+da classe com maior prioridade (número mais baixo) que ainda esteja abaixo do
+seu próprio limite. Com a fila cheia, ou esgotado o tempo de espera, a resposta
+é um 503 imediato com ``Retry-After`` em vez de latência sem limite.
+"""
+import asyncio
+import itertools
+import json
+import re
+
+
+class RouteClass:
+    __slots__ = ("name", "priority", "limit", "queue_size", "timeout", "patterns")
+
+    def __init__(self, name: str, priority: int, limit: int, queue_size: int, timeout: float, patterns=()):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        # (métodos ou None, regex do caminho)
+        self.patterns = [(methods, re.compile(path)) for methods, path in patterns]
+
+    def matches(self, method: str, path: str) -> bool:
+        return any((methods is None or method in methods) and regex.match(path) for methods, regex in self.patterns)
+
+
+class _Waiter:
+    __slots__ = ("route_class", "seq", "future")
+
+    def __init__(self, route_class: RouteClass, seq: int, future):
+        self.route_class = route_class
+        self.seq = seq
+        self.future = future
+
+
+class AdmissionController:
+    """Contagem de pedidos ativos e filas por classe; só usado a partir do event loop"""
+
+    def __init__(self, classes, default: RouteClass, total_limit: int):
+        self.classes = list(classes)
+        self.default = default
+        self.total_limit = total_limit
+        self.total_active = 0
+        self.active = {c.name: 0 for c in self.classes + [default]}
+        self.queued = dict.fromkeys(self.active, 0)
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def classify(self, method: str, path: str) -> RouteClass:
+        for route_class in self.classes:
+            if route_class.matches(method, path):
+                return route_class
+        return self.default
+
+    def _can_run(self, route_class: RouteClass) -> bool:
+        return self.total_active < self.total_limit and self.active[route_class.name] < route_class.limit
+
+    def _grant(self, route_class: RouteClass):
+        self.total_active += 1
+        self.active[route_class.name] += 1
+
+    def _has_priority_waiter(self, route_class: RouteClass) -> bool:
+        # Só contam os que esperam pelo limite global (os outros esperam pelo limite da própria classe)
+        return any(
+            w.route_class.priority <= route_class.priority
+            and self.active[w.route_class.name] < w.route_class.limit
+            for w in self._waiters
+        )
+
+    async def acquire(self, route_class: RouteClass) -> bool:
+        """True quando o pedido pode avançar; False se deve ser rejeitado (fila cheia ou espera esgotada)"""
+        # Não ultrapassa pedidos à espera com prioridade igual ou superior
+        if self._can_run(route_class) and not self._has_priority_waiter(route_class):
+            self._grant(route_class)
+            return True
+        if self.queued[route_class.name] >= route_class.queue_size:
+            return False
+
+        waiter = _Waiter(route_class, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self.queued[route_class.name] += 1
+        try:
+            await asyncio.wait([waiter.future], timeout=route_class.timeout)
+        except BaseException:
+            # Pedido cancelado (cliente desligou) depois de já ter recebido a vaga: devolvê-la
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(route_class)
+            raise
+        finally:
+            self.queued[route_class.name] -= 1
+            if not waiter.future.done():
+                self._waiters.remove(waiter)
+                waiter.future.cancel()
+        return not waiter.future.cancelled()
+
+    def release(self, route_class: RouteClass):
+        self.total_active -= 1
+        self.active[route_class.name] -= 1
+        self._wake()
+
+    def _wake(self):
+        if not self._waiters:
+            return
+        self._waiters.sort(key=lambda w: (w.route_class.priority, w.seq))
+        remaining = []
+        for waiter in self._waiters:
+            if self._can_run(waiter.route_class):
+                self._grant(waiter.route_class)
+                waiter.future.set_result(True)
+            else:
+                remaining.append(waiter)
+        self._waiters = remaining
+
+    def snapshot(self) -> dict:
+        return {
+            "total_active": self.total_active,
+            "total_limit": self.total_limit,
+            "active": dict(self.active),
+            "queued": dict(self.queued),
+        }
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, controller: AdmissionController, exempt_paths=(), retry_after: int = 1, metrics=None):
+        self.app = app
+        self.controller = controller
+        self.exempt_paths = tuple(exempt_paths)
+        self.retry_after = str(retry_after)
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.controller.classify(scope["method"], scope["path"])
+        if not await self.controller.acquire(route_class):
+            if self.metrics is not None:
+                self.metrics.inc("admission_rejected_total", route_class=route_class.name)
+            await self._reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Servidor sobrecarregado. Tente novamente dentro de instantes."}).encode()
+        await send({"type": "http.response.start", "status": 503, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", self.retry_after.encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
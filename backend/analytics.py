@@ -0,0 +1,136 @@
+"""Formatação dos resultados das sondagens.
+
+Funções puras (sem acesso à base de dados nem HTTP) usadas pelos endpoints
+de analytics, resultados públicos e "as minhas respostas". A contagem é feita
+uma única vez por ``tally.SurveyTally``; aqui apenas se formata o resultado.
+"""
+from tally import SurveyTally
+
+
+def _percentage(count: int, total: int) -> float:
+    return round(count / total * 100, 1) if total > 0 else 0
+
+
+def _option_counts(question: dict, counts: dict) -> dict:
+    return {
+        opt["id"]: {"text": opt["text"], "count": counts.get(opt["id"], 0)}
+        for opt in question.get("options") or []
+    }
+
+
+def survey_analytics(survey: dict, responses: list) -> dict:
+    """Analytics completas para o dono da sondagem / admins (inclui respostas de texto)"""
+    tally = SurveyTally.from_responses(survey, responses, keep_values=True)
+    analytics = {
+        "total_responses": tally.total_responses,
+        "questions": {}
+    }
+
+    for q_id, q_tally in tally.questions.items():
+        q_type = q_tally.question["type"]
+        q_analytics = {"type": q_type, "responses": q_tally.values}
+
+        if q_type == "multiple_choice":
+            q_analytics["option_breakdown"] = _option_counts(q_tally.question, q_tally.counts)
+        elif q_type == "rating":
+            q_analytics["average"] = q_tally.average
+            q_analytics["distribution"] = {str(i): q_tally.counts.get(i, 0) for i in range(1, 6)}
+            q_analytics["stats"] = q_tally.stats.summary(
+                q_tally.question.get("min_rating") or 1, q_tally.question.get("max_rating") or 5
+            )
+
+        analytics["questions"][q_id] = q_analytics
+
+    return analytics
+
+
+def public_results(survey: dict, responses: list, is_admin: bool) -> dict:
+    """Resultados públicos (percentagens; contagens absolutas apenas para admins, sem texto)"""
+    return format_public_results(SurveyTally.from_responses(survey, responses), is_admin)
+
+
+def format_public_results(tally: SurveyTally, is_admin: bool) -> dict:
+    analytics = {
+        "total_responses": tally.total_responses,
+        "questions": {}
+    }
+
+    for q_id, q_tally in tally.questions.items():
+        question = q_tally.question
+        q_type = question["type"]
+        total_answers = q_tally.total
+        q_analytics = {"type": q_type, "total_answers": total_answers}
+
+        if q_type in ("multiple_choice", "checkbox"):
+            option_counts = _option_counts(question, q_tally.counts)
+            # Convert counts to percentages for non-admin users
+            if is_admin:
+                q_analytics["option_breakdown"] = option_counts
+            else:
+                q_analytics["option_breakdown"] = {
+                    opt_id: {"text": opt_data["text"], "percentage": _percentage(opt_data["count"], total_answers)}
+                    for opt_id, opt_data in option_counts.items()
+                }
+
+        elif q_type == "yes_no":
+            yes_count = q_tally.counts.get("Sim", 0)
+            no_count = q_tally.counts.get("Não", 0)
+            if is_admin:
+                q_analytics["yes_count"] = yes_count
+                q_analytics["no_count"] = no_count
+            q_analytics["yes_percentage"] = _percentage(yes_count, total_answers)
+            q_analytics["no_percentage"] = _percentage(no_count, total_answers)
+
+        elif q_type == "rating":
+            votes = q_tally.votes
+            q_analytics["average"] = round(q_tally.average, 1) if votes else 0
+            max_rating = question.get("max_rating", 5)
+            min_rating = question.get("min_rating", 1)
+
+            if is_admin:
+                q_analytics["distribution"] = {
+                    str(i): q_tally.counts.get(i, 0) for i in range(min_rating, max_rating + 1)
+                }
+            else:
+                # Show distribution as percentages
+                q_analytics["distribution"] = {
+                    str(i): _percentage(q_tally.counts.get(i, 0), votes) for i in range(min_rating, max_rating + 1)
+                }
+            q_analytics["stats"] = q_tally.stats.summary(min_rating, max_rating)
+
+        elif q_type == "text":
+            # Don't expose text responses, just count
+            q_analytics["response_count"] = total_answers
+
+        analytics["questions"][q_id] = q_analytics
+
+    return analytics
+
+
+def global_results(survey: dict, responses: list) -> dict:
+    """Resultados globais em % mostrados junto de cada resposta do utilizador"""
+    return format_global_results(SurveyTally.from_responses(survey, responses))
+
+
+def format_global_results(tally: SurveyTally) -> dict:
+    total_responses = tally.total_responses
+    results = {}
+    for q_id, q_tally in tally.questions.items():
+        q_type = q_tally.question["type"]
+
+        if q_type in ("multiple_choice", "yes_no"):
+            results[q_id] = {
+                "type": q_type,
+                "percentages": {
+                    value: _percentage(count, total_responses) for value, count in q_tally.counts.items()
+                }
+            }
+
+        elif q_type == "rating":
+            results[q_id] = {
+                "type": q_type,
+                "average": round(q_tally.average, 1),
+                "total_votes": q_tally.votes
+            }
+
+    return results
@@ -0,0 +1,73 @@
+"""Arquivo compacto das respostas de sondagens encerradas.
+
+As respostas de uma sondagem arquivada saem da coleção ``responses`` e passam a
+viver em documentos ``response_archives`` com até N respostas cada: a lista é
+serializada em JSON e comprimida com zlib, e os ``user_ids`` ficam visíveis
+(indexados) para encontrar a resposta de um utilizador sem descomprimir tudo.
+"""
+import json
+import zlib
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+CODEC = "zlib+json"
+
+
+def pack(responses: list, level: int = 6) -> bytes:
+    return zlib.compress(json.dumps(responses, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), level)
+
+
+def unpack(data: bytes) -> list:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def bucket_doc(survey_id: str, index: int, responses: list) -> dict:
+    """Documento de arquivo para um lote de respostas (ordenadas por submitted_at)"""
+    return {
+        "survey_id": survey_id,
+        "bucket": index,
+        "count": len(responses),
+        "user_ids": sorted({r["user_id"] for r in responses if r.get("user_id")}),
+        "first_submitted_at": responses[0].get("submitted_at"),
+        "last_submitted_at": responses[-1].get("submitted_at"),
+        "codec": CODEC,
+        "data": pack(responses),
+    }
+
+
+def survey_closes_at(end_date: Optional[str]) -> Optional[datetime]:
+    """Momento em que a sondagem fecha (UTC).
+
+    O frontend guarda só a data ("YYYY-MM-DD") e diz "após esta data": a sondagem
+    aceita respostas durante todo esse dia e fecha à meia-noite seguinte.
+    """
+    if not end_date:
+        return None
+    try:
+        if len(end_date) == 10:
+            return datetime.fromisoformat(end_date).replace(tzinfo=timezone.utc) + timedelta(days=1)
+        closes_at = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return closes_at if closes_at.tzinfo else closes_at.replace(tzinfo=timezone.utc)
+
+
+def survey_is_closed(survey: dict, now: Optional[datetime] = None) -> bool:
+    """Fechada pelo agendador, arquivada, ou com end_date já ultrapassada (sem consultar a base de dados)"""
+    if survey.get("closed_at") or survey.get("archive_state"):
+        return True
+    closes_at = survey.get("closes_at") or survey_closes_at(survey.get("end_date"))
+    if closes_at is None:
+        return False
+    if closes_at.tzinfo is None:
+        # O Motor devolve datas BSON sem fuso (UTC)
+        closes_at = closes_at.replace(tzinfo=timezone.utc)
+    return closes_at <= (now or datetime.now(timezone.utc))
+
+
+def without_user(bucket: dict, user_id: str):
+    """Retira as respostas de um utilizador de um lote: (novo documento, ou None se ficar vazio; removidas)"""
+    responses = unpack(bucket["data"])
+    kept = [r for r in responses if r.get("user_id") != user_id]
+    removed = [r for r in responses if r.get("user_id") == user_id]
+    return (bucket_doc(bucket["survey_id"], bucket["bucket"], kept) if kept else None), removed
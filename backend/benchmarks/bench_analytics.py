@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks dos cálculos de resultados (sem HTTP nem MongoDB).
+
+Gera sondagens sintéticas com todos os tipos de pergunta e N respostas, mede
+cada caminho de analytics isoladamente e guarda/compara com uma baseline JSON.
+
+Uso:
+    python benchmarks/bench_analytics.py --sizes 10000,100000 --save
+    python benchmarks/bench_analytics.py --compare            # falha (exit 1) em regressões
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analytics  # noqa: E402
+from tally import SurveyTally  # noqa: E402
+
+BASELINE_FILE = Path(__file__).parent / "baselines" / "analytics.json"
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+TEXT_VALUES = [
+    "Os transportes públicos precisam de melhorar",
+    "Mais investimento na saúde",
+    "A habitação está demasiado cara",
+    "Sem opinião",
+]
+
+
+def make_survey() -> dict:
+    def options(n):
+        return [{"id": str(uuid.uuid4()), "text": f"Opção {i}", "order": i} for i in range(n)]
+
+    questions = [
+        {"type": "multiple_choice", "options": options(5)},
+        {"type": "multiple_choice", "options": options(3)},
+        {"type": "yes_no", "options": None},
+        {"type": "checkbox", "options": options(6)},
+        {"type": "rating", "options": None, "min_rating": 1, "max_rating": 5},
+        {"type": "rating", "options": None, "min_rating": 0, "max_rating": 10},
+        {"type": "text", "options": None},
+    ]
+    for i, q in enumerate(questions):
+        q.update({"id": str(uuid.uuid4()), "text": f"Pergunta {i}", "required": True, "order": i})
+    return {"id": str(uuid.uuid4()), "title": "Benchmark", "questions": questions}
+
+
+def _answer_pool(question: dict, rng: random.Random) -> list:
+    """Respostas possíveis para uma pergunta; os dicts são partilhados entre respostas para poupar memória"""
+    q_id = question["id"]
+    q_type = question["type"]
+    if q_type == "multiple_choice":
+        values = [o["id"] for o in question["options"]]
+    elif q_type == "yes_no":
+        values = ["Sim", "Não"]
+    elif q_type == "checkbox":
+        ids = [o["id"] for o in question["options"]]
+        values = [",".join(rng.sample(ids, rng.randint(1, len(ids)))) for _ in range(32)]
+    elif q_type == "rating":
+        values = [str(v) for v in range(question["min_rating"], question["max_rating"] + 1)]
+    else:
+        values = TEXT_VALUES
+    return [{"question_id": q_id, "value": v} for v in values]
+
+
+def make_responses(survey: dict, n: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    pools = [_answer_pool(q, rng) for q in survey["questions"]]
+    survey_id = survey["id"]
+    responses = []
+    for i in range(n):
+        # ~10% das respostas deixam a pergunta de texto em branco
+        answers = [rng.choice(pool) for pool in (pools if rng.random() > 0.1 else pools[:-1])]
+        responses.append({"id": str(i), "survey_id": survey_id, "answers": answers})
+    return responses
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(sizes, repeat: int) -> dict:
+    survey = make_survey()
+    results = {}
+    for n in sizes:
+        responses = make_responses(survey, n)
+        runs = 1 if n >= 1_000_000 else repeat
+        results[str(n)] = {
+            "tally_build": _time(lambda: SurveyTally.from_responses(survey, responses), runs),
+            "survey_analytics": _time(lambda: analytics.survey_analytics(survey, responses), runs),
+            "public_results": _time(lambda: analytics.public_results(survey, responses, False), runs),
+            "public_results_admin": _time(lambda: analytics.public_results(survey, responses, True), runs),
+            "global_results": _time(lambda: analytics.global_results(survey, responses), runs),
+        }
+        del responses
+        print(f"{n:>9} respostas: " + ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in results[str(n)].items()),
+              file=sys.stderr)
+    return results
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for size, timings in current.items():
+        for name, seconds in timings.items():
+            reference = baseline.get(size, {}).get(name)
+            if reference and seconds > reference * (1 + tolerance):
+                regressions.append(f"{name} @ {size}: {seconds * 1000:.1f}ms vs baseline {reference * 1000:.1f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks dos cálculos de resultados")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=str(BASELINE_FILE))
+    parser.add_argument("--save", action="store_true", help="Grava os resultados como nova baseline")
+    parser.add_argument("--compare", action="store_true", help="Compara com a baseline e falha em regressões")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Abrandamento tolerado (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = run(sizes, args.repeat)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.save:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+    if args.compare:
+        if not baseline_path.exists():
+            sys.exit(f"Baseline inexistente: {baseline_path}")
+        regressions = compare(results, json.loads(baseline_path.read_text())["results"], args.tolerance)
+        if regressions:
+            print("Regressões de desempenho:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+        print("Sem regressões face à baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
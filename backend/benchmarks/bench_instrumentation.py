@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Mede o custo por pedido do MetricsMiddleware sobre uma app ASGI vazia.
+
+Uso: python benchmarks/bench_instrumentation.py [--requests 200000]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from observability import MetricsRegistry, MetricsMiddleware  # noqa: E402
+
+
+class _Route:
+    path = "/api/surveys/{survey_id}"
+
+
+async def _bare_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message):
+    pass
+
+
+async def _run(app, n: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/api/surveys/x"}
+    started = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), _receive, _send)
+    return time.perf_counter() - started
+
+
+async def main(n: int):
+    instrumented = MetricsMiddleware(_bare_app, MetricsRegistry())
+    # Aquecimento
+    await _run(_bare_app, 1000)
+    await _run(instrumented, 1000)
+
+    baseline = min([await _run(_bare_app, n) for _ in range(3)])
+    measured = min([await _run(instrumented, n) for _ in range(3)])
+    overhead_us = (measured - baseline) / n * 1e6
+    print(json.dumps({
+        "requests": n,
+        "baseline_us_per_request": round(baseline / n * 1e6, 3),
+        "instrumented_us_per_request": round(measured / n * 1e6, 3),
+        "overhead_us_per_request": round(overhead_us, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
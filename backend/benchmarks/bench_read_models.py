@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Alocações e tempo de serialização por item: modelos Pydantic vs read models com slots.
+
+Para cada listagem (sondagens, utilizadores, respostas, sugestões, candidaturas)
+constrói N itens a partir de documentos sintéticos, conta blocos e bytes alocados
+com ``tracemalloc`` e mede o tempo de construção + serialização por item.
+
+Uso: python benchmarks/bench_read_models.py [--items 1000] [--repeat 20]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+
+from bench_serialization import make_survey_doc  # noqa: E402
+from read_models import (  # noqa: E402
+    SuggestionRead, SurveyAnswerRead, SurveyRead, TeamApplicationRead, UserRead
+)
+from serialization import dumps  # noqa: E402
+from server import Suggestion, SurveyAnswer, SurveyResponse, TeamApplication, UserResponse  # noqa: E402
+
+NOW = "2025-01-01T00:00:00+00:00"
+
+
+def _user(i):
+    return {"id": str(uuid.uuid4()), "email": f"u{i}@impar.pt", "name": f"Utilizador {i}", "role": "user",
+            "created_at": NOW, "district": "Lisboa", "municipality": "Lisboa", "accept_notifications": True}
+
+
+def _answer(i):
+    return {"id": str(uuid.uuid4()), "survey_id": "s", "user_id": str(i), "submitted_at": NOW,
+            "answers": [{"question_id": f"q{q}", "value": str(q % 5 + 1)} for q in range(8)]}
+
+
+def _suggestion(i):
+    return {"id": str(uuid.uuid4()), "user_id": str(i), "user_name": "Ana", "content": "Sugestão " * 10,
+            "status": "pending", "created_at": NOW, "category": "Saúde"}
+
+
+def _application(i):
+    return {"id": str(uuid.uuid4()), "user_id": str(i), "user_name": "Ana", "user_email": "a@impar.pt",
+            "message": "Quero colaborar", "status": "pending", "created_at": NOW}
+
+
+CASES = {
+    "surveys": (make_survey_doc, SurveyResponse, SurveyRead),
+    "users": (_user, UserResponse, UserRead),
+    "answers": (_answer, SurveyAnswer, SurveyAnswerRead),
+    "suggestions": (_suggestion, Suggestion, SuggestionRead),
+    "applications": (_application, TeamApplication, TeamApplicationRead),
+}
+
+
+def _pydantic_path(model, docs):
+    items = [model(**d) for d in docs]
+    return items, dumps([m.model_dump(mode="json") for m in items])
+
+
+def _read_model_path(read_model, docs):
+    items = [read_model.from_doc(d) for d in docs]
+    return items, dumps(items)
+
+
+def _allocations(fn, docs):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = fn(docs)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    del result
+    return sum(s.count_diff for s in stats), sum(s.size_diff for s in stats)
+
+
+def _per_item_us(fn, docs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(docs)
+        best = min(best, time.perf_counter() - started)
+    return best / len(docs) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos read models das listagens")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    report = {}
+    for name, (make_doc, model, read_model) in CASES.items():
+        docs = [make_doc(i) for i in range(args.items)]
+        pydantic_fn = lambda d, m=model: _pydantic_path(m, d)  # noqa: E731
+        read_fn = lambda d, r=read_model: _read_model_path(r, d)  # noqa: E731
+        assert json.loads(pydantic_fn(docs)[1]) == json.loads(read_fn(docs)[1]), name
+
+        report[name] = {}
+        for label, fn in (("pydantic", pydantic_fn), ("read_model", read_fn)):
+            blocks, size = _allocations(fn, docs)
+            report[name][label] = {
+                "alloc_blocks": blocks,
+                "alloc_kib": round(size / 1024, 1),
+                "us_per_item": round(_per_item_us(fn, docs, args.repeat), 2),
+            }
+    print(json.dumps({"items": args.items, "results": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
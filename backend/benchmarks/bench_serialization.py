@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Custo de CPU da serialização de listas de sondagens, por pedido.
+
+Compara o caminho antigo (``SurveyResponse(**doc)`` + validação e dump do
+``response_model`` pelo FastAPI + ``json.dumps``) com o atual (``SurveyRead``
+construídos a partir dos documentos e serializados uma vez com orjson).
+
+Uso: python benchmarks/bench_serialization.py [--items 100] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# O cliente Motor não liga à BD ao importar o servidor
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench")
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from read_models import SurveyRead  # noqa: E402
+from serialization import FastJSONResponse, orjson  # noqa: E402
+from server import SurveyResponse  # noqa: E402
+
+
+def make_survey_doc(i: int) -> dict:
+    questions = []
+    for q in range(8):
+        options = [{"id": str(uuid.uuid4()), "text": f"Opção {o}", "order": o} for o in range(4)]
+        questions.append({
+            "id": str(uuid.uuid4()), "type": "multiple_choice", "text": f"Pergunta {q}",
+            "required": True, "highlighted": False, "options": options,
+            "min_rating": 1, "max_rating": 5, "order": q,
+        })
+    return {
+        "id": str(uuid.uuid4()), "title": f"Sondagem {i}", "description": "Descrição",
+        "owner_id": str(uuid.uuid4()), "owner_name": "Autor", "questions": questions,
+        "is_published": True, "is_featured": i % 5 == 0, "end_date": None,
+        "created_at": "2025-01-01T00:00:00+00:00", "updated_at": "2025-01-01T00:00:00+00:00",
+        "response_count": i * 3, "tally_version": i, "user_has_responded": False, "survey_number": i + 1,
+    }
+
+
+_list_adapter = TypeAdapter(List[SurveyResponse])
+
+
+def legacy(docs: list) -> bytes:
+    models = [SurveyResponse(**d) for d in docs]
+    # O FastAPI faz model_dump do valor devolvido e volta a validá-lo contra o response_model
+    value = _list_adapter.validate_python([m.model_dump() for m in models])
+    content = _list_adapter.dump_python(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast(docs: list) -> bytes:
+    return FastJSONResponse(content=[SurveyRead.from_doc(d) for d in docs]).body
+
+
+def _time(fn, docs, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(docs)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da serialização das listas de sondagens")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    docs = [make_survey_doc(i) for i in range(args.items)]
+    # As duas variantes têm de produzir o mesmo JSON
+    assert json.loads(legacy(docs)) == json.loads(fast(docs))
+
+    legacy_s = _time(legacy, docs, args.repeat)
+    fast_s = _time(fast, docs, args.repeat)
+    print(json.dumps({
+        "items": args.items,
+        "orjson": orjson is not None,
+        "legacy_ms": round(legacy_s * 1000, 3),
+        "fast_ms": round(fast_s * 1000, 3),
+        "saved_ms_per_request": round((legacy_s - fast_s) * 1000, 3),
+        "speedup": round(legacy_s / fast_s, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Compressão gzip/brotli das respostas HTTP (middleware ASGI).
+
+Ao contrário do ``GZipMiddleware`` do Starlette, suporta brotli (quando o pacote
+``brotli`` está instalado), uma lista de content-types comprimíveis e comprime
+respostas em streaming bloco a bloco, sem as acumular em memória.
+"""
+import zlib
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+
+DEFAULT_CONTENT_TYPES = (
+    "application/json",
+    "text/csv",
+    "text/plain",
+    "text/html",
+    "text/css",
+    "application/javascript",
+)
+
+
+ENCODINGS = ("gzip", "br")
+
+
+def encoded_etag(etag: bytes, encoding: str) -> bytes:
+    """``"abc"`` -> ``"abc-gzip"``: cada codificação é uma representação diferente, com o seu validador"""
+    if etag.endswith(b'"'):
+        return etag[:-1] + b"-" + encoding.encode() + b'"'
+    return etag
+
+
+def base_etag(tag: str) -> str:
+    """ETag da representação sem codificação (para comparar If-None-Match; comparação fraca)"""
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """``gzip, br;q=0.8, *;q=0`` -> {"gzip": 1.0, "br": 0.8, "*": 0.0}"""
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(header: str, brotli_enabled: bool = True):
+    accepted = parse_accept_encoding(header)
+    if brotli_enabled and brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31: formato gzip (cabeçalho + CRC)
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Z_SYNC_FLUSH para o cliente poder descomprimir cada bloco à medida que chega
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """Comprime respostas cujo content-type esteja na lista e cujo corpo tenha pelo menos ``minimum_size`` bytes.
+
+    Respostas em streaming são sempre comprimidas (o tamanho final não é conhecido).
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        content_types=DEFAULT_CONTENT_TYPES,
+        brotli_enabled: bool = True,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.content_types = tuple(content_types)
+        self.brotli_enabled = brotli_enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for key, value in scope.get("headers", ()):
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept, self.brotli_enabled) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressionResponder(self, encoding, send).run(scope, receive)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.passthrough = False
+        self.encoder = None
+
+    async def run(self, scope, receive):
+        await self.middleware.app(scope, receive, self.send_wrapper)
+
+    def _eligible(self, message) -> bool:
+        if message["status"] < 200 or message["status"] in (204, 304):
+            return False
+        content_type = ""
+        for key, value in message.get("headers", ()):
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type":
+                content_type = value.decode("latin-1").split(";")[0].strip().lower()
+        return content_type.startswith(self.middleware.content_types)
+
+    def _encoder(self):
+        if self.encoding == "br":
+            return _BrotliEncoder(self.middleware.brotli_quality)
+        return _GzipEncoder(self.middleware.gzip_level)
+
+    def _compressed_headers(self, content_length=None) -> list:
+        headers = [
+            (k, v) for k, v in self.start_message.get("headers", ())
+            if k not in (b"content-length", b"vary", b"etag")
+        ]
+        for k, v in self.start_message.get("headers", ()):
+            if k == b"etag":
+                headers.append((b"etag", encoded_etag(v, self.encoding)))
+        vary = [v for k, v in self.start_message.get("headers", ()) if k == b"vary"]
+        headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+        headers.append((b"content-encoding", self.encoding.encode()))
+        if content_length is not None:
+            headers.append((b"content-length", str(content_length).encode()))
+        return headers
+
+    async def send_wrapper(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            self.passthrough = not self._eligible(message)
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body:
+                # Resposta completa: só comprime acima do limite
+                if len(body) < self.middleware.minimum_size:
+                    await self.send(self.start_message)
+                    await self.send(message)
+                    return
+                compressed = self._encoder().finish(body)
+                await self.send({**self.start_message, "headers": self._compressed_headers(len(compressed))})
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            # Streaming: comprime bloco a bloco
+            self.encoder = self._encoder()
+            await self.send({**self.start_message, "headers": self._compressed_headers()})
+
+        if more_body:
+            data = self.encoder.chunk(body)
+            if data:
+                await self.send({"type": "http.response.body", "body": data, "more_body": True})
+        else:
+            await self.send({"type": "http.response.body", "body": self.encoder.finish(body)})
@@ -0,0 +1,258 @@
+"""Execução de tarefas em segundo plano (exportações, recálculos) fora da latência dos pedidos.
+
+As tarefas ficam na coleção ``jobs`` (estado, progresso, resultado) e correm como
+tasks asyncio no processo que as recebeu, com um limite de concorrência por tipo.
+Resultados em ficheiro são escritos em ``results_dir`` e servidos pelo endpoint
+de download; os documentos expiram por TTL (``expires_at``, só definido quando a
+tarefa termina, para o índice TTL nunca apagar uma tarefa em fila ou a correr) e os
+ficheiros são apagados pelo mesmo prazo.
+
+Cada tarefa em execução renova ``heartbeat_at`` a cada ``heartbeat_interval``
+segundos; as que deixam de dar sinal durante ``stale_after`` (processo parado)
+são marcadas como falhadas por uma varredura periódica em todos os workers.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _dedupe_key(job_type: str, params: dict) -> str:
+    return f"{job_type}:{json.dumps(params, sort_keys=True)}"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobContext:
+    """Passado ao handler: parâmetros, registo de progresso e caminho para ficheiros de resultado"""
+
+    def __init__(self, runner: "JobRunner", job: dict):
+        self.runner = runner
+        self.job = job
+        self.id = job["id"]
+        self.params = job.get("params") or {}
+        self._last_progress = 0.0
+
+    async def progress(self, done: int, total: int = None, force: bool = False):
+        # No máximo uma escrita por intervalo, exceto no fim
+        now = time.monotonic()
+        if not force and done != total and now - self._last_progress < self.runner.progress_interval:
+            return
+        self._last_progress = now
+        progress = {"done": done}
+        if total is not None:
+            progress["total"] = total
+        await self.runner.collection.update_one(
+            {"id": self.id}, {"$set": {"progress": progress, "heartbeat_at": _now()}}
+        )
+
+    def result_path(self, filename: str) -> Path:
+        return self.runner.results_dir / f"{self.id}_{filename}"
+
+
+class JobRunner:
+    def __init__(self, collection, results_dir: Path, result_ttl: timedelta = timedelta(hours=24),
+                 progress_interval: float = 1.0, stale_after: timedelta = timedelta(minutes=10),
+                 heartbeat_interval: float = 30.0):
+        self.collection = collection
+        self.results_dir = Path(results_dir)
+        self.result_ttl = result_ttl
+        self.progress_interval = progress_interval
+        self.stale_after = stale_after
+        self.heartbeat_interval = heartbeat_interval
+        self.handlers = {}
+        self._semaphores = {}
+        self._requeue_on_cancel = set()
+        self._tasks = set()
+        self._maintenance_task = None
+
+    def register(self, job_type: str, handler, concurrency: int = 1, requeue_on_cancel: bool = False):
+        """``handler(ctx)`` devolve o resultado (dict) a guardar no documento da tarefa.
+
+        Com ``requeue_on_cancel`` (handlers idempotentes), uma tarefa interrompida por paragem do
+        processo volta à fila e é retomada no próximo arranque em vez de ficar falhada.
+        """
+        self.handlers[job_type] = handler
+        self._semaphores[job_type] = asyncio.Semaphore(concurrency)
+        if requeue_on_cancel:
+            self._requeue_on_cancel.add(job_type)
+
+    async def submit(self, job_type: str, params: dict = None, created_by: str = None, dedupe: bool = False) -> dict:
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        params = params or {}
+        if dedupe:
+            # Uma tarefa igual ainda por terminar serve o mesmo pedido
+            existing = await self.collection.find_one(
+                {"type": job_type, "params": params, "status": {"$in": list(ACTIVE_STATUSES)}}, {"_id": 0}
+            )
+            if existing:
+                return existing
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "params": params,
+            "status": "queued",
+            "progress": {"done": 0},
+            "result": None,
+            "error": None,
+            "created_by": created_by,
+            "created_at": _now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        if dedupe:
+            # Índice único (sparse) em dedupe_key, removido quando a tarefa termina: dois workers não
+            # conseguem criar a mesma tarefa em simultâneo
+            job["dedupe_key"] = _dedupe_key(job_type, params)
+        try:
+            await self.collection.insert_one(dict(job))
+        except Exception as e:
+            if dedupe and getattr(e, "code", None) == DUPLICATE_KEY_ERROR:
+                existing = await self.collection.find_one({"dedupe_key": job["dedupe_key"]}, {"_id": 0})
+                if existing:
+                    return existing
+            raise
+        self._spawn(job)
+        return job
+
+    def _spawn(self, job: dict):
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: dict):
+        async with self._semaphores[job["type"]]:
+            # Reclamação atómica: com vários workers, cada tarefa em fila só corre num deles
+            claimed = await self.collection.find_one_and_update(
+                {"id": job["id"], "status": "queued"},
+                {"$set": {"status": "running", "started_at": _now().isoformat(), "heartbeat_at": _now()}},
+                projection={"_id": 1}
+            )
+            if claimed is None:
+                return
+            # Sinal de vida independente do progresso: passos longos sem progress() não parecem parados
+            heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+            update = {}
+            try:
+                result = await self.handlers[job["type"]](JobContext(self, job))
+                update.update(status="completed", result=result)
+            except asyncio.CancelledError:
+                if job["type"] in self._requeue_on_cancel:
+                    update.update(status="queued", started_at=None)
+                else:
+                    update.update(status="failed", error="Interrupted")
+                raise
+            except Exception as e:
+                logger.exception(f"Job {job['id']} ({job['type']}) failed")
+                update.update(status="failed", error=str(e))
+            finally:
+                heartbeat.cancel()
+                if update.get("status") == "queued":
+                    # Mantém o dedupe_key: continua a ser a tarefa ativa para este pedido
+                    await self.collection.update_one({"id": job["id"]}, {"$set": update})
+                else:
+                    update["finished_at"] = _now().isoformat()
+                    update["expires_at"] = _now() + self.result_ttl
+                    await self.collection.update_one(
+                        {"id": job["id"]}, {"$set": update, "$unset": {"dedupe_key": ""}}
+                    )
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.collection.update_one(
+                    {"id": job_id, "status": "running"}, {"$set": {"heartbeat_at": _now()}}
+                )
+            except Exception as e:
+                logger.warning(f"Could not refresh heartbeat of job {job_id}: {e}")
+
+    async def get(self, job_id: str):
+        return await self.collection.find_one({"id": job_id}, {"_id": 0})
+
+    async def sweep_stale(self) -> int:
+        """Marca como falhadas as tarefas que deixaram de dar sinal (liberta também o dedupe_key)"""
+        result = await self.collection.update_many(
+            {"status": "running", "heartbeat_at": {"$lt": _now() - self.stale_after}},
+            {"$set": {"status": "failed", "error": "Interrupted (no heartbeat)", "finished_at": _now().isoformat(),
+                      "expires_at": _now() + self.result_ttl},
+             "$unset": {"dedupe_key": ""}}
+        )
+        return result.modified_count
+
+    async def start(self):
+        """Retoma as tarefas em fila e arranca a varredura periódica das tarefas paradas"""
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        await self.sweep_stale()
+        async for job in self.collection.find({"status": "queued"}, {"_id": 0}):
+            if job["type"] in self.handlers:
+                self._spawn(job)
+        self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def stop(self):
+        tasks = list(self._tasks)
+        if self._maintenance_task:
+            tasks.append(self._maintenance_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def cleanup_results(self):
+        """Apaga ficheiros de resultado mais antigos que o TTL das tarefas"""
+        cutoff = time.time() - self.result_ttl.total_seconds()
+        for path in self.results_dir.glob("*"):
+            try:
+                if path.is_file() and path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError as e:
+                logger.warning(f"Could not remove job result {path}: {e}")
+
+    async def _maintenance_loop(self, cleanup_interval: float = 3600):
+        sweep_interval = self.stale_after.total_seconds() / 2
+        last_cleanup = None
+        while True:
+            try:
+                await self.sweep_stale()
+            except Exception as e:
+                logger.warning(f"Stale job sweep failed: {e}")
+            if last_cleanup is None or time.monotonic() - last_cleanup >= cleanup_interval:
+                self.cleanup_results()
+                last_cleanup = time.monotonic()
+            await asyncio.sleep(sweep_interval)
+
+
+class PeriodicTask:
+    """Corre ``fn()`` a cada ``interval`` segundos (manutenção: sweepers, agendamentos); erros só são registados"""
+
+    def __init__(self, name: str, fn, interval: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.fn()
+            except Exception:
+                logger.exception(f"Periodic task {self.name} failed")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""Gerador de carga assíncrono para a API IMPAR.
+
+Corre cenários (navegar sondagens, login, responder, consultar resultados) com
+concorrência configurável contra uma instância local da API e um mongod local,
+e reporta throughput e latências p50/p95/p99 por endpoint em JSON.
+
+Todo o tráfego sai de 127.0.0.1: com ``--start-server`` a API arranca sem limitação
+de pedidos nem controlo de admissão (RATE_LIMIT_ENABLED/ADMISSION_ENABLED=false),
+senão a preparação falha com 429 e as latências medem rejeições. Use
+``--with-limits`` para os manter; uma API arrancada à parte precisa das mesmas variáveis.
+
+Exemplos:
+    python loadtest.py --start-server --scenario mixed --concurrency 50 --duration 30
+    python loadtest.py --base-url http://127.0.0.1:8001 --scenario browse --output report.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+ROOT_DIR = Path(__file__).parent
+
+SCENARIOS = ("browse", "login", "respond", "results", "mixed")
+
+# Pesos do cenário misto (aproximação do tráfego real: maioria leituras)
+MIXED_WEIGHTS = {"browse": 50, "results": 30, "respond": 15, "login": 5}
+
+SURVEY_TEMPLATE = {
+    "title": "Sondagem de carga",
+    "description": "Criada pelo gerador de carga",
+    "questions": [
+        {"type": "multiple_choice", "text": "Escolha uma opção",
+         "options": [{"text": "A"}, {"text": "B"}, {"text": "C"}, {"text": "D"}]},
+        {"type": "yes_no", "text": "Concorda?"},
+        {"type": "checkbox", "text": "Selecione várias",
+         "options": [{"text": "X"}, {"text": "Y"}, {"text": "Z"}]},
+        {"type": "rating", "text": "Classifique", "min_rating": 1, "max_rating": 5},
+        {"type": "text", "text": "Comentários", "required": False},
+    ],
+}
+
+TEXT_SAMPLES = [
+    "Os transportes públicos precisam de melhorar",
+    "Mais investimento na saúde e na educação",
+    "A habitação está demasiado cara",
+    "Sem comentários",
+]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Percentil pelo método nearest-rank sobre uma lista já ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class Recorder:
+    """Acumula latências e erros por endpoint"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    async def call(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.latencies.setdefault(label, []).append(time.perf_counter() - started)
+        if not ok:
+            self.errors[label] = self.errors.get(label, 0) + 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for label, values in sorted(self.latencies.items()):
+            values.sort()
+            endpoints[label] = {
+                "count": len(values),
+                "errors": self.errors.get(label, 0),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        total = sum(e["count"] for e in endpoints.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "total_requests": total,
+            "total_errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0,
+            "endpoints": endpoints,
+        }
+
+
+class Fixture:
+    """Dados criados antes da carga: owner, sondagem publicada e contas de utilizador"""
+
+    def __init__(self):
+        self.owner_token = None
+        self.survey = None
+        self.users = []
+        self.tokens = []
+
+
+async def setup_fixture(client: httpx.AsyncClient, args) -> Fixture:
+    fixture = Fixture()
+
+    response = await client.post("/auth/login", json={"email": args.owner_email, "password": args.owner_password})
+    if response.status_code != 200:
+        # Numa base de dados vazia o primeiro registo fica com o papel de owner
+        response = await client.post("/auth/register", json={
+            "email": args.owner_email, "password": args.owner_password, "name": "Load Owner"
+        })
+    response.raise_for_status()
+    data = response.json()
+    if data["user"]["role"] not in ("admin", "owner"):
+        raise SystemExit(f"{args.owner_email} não é admin/owner; use uma base de dados vazia ou outra conta")
+    fixture.owner_token = data["access_token"]
+    owner_headers = {"Authorization": f"Bearer {fixture.owner_token}"}
+
+    response = await client.post("/surveys", json=SURVEY_TEMPLATE, headers=owner_headers)
+    response.raise_for_status()
+    survey = response.json()
+    response = await client.put(f"/surveys/{survey['id']}", json={"is_published": True}, headers=owner_headers)
+    response.raise_for_status()
+    fixture.survey = response.json()
+
+    run_id = uuid.uuid4().hex[:8]
+    for i in range(args.users):
+        email = f"load_{run_id}_{i}@example.com"
+        response = await client.post("/auth/register", json={
+            "email": email, "password": "loadtest123", "name": f"Load User {i}"
+        })
+        response.raise_for_status()
+        fixture.users.append(email)
+        fixture.tokens.append(response.json()["access_token"])
+    return fixture
+
+
+def random_answers(survey: dict) -> list:
+    answers = []
+    for q in survey["questions"]:
+        if q["type"] == "multiple_choice":
+            value = random.choice(q["options"])["id"]
+        elif q["type"] == "checkbox":
+            picked = random.sample(q["options"], random.randint(1, len(q["options"])))
+            value = ",".join(o["id"] for o in picked)
+        elif q["type"] == "yes_no":
+            value = random.choice(["Sim", "Não"])
+        elif q["type"] == "rating":
+            value = str(random.randint(q.get("min_rating") or 1, q.get("max_rating") or 5))
+        else:
+            value = random.choice(TEXT_SAMPLES)
+        answers.append({"question_id": q["id"], "value": value})
+    return answers
+
+
+async def scenario_browse(client, recorder: Recorder, fixture: Fixture):
+    await recorder.call(client, "GET /surveys", "GET", "/surveys", params={"published": "true"})
+    await recorder.call(client, "GET /surveys/{id}", "GET", f"/surveys/{fixture.survey['id']}")
+
+
+async def scenario_login(client, recorder: Recorder, fixture: Fixture):
+    if not fixture.users:
+        return
+    email = random.choice(fixture.users)
+    await recorder.call(client, "POST /auth/login", "POST", "/auth/login",
+                        json={"email": email, "password": "loadtest123"})
+
+
+async def scenario_respond(client, recorder: Recorder, fixture: Fixture):
+    survey_id = fixture.survey["id"]
+    await recorder.call(client, "GET /surveys/{id}", "GET", f"/surveys/{survey_id}")
+    # Metade das respostas anónimas (inserção), metade autenticadas (substituição)
+    headers = {}
+    if fixture.tokens and random.random() < 0.5:
+        headers["Authorization"] = f"Bearer {random.choice(fixture.tokens)}"
+    await recorder.call(client, "POST /surveys/{id}/respond", "POST", f"/surveys/{survey_id}/respond",
+                        json={"answers": random_answers(fixture.survey)}, headers=headers)
+
+
+async def scenario_results(client, recorder: Recorder, fixture: Fixture):
+    await recorder.call(client, "GET /surveys/{id}/public-results", "GET",
+                        f"/surveys/{fixture.survey['id']}/public-results")
+
+
+SCENARIO_FUNCS = {
+    "browse": scenario_browse,
+    "login": scenario_login,
+    "respond": scenario_respond,
+    "results": scenario_results,
+}
+
+
+async def worker(client, recorder: Recorder, fixture: Fixture, scenario: str, deadline: float, iterations: list):
+    names = list(MIXED_WEIGHTS)
+    weights = list(MIXED_WEIGHTS.values())
+    while time.perf_counter() < deadline:
+        if iterations is not None:
+            if iterations[0] <= 0:
+                return
+            iterations[0] -= 1
+        name = random.choices(names, weights)[0] if scenario == "mixed" else scenario
+        await SCENARIO_FUNCS[name](client, recorder, fixture)
+
+
+def start_server(args) -> subprocess.Popen:
+    env = dict(os.environ)
+    # Sempre a base de testes dos argumentos, mesmo com MONGO_URL/DB_NAME exportados (p.ex. os de produção)
+    env["MONGO_URL"] = args.mongo_url
+    env["DB_NAME"] = args.db_name
+    if not args.with_limits:
+        env["RATE_LIMIT_ENABLED"] = "false"
+        env["ADMISSION_ENABLED"] = "false"
+    port = httpx.URL(args.base_url).port or 8001
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env
+    )
+
+
+async def wait_until_healthy(client: httpx.AsyncClient, timeout: float = 30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+    raise SystemExit("A API não ficou disponível a tempo")
+
+
+async def run(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url.rstrip("/") + "/api", limits=limits,
+                                 timeout=args.timeout) as client:
+        await wait_until_healthy(client)
+        fixture = await setup_fixture(client, args)
+
+        recorder = Recorder()
+        iterations = [args.iterations] if args.iterations else None
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            worker(client, recorder, fixture, args.scenario, deadline, iterations)
+            for _ in range(args.concurrency)
+        ])
+        report = recorder.report(time.perf_counter() - started)
+
+    report["config"] = {
+        "base_url": args.base_url,
+        "scenario": args.scenario,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "iterations": args.iterations,
+        "users": args.users,
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de carga para a API IMPAR")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Duração máxima em segundos")
+    parser.add_argument("--iterations", type=int, default=0, help="Número total de iterações (0 = só duração)")
+    parser.add_argument("--users", type=int, default=20, help="Contas criadas para os cenários de login/resposta")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--owner-email", default="loadtest-owner@example.com")
+    parser.add_argument("--owner-password", default="loadtest123")
+    parser.add_argument("--start-server", action="store_true", help="Arranca o uvicorn localmente")
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn com --start-server")
+    parser.add_argument("--with-limits", action="store_true",
+                        help="Com --start-server, mantém a limitação de pedidos e o controlo de admissão")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="impar_loadtest")
+    parser.add_argument("--output", help="Ficheiro para o relatório JSON (por omissão stdout)")
+    args = parser.parse_args()
+
+    server = start_server(args) if args.start_server else None
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
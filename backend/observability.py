@@ -0,0 +1,415 @@
+"""Instrumentação do backend IMPAR: pool de ligações MongoDB, atraso do event loop, métricas Prometheus
+e contagem de queries por pedido"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from pymongo import monitoring
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Conta ligações abertas e em uso no pool do MongoDB.
+
+    O pymongo não expõe estatísticas do pool, por isso são reconstruídas a partir
+    dos eventos de checkout/checkin e criação/fecho de ligações.
+    """
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self.open = 0
+        self.in_use = 0
+        self.checkout_failures = 0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_size": self.max_pool_size,
+                "open": self.open,
+                "in_use": self.in_use,
+                "available": max(self.max_pool_size - self.in_use, 0),
+                "idle": max(self.open - self.in_use, 0),
+                "checkout_failures": self.checkout_failures,
+            }
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open = max(self.open - 1, 0)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.in_use += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.open = 0
+            self.in_use = 0
+
+    def pool_ready(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+
+class LoopLagMonitor:
+    """Mede periodicamente o atraso do event loop (tempo a mais que um sleep demora a acordar)"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - started - self.interval, 0.0)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+
+    def snapshot(self) -> dict:
+        return {
+            "lag_ms": round(self.last_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+        }
+
+
+# Limites superiores (segundos) dos buckets dos histogramas de latência
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+
+
+def _render_histogram(lines: list, name: str, labels: str, hist: _Histogram):
+    cumulative = 0
+    for bound, count in zip(LATENCY_BUCKETS, hist.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.count}')
+    lines.append(f"{name}_sum{{{labels}}} {hist.total:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+
+class MetricsRegistry:
+    """Métricas HTTP e MongoDB em memória, exportadas no formato de texto do Prometheus.
+
+    As métricas HTTP só são atualizadas no event loop; as do MongoDB chegam das threads
+    do executor do Motor e por isso são protegidas por um lock.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.http_latency = {}
+        self.http_status = {}
+        self.mongo_latency = {}
+        self.mongo_failures = {}
+        self._mongo_lock = threading.Lock()
+        self.counters = {}
+        self.counter_help = {}
+
+    def describe(self, name: str, help_text: str):
+        self.counter_help[name] = help_text
+
+    def inc(self, name: str, value: int = 1, **labels):
+        """Contador genérico (só no event loop), p.ex. ``inc("rate_limit_decisions_total", policy="login")``"""
+        key = (name, tuple(labels.items()))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe_request(self, method: str, route: str, status: int, duration: float):
+        key = (method, route)
+        hist = self.http_latency.get(key)
+        if hist is None:
+            hist = self.http_latency[key] = _Histogram()
+        hist.observe(duration)
+        status_key = (method, route, status)
+        self.http_status[status_key] = self.http_status.get(status_key, 0) + 1
+
+    def observe_command(self, collection: str, operation: str, duration: float, failed: bool = False):
+        key = (collection, operation)
+        with self._mongo_lock:
+            hist = self.mongo_latency.get(key)
+            if hist is None:
+                hist = self.mongo_latency[key] = _Histogram()
+            hist.observe(duration)
+            if failed:
+                self.mongo_failures[key] = self.mongo_failures.get(key, 0) + 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_in_flight Pedidos HTTP em curso.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_request_duration_seconds Latência dos pedidos HTTP por rota.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), hist in sorted(self.http_latency.items()):
+            _render_histogram(lines, "http_request_duration_seconds", _labels(method=method, route=route), hist)
+
+        lines.append("# HELP http_responses_total Respostas HTTP por rota e código de estado.")
+        lines.append("# TYPE http_responses_total counter")
+        for (method, route, status), count in sorted(self.http_status.items()):
+            lines.append(f"http_responses_total{{{_labels(method=method, route=route, status=status)}}} {count}")
+
+        with self._mongo_lock:
+            mongo_latency = sorted(self.mongo_latency.items())
+            mongo_failures = sorted(self.mongo_failures.items())
+        lines.append("# HELP mongodb_command_duration_seconds Duração dos comandos MongoDB por coleção e operação.")
+        lines.append("# TYPE mongodb_command_duration_seconds histogram")
+        for (collection, operation), hist in mongo_latency:
+            _render_histogram(
+                lines, "mongodb_command_duration_seconds", _labels(collection=collection, operation=operation), hist
+            )
+        lines.append("# HELP mongodb_command_failures_total Comandos MongoDB falhados por coleção e operação.")
+        lines.append("# TYPE mongodb_command_failures_total counter")
+        for (collection, operation), count in mongo_failures:
+            lines.append(
+                f"mongodb_command_failures_total{{{_labels(collection=collection, operation=operation)}}} {count}"
+            )
+
+        current = None
+        for (name, labels), count in sorted(self.counters.items()):
+            if name != current:
+                current = name
+                lines.append(f"# HELP {name} {self.counter_help.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{{{_labels(**dict(labels))}}} {count}" if labels else f"{name} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestDbStats:
+    """Queries MongoDB feitas durante um pedido HTTP.
+
+    ``record`` é chamado nas threads do executor do Motor (queries concorrentes do mesmo
+    pedido, p.ex. com ``asyncio.gather``), por isso as atualizações são feitas com lock.
+    """
+    __slots__ = ("count", "duration", "shapes", "_lock")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = {}
+        self._lock = threading.Lock()
+
+    def record(self, shape: str, duration: float):
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def most_repeated(self):
+        with self._lock:
+            if not self.shapes:
+                return None, 0
+            return max(self.shapes.items(), key=lambda item: item[1])
+
+
+_request_db_stats = contextvars.ContextVar("request_db_stats", default=None)
+
+
+def query_shape(command_name: str, collection: str, command) -> str:
+    """Forma de uma query sem valores, p.ex. ``find users {id}``, para detetar padrões N+1"""
+    filt = command.get("filter") or command.get("query")
+    if filt is None:
+        statements = command.get("updates") or command.get("deletes")
+        if statements:
+            filt = statements[0].get("q")
+    if filt is None and command_name == "aggregate":
+        pipeline = command.get("pipeline") or [{}]
+        filt = pipeline[0].get("$match")
+    keys = ",".join(sorted(filt)) if isinstance(filt, dict) else ""
+    return f"{command_name} {collection} {{{keys}}}"
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """Regista a duração de cada comando MongoDB na MetricsRegistry e no pedido HTTP em curso.
+
+    O pedido é lido de um contextvar: o Motor (>= 2.1) corre as operações do pymongo no
+    executor com uma cópia do contexto de quem as chamou.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self._pending = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        collection = target if isinstance(target, str) else "-"
+        stats = _request_db_stats.get()
+        shape = query_shape(event.command_name, collection, event.command) if stats is not None else None
+        self._pending[(event.connection_id, event.request_id)] = (collection, stats, shape)
+
+    def _finish(self, event, failed: bool):
+        collection, stats, shape = self._pending.pop((event.connection_id, event.request_id), ("-", None, None))
+        duration = event.duration_micros / 1e6
+        self.registry.observe_command(collection, event.command_name, duration, failed=failed)
+        if stats is not None:
+            stats.record(shape, duration)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+class MetricsMiddleware:
+    """Middleware ASGI que mede latência, códigos de estado e pedidos em curso por rota.
+
+    A rota é lida de ``scope["route"]`` depois do routing, para agrupar pelo template
+    (``/api/surveys/{survey_id}``) e não pelo caminho concreto.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry = self.registry
+        registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            registry.in_flight -= 1
+            route = scope.get("route")
+            registry.observe_request(
+                scope["method"], route.path if route is not None else "<unmatched>", status_code, duration
+            )
+
+
+class QueryBudgetMiddleware:
+    """Middleware ASGI que conta as queries MongoDB de cada pedido.
+
+    Com ``debug_headers`` ativo junta ``X-DB-Queries`` e ``X-DB-Time-Ms`` à resposta; quando
+    um pedido ultrapassa ``budget`` queries regista um aviso com a rota e a query mais repetida.
+    O início da resposta só é enviado com o primeiro bloco do corpo, para os cabeçalhos contarem
+    tudo; respostas em streaming (com mais blocos a seguir) ainda fazem queries depois disso e por
+    isso não levam os cabeçalhos: os totais ficam no log (nível debug) no fim do pedido.
+    """
+
+    def __init__(self, app, budget: int, debug_headers: bool = False, logger: logging.Logger = None):
+        self.app = app
+        self.budget = budget
+        self.debug_headers = debug_headers
+        self.logger = logger or logging.getLogger(__name__)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats()
+        token = _request_db_stats.set(stats)
+        start = None
+        streamed = False
+
+        async def send_wrapper(message):
+            nonlocal start, streamed
+            if not self.debug_headers:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is not None and message["type"] == "http.response.body":
+                if message.get("more_body", False):
+                    streamed = True
+                else:
+                    start["headers"] = list(start.get("headers", [])) + [
+                        (b"x-db-queries", str(stats.count).encode()),
+                        (b"x-db-time-ms", f"{stats.duration * 1000:.2f}".encode()),
+                    ]
+                await send(start)
+                start = None
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_db_stats.reset(token)
+            if streamed:
+                self.logger.debug(
+                    f"Streamed {scope['method']} {scope['path']}: "
+                    f"{stats.count} queries in {stats.duration * 1000:.1f}ms"
+                )
+            if stats.count > self.budget:
+                route = scope.get("route")
+                shape, repeats = stats.most_repeated()
+                self.logger.warning(
+                    f"Query budget exceeded on {scope['method']} "
+                    f"{route.path if route is not None else scope['path']}: "
+                    f"{stats.count} queries in {stats.duration * 1000:.1f}ms "
+                    f"(budget {self.budget}); most repeated: {shape} x{repeats}"
+                )
@@ -0,0 +1,108 @@
+"""Publicação dos resultados públicos das sondagens em destaque como JSON estático.
+
+Cada versão dos resultados é escrita em ``<dir>/surveys/<id>/results.<versão>.json``
+(imutável, pode ter cache longa) e copiada para ``results.json`` (versão atual, cache
+curta), para o nginx/CDN os servir sem passar pela API. Várias respostas seguidas
+originam uma só publicação ao fim de ``debounce`` segundos; a API lê estes ficheiros
+quando a versão atual já está publicada.
+"""
+import asyncio
+import logging
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_SAFE_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+LATEST = "results.json"
+
+
+def _atomic_write(path: Path, body: bytes):
+    # Quem serve os ficheiros nunca vê uma escrita a meio
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(body)
+    os.replace(tmp, path)
+
+
+class ResultsPublisher:
+    def __init__(self, directory: Path, render, debounce: float = 10.0, keep_versions: int = 3):
+        """``render(survey_id)`` devolve ``(versão, corpo JSON em bytes)``, ou None para despublicar"""
+        self.directory = Path(directory)
+        self.render = render
+        self.debounce = debounce
+        self.keep_versions = keep_versions
+        self._pending = {}
+
+    def survey_dir(self, survey_id: str) -> Path:
+        if not _SAFE_NAME.match(survey_id):
+            raise ValueError(f"Invalid survey id: {survey_id!r}")
+        return self.directory / "surveys" / survey_id
+
+    def path_for(self, survey_id: str, version: str) -> Path:
+        if not _SAFE_NAME.match(version):
+            raise ValueError(f"Invalid results version: {version!r}")
+        return self.survey_dir(survey_id) / f"results.{version}.json"
+
+    def read(self, survey_id: str, version: str) -> Optional[bytes]:
+        """Corpo publicado para esta versão exata, se existir"""
+        try:
+            return self.path_for(survey_id, version).read_bytes()
+        except (OSError, ValueError):
+            return None
+
+    def write(self, survey_id: str, version: str, body: bytes):
+        path = self.path_for(survey_id, version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if not path.exists():
+            _atomic_write(path, body)
+        _atomic_write(path.parent / LATEST, body)
+        self._prune(path)
+
+    def _prune(self, current: Path):
+        versions = sorted(
+            (p for p in current.parent.glob("results.*.json") if p.name not in (LATEST, current.name)),
+            key=lambda p: p.stat().st_mtime, reverse=True
+        )
+        for path in versions[self.keep_versions - 1:]:
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Could not remove published results {path}: {e}")
+
+    def remove(self, survey_id: str):
+        shutil.rmtree(self.survey_dir(survey_id), ignore_errors=True)
+
+    async def publish(self, survey_id: str) -> Optional[str]:
+        rendered = await self.render(survey_id)
+        if rendered is None:
+            self.remove(survey_id)
+            return None
+        version, body = rendered
+        self.write(survey_id, version, body)
+        return version
+
+    def schedule(self, survey_id: str):
+        """Publica dentro de ``debounce`` segundos; pedidos entretanto feitos juntam-se a esse"""
+        if survey_id in self._pending:
+            return
+        self._pending[survey_id] = asyncio.create_task(self._publish_later(survey_id))
+
+    async def _publish_later(self, survey_id: str):
+        try:
+            await asyncio.sleep(self.debounce)
+        finally:
+            # Respostas que cheguem durante a publicação agendam outra
+            self._pending.pop(survey_id, None)
+        try:
+            await self.publish(survey_id)
+        except Exception:
+            logger.exception(f"Could not publish results for survey {survey_id}")
+
+    async def stop(self):
+        tasks = list(self._pending.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,136 @@
+"""Limitação de pedidos por token bucket (por IP e por utilizador).
+
+Cada chave tem um balde com ``capacity`` fichas que se repõe a ``capacity / period``
+fichas por segundo; um pedido gasta uma ficha e é recusado quando o balde está
+vazio, com o tempo até haver nova ficha (``Retry-After``).
+
+Há dois backends: ``MemoryBackend`` (por processo, sem dependências) e
+``MongoBackend``, partilhado entre workers, que aplica o algoritmo numa única
+atualização atómica (pipeline de update com upsert) usando o relógio do servidor.
+"""
+import logging
+import math
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class Policy:
+    """``capacity`` pedidos seguidos no máximo, repostos ao longo de ``period`` segundos"""
+    __slots__ = ("name", "capacity", "period")
+
+    def __init__(self, name: str, capacity: int, period: float):
+        if capacity <= 0 or period <= 0:
+            raise ValueError(f"Invalid rate limit policy {name}: {capacity}/{period}s")
+        self.name = name
+        self.capacity = capacity
+        self.period = period
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "Policy":
+        """``"5/minute"`` -> 5 pedidos por minuto"""
+        count, _, period = spec.partition("/")
+        period = period.strip().lower().rstrip("s")
+        if period not in PERIODS:
+            raise ValueError(f"Invalid rate limit period in {name}: {spec!r}")
+        return cls(name, int(count), PERIODS[period])
+
+    def __repr__(self):
+        return f"Policy({self.name!r}, {self.capacity}/{self.period}s)"
+
+
+def take(tokens: float, elapsed: float, policy: Policy, cost: int = 1):
+    """Um passo do token bucket: (permitido, fichas restantes, segundos até haver ``cost`` fichas)"""
+    tokens = min(policy.capacity, tokens + max(elapsed, 0) * policy.refill_rate)
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / policy.refill_rate
+
+
+class MemoryBackend:
+    """Baldes em memória do processo; as chaves menos usadas são descartadas acima de ``max_keys``"""
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+
+    async def hit(self, key: str, policy: Policy, cost: int = 1):
+        now = self.clock()
+        tokens, updated = self._buckets.get(key, (policy.capacity, now))
+        allowed, tokens, retry_after = take(tokens, now - updated, policy, cost)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class MongoBackend:
+    """Baldes numa coleção MongoDB (chave única em ``key``; TTL em ``expires_at`` limpa os inativos)"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def pipeline(policy: Policy, cost: int = 1) -> list:
+        now_ms = {"$toLong": "$$NOW"}
+        refill_per_ms = policy.refill_rate / 1000
+        return [
+            {"$set": {"_tokens": {"$min": [policy.capacity, {"$add": [
+                {"$ifNull": ["$tokens", policy.capacity]},
+                {"$multiply": [
+                    {"$max": [0, {"$subtract": [now_ms, {"$ifNull": ["$updated_ms", now_ms]}]}]},
+                    refill_per_ms
+                ]}
+            ]}]}}},
+            {"$set": {"allowed": {"$gte": ["$_tokens", cost]}}},
+            {"$set": {
+                "tokens": {"$cond": ["$allowed", {"$subtract": ["$_tokens", cost]}, "$_tokens"]},
+                "updated_ms": now_ms,
+                # Um balde inativo durante um período inteiro volta a estar cheio: pode ser apagado
+                "expires_at": {"$add": ["$$NOW", int(policy.period * 1000)]},
+            }},
+            {"$unset": "_tokens"},
+        ]
+
+    async def hit(self, key: str, policy: Policy, cost: int = 1):
+        bucket = await self.collection.find_one_and_update(
+            {"key": key},
+            self.pipeline(policy, cost),
+            projection={"_id": 0, "tokens": 1, "allowed": 1},
+            upsert=True,
+            return_document=True,  # ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return True, 0.0
+        return False, (cost - bucket["tokens"]) / policy.refill_rate
+
+
+class RateLimiter:
+    """Aplica políticas a chaves num backend e conta as decisões no registo de métricas"""
+
+    def __init__(self, backend, metrics=None):
+        self.backend = backend
+        self.metrics = metrics
+
+    async def hit(self, policy: Policy, key: str, cost: int = 1):
+        """(permitido, Retry-After em segundos inteiros)"""
+        try:
+            allowed, retry_after = await self.backend.hit(f"{policy.name}:{key}", policy, cost)
+        except Exception as e:
+            # Falha aberta: um problema no backend não pode bloquear logins
+            logger.warning(f"Rate limiter backend error ({policy.name}): {e}")
+            return True, 0
+        if self.metrics is not None:
+            self.metrics.inc(
+                "rate_limit_decisions_total", policy=policy.name, result="allowed" if allowed else "limited"
+            )
+        return allowed, max(1, math.ceil(retry_after)) if not allowed else 0
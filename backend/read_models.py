@@ -0,0 +1,142 @@
+"""Representações de leitura das listagens (sondagens, utilizadores, respostas, sugestões, candidaturas).
+
+Os modelos Pydantic do ``server`` continuam a validar o que entra; as listagens
+leem documentos que já foram validados na escrita, por isso usam dataclasses
+com ``__slots__`` construídas diretamente a partir do documento da BD: sem
+validação, sem o ``__dict__`` por instância e serializadas nativamente pelo
+orjson. Os campos seguem a ordem dos modelos de resposta, para o JSON ser igual.
+"""
+from dataclasses import MISSING, dataclass, fields
+from typing import Any, List, Optional
+
+
+def _reader(cls, nested: dict):
+    specs = []
+    for f in fields(cls):
+        default = None if f.default is MISSING else f.default
+        specs.append((f.name, default, nested.get(f.name)))
+
+    def from_doc(doc: dict):
+        get = doc.get
+        values = []
+        for name, default, child in specs:
+            value = get(name, default)
+            if child is not None and value:
+                value = [child(item) for item in value]
+            values.append(value)
+        return cls(*values)
+
+    return from_doc
+
+
+def read_model(**nested):
+    """Dataclass com slots mais ``from_doc(doc)``; ``nested`` indica os campos que são listas de outros read models"""
+    def wrap(cls):
+        cls = dataclass(slots=True)(cls)
+        cls.from_doc = staticmethod(_reader(cls, {name: model.from_doc for name, model in nested.items()}))
+        return cls
+    return wrap
+
+
+@read_model()
+class OptionRead:
+    id: str = None
+    text: str = None
+    order: int = 0
+
+
+@read_model(options=OptionRead)
+class QuestionRead:
+    id: str = None
+    type: str = None
+    text: str = None
+    required: bool = True
+    highlighted: bool = False
+    options: Optional[List[OptionRead]] = None
+    min_rating: Optional[int] = 1
+    max_rating: Optional[int] = 5
+    order: int = 0
+
+
+@read_model(questions=QuestionRead)
+class SurveyRead:
+    id: str = None
+    title: str = None
+    description: Optional[str] = None
+    owner_id: str = None
+    owner_name: Optional[str] = None
+    questions: List[QuestionRead] = None
+    is_published: bool = False
+    is_featured: bool = False
+    end_date: Optional[str] = None
+    created_at: str = None
+    updated_at: str = None
+    response_count: int = 0
+    user_has_responded: bool = False
+    survey_number: Optional[int] = None
+
+
+@read_model()
+class UserRead:
+    id: str = None
+    email: str = None
+    name: str = None
+    role: str = None
+    bio: Optional[str] = None
+    avatar_url: Optional[str] = None
+    created_at: str = None
+    phone: Optional[str] = None
+    date_of_birth: Optional[str] = None
+    gender: Optional[str] = None
+    nationality: Optional[str] = None
+    district: Optional[str] = None
+    municipality: Optional[str] = None
+    parish: Optional[str] = None
+    marital_status: Optional[str] = None
+    religion: Optional[str] = None
+    education_level: Optional[str] = None
+    profession: Optional[str] = None
+    lived_abroad: Optional[bool] = None
+    accept_notifications: Optional[bool] = False
+
+
+@read_model()
+class AnswerRead:
+    question_id: str = None
+    value: str = None
+
+
+@read_model(answers=AnswerRead)
+class SurveyAnswerRead:
+    id: str = None
+    survey_id: str = None
+    user_id: Optional[str] = None
+    answers: List[AnswerRead] = None
+    submitted_at: str = None
+
+
+@read_model()
+class SuggestionRead:
+    id: str = None
+    user_id: str = None
+    user_name: Optional[str] = None
+    content: str = None
+    survey_id: Optional[str] = None
+    status: str = "pending"
+    created_at: str = None
+    survey_title: Optional[str] = None
+    survey_description: Optional[str] = None
+    category: Optional[str] = None
+    questions: Optional[List[Any]] = None
+    additional_notes: Optional[str] = None
+
+
+@read_model()
+class TeamApplicationRead:
+    id: str = None
+    user_id: str = None
+    user_name: str = None
+    user_email: str = None
+    message: str = None
+    status: str = "pending"
+    created_at: str = None
@@ -0,0 +1,36 @@
+"""Serialização JSON rápida para os endpoints de leitura.
+
+``FastJSONResponse`` usa orjson (quando instalado) em vez do ``json`` da
+biblioteca padrão e serializa diretamente os read models de ``read_models``:
+os documentos foram validados na escrita, pelo que voltar a construir os
+modelos Pydantic em cada leitura (e o FastAPI revalidá-los no
+``response_model``) é trabalho repetido.
+"""
+import dataclasses
+import json
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+
+def _json_default(obj):
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    return str(obj)
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada com orjson (datetimes, UUIDs e dataclasses suportados nativamente)"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
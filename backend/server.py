@@ -1,13 +1,21 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse, FileResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import DeleteMany, DeleteOne, UpdateOne, ReturnDocument, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import BulkWriteError
+import asyncio
+import base64
 import os
+import time
 import logging
 import csv
+import hashlib
 import io
+import json
+import re
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional, Literal
@@ -17,13 +25,36 @@ import string
 from datetime import datetime, timezone, timedelta
 import jwt
 import bcrypt
+import analytics
+from tally import RatingStats, SurveyTally
+from text_analysis import term_counts
+import archive
+from compression import CompressionMiddleware, base_etag
+from serialization import FastJSONResponse, dumps
+from admission import AdmissionController, AdmissionMiddleware, RouteClass
+from jobs import JobRunner, PeriodicTask
+from publisher import ResultsPublisher
+from ratelimit import Policy, RateLimiter, MemoryBackend, MongoBackend
+from read_models import SurveyRead, UserRead, SurveyAnswerRead, SuggestionRead, TeamApplicationRead
+from observability import (
+    PoolMonitor, LoopLagMonitor, MetricsRegistry, CommandMonitor, MetricsMiddleware,
+    QueryBudgetMiddleware
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+pool_monitor = PoolMonitor(MONGO_MAX_POOL_SIZE)
+loop_lag_monitor = LoopLagMonitor()
+metrics = MetricsRegistry()
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    event_listeners=[pool_monitor, CommandMonitor(metrics)]
+)
 db = client[os.environ['DB_NAME']]
 
 # JWT Settings
@@ -31,8 +62,121 @@ JWT_SECRET = os.environ.get('JWT_SECRET', 'impar-super-secret-key-change-in-prod
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 168  # 7 days
 
+# Readiness Settings (limites acima dos quais o worker deixa de receber tráfego)
+READINESS_PING_TIMEOUT_MS = float(os.environ.get('READINESS_PING_TIMEOUT_MS', '500'))
+READINESS_MAX_DB_LATENCY_MS = float(os.environ.get('READINESS_MAX_DB_LATENCY_MS', '250'))
+READINESS_MAX_LOOP_LAG_MS = float(os.environ.get('READINESS_MAX_LOOP_LAG_MS', '200'))
+READINESS_MAX_POOL_UTILIZATION = float(os.environ.get('READINESS_MAX_POOL_UTILIZATION', '0.9'))
+
+# Metrics Settings (se definido, /api/metrics exige "Authorization: Bearer <token>")
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Compression Settings
+COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+
+# HTTP Cache Settings (apenas para pedidos anónimos; pedidos autenticados usam "private, no-cache")
+PUBLIC_CACHE_MAX_AGE = int(os.environ.get('PUBLIC_CACHE_MAX_AGE', '30'))
+
+# Rate Limit Settings (token bucket por IP e por utilizador; "N/second|minute|hour|day")
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')  # memory | mongo (partilhado entre workers)
+# Número de proxies à frente da app; o IP do cliente é a entrada correspondente do X-Forwarded-For.
+# 0 (omissão) ignora o cabeçalho: sem proxy, qualquer cliente o pode forjar para contornar os limites
+RATE_LIMIT_PROXY_HOPS = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', '0'))
+RATE_LIMIT_DEFAULTS = {
+    "login": {"ip": "20/minute", "user": "10/minute"},
+    "register": {"ip": "10/minute"},
+    "recovery": {"ip": "5/minute", "user": "3/hour"},
+    "reset": {"ip": "10/minute", "user": "5/minute"},
+    "respond": {"ip": "30/minute", "user": "10/minute"},
+}
+# Cada política pode ser redefinida por RATE_LIMIT_<ROTA>_<IP|USER>, p.ex. RATE_LIMIT_LOGIN_IP=50/minute
+RATE_LIMIT_POLICIES = {
+    (route, scope): Policy.parse(
+        f"{route}_{scope}", os.environ.get(f'RATE_LIMIT_{route.upper()}_{scope.upper()}', spec)
+    )
+    for route, scopes in RATE_LIMIT_DEFAULTS.items()
+    for scope, spec in scopes.items()
+}
+
+# Admission Control Settings (pedidos em simultâneo por classe de rota; 503 rápido com a fila cheia)
+ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+ADMISSION_MAX_CONCURRENCY = int(os.environ.get('ADMISSION_MAX_CONCURRENCY', '64'))
+# classe: (prioridade, limite, fila, espera máxima em s); limite e fila redefiníveis por ADMISSION_<CLASSE>_LIMIT/_QUEUE
+ADMISSION_DEFAULTS = {
+    "critical": (0, 64, 256, 5.0),
+    "auth": (1, 8, 32, 3.0),
+    "default": (1, 32, 64, 3.0),
+    "heavy": (2, 2, 4, 1.0),
+}
+ADMISSION_PATTERNS = {
+    # Submeter respostas e leituras públicas têm de sobreviver à sobrecarga
+    "critical": [
+        (("POST",), r"^/api/surveys/[^/]+/respond$"),
+        (("GET", "HEAD"), r"^/api/surveys(/[^/]+(/public-results)?)?$"),
+        (("GET", "HEAD"), r"^/api/my-responses$"),
+    ],
+    # bcrypt
+    "auth": [
+        (("POST", "PUT"), r"^/api/auth/(login|register|request-recovery|reset-with-code|change-password)$"),
+        (("PUT",), r"^/api/admin/users/[^/]+/reset-password$"),
+    ],
+    # Exportações e recálculos: os primeiros a esperar e a ser rejeitados
+    "heavy": [
+        # Só a exportação inline; criar a tarefa de exportação (POST .../csv/jobs) é barato
+        (("GET", "HEAD"), r"^/api/admin/users/export/csv$"),
+        (None, r"^/api/admin/surveys/(import|export)$"),
+        (("GET",), r"^/api/surveys/[^/]+/(analytics|text-search|text-terms)$"),
+    ],
+}
+
+# Background Job Settings (concorrência por tipo redefinível por JOB_CONCURRENCY_<TIPO>)
+JOB_RESULTS_DIR = Path(os.environ.get('JOB_RESULTS_DIR', str(ROOT_DIR / 'job_results')))
+JOB_RESULT_TTL_HOURS = float(os.environ.get('JOB_RESULT_TTL_HOURS', '24'))
+JOB_CONCURRENCY = {"users_csv": 1, "survey_analytics": 2, "rebuild_tallies": 1, "purge_survey": 1, "purge_user": 1,
+                   "archive_survey": 1, "close_survey": 2}
+# Eliminações em cascata: documentos apagados por lote e pausa entre lotes
+PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', '500'))
+PURGE_BATCH_PAUSE_MS = float(os.environ.get('PURGE_BATCH_PAUSE_MS', '50'))
+# Intervalo para relançar eliminações interrompidas (tombstones sem purged_at)
+PURGE_RESUME_INTERVAL_SECONDS = float(os.environ.get('PURGE_RESUME_INTERVAL_SECONDS', '600'))
+
+# Password Recovery Settings
+RECOVERY_SWEEP_INTERVAL_SECONDS = float(os.environ.get('RECOVERY_SWEEP_INTERVAL_SECONDS', '300'))
+# Pedidos expirados ou usados são apagados (índice TTL em purge_at) ao fim deste prazo
+RECOVERY_RETENTION_DAYS = float(os.environ.get('RECOVERY_RETENTION_DAYS', '30'))
+
+# Incremental Aggregates Settings (sondagens anteriores aos acumuladores são reconstruídas por uma tarefa)
+TALLY_BACKFILL_INTERVAL_SECONDS = float(os.environ.get('TALLY_BACKFILL_INTERVAL_SECONDS', '3600'))
+
+# Survey Close Settings (fecho agendado em end_date, com resultados finais congelados)
+SURVEY_CLOSE_INTERVAL_SECONDS = float(os.environ.get('SURVEY_CLOSE_INTERVAL_SECONDS', '60'))
+# Margem após end_date para terminar submissões em curso antes de congelar os resultados
+SURVEY_CLOSE_GRACE_SECONDS = float(os.environ.get('SURVEY_CLOSE_GRACE_SECONDS', '30'))
+
+# Archive Settings (sondagens encerradas há mais de ARCHIVE_AFTER_DAYS saem da coleção responses)
+ARCHIVE_ENABLED = os.environ.get('ARCHIVE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+ARCHIVE_AFTER_DAYS = float(os.environ.get('ARCHIVE_AFTER_DAYS', '7'))
+ARCHIVE_BUCKET_SIZE = int(os.environ.get('ARCHIVE_BUCKET_SIZE', '1000'))
+ARCHIVE_SCAN_INTERVAL_SECONDS = float(os.environ.get('ARCHIVE_SCAN_INTERVAL_SECONDS', '3600'))
+
+# Admin Dashboard Settings (contagens agregadas em cache durante este número de segundos)
+DASHBOARD_CACHE_SECONDS = float(os.environ.get('DASHBOARD_CACHE_SECONDS', '30'))
+
+# Static Results Settings (resultados das sondagens em destaque em JSON estático, servidos pelo nginx/CDN)
+STATIC_RESULTS_ENABLED = os.environ.get('STATIC_RESULTS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+STATIC_RESULTS_DIR = Path(os.environ.get('STATIC_RESULTS_DIR', str(ROOT_DIR / 'static_results')))
+STATIC_RESULTS_DEBOUNCE_SECONDS = float(os.environ.get('STATIC_RESULTS_DEBOUNCE_SECONDS', '10'))
+
+# Debug Settings
+DEBUG = os.environ.get('DEBUG', 'false').lower() in ('1', 'true', 'yes')
+DB_QUERY_BUDGET = int(os.environ.get('DB_QUERY_BUDGET', '25'))
+
 # Create the main app
-app = FastAPI(title="IMPAR Survey API")
+app = FastAPI(title="IMPAR Survey API", default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -203,6 +347,23 @@ class SurveyUpdate(BaseModel):
     is_published: Optional[bool] = None
     is_featured: Optional[bool] = None
 
+# Bulk Import/Export Models
+class SurveyImportItem(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: Optional[str] = None
+    title: str
+    description: Optional[str] = None
+    questions: List[Question] = []
+    is_published: bool = False
+    is_featured: bool = False
+    end_date: Optional[str] = None
+    created_at: Optional[str] = None
+
+class SurveyImportRequest(BaseModel):
+    surveys: List[SurveyImportItem]
+    # preserve: mantém os IDs recebidos (falha se já existirem); remap: gera IDs novos
+    id_mode: Literal["preserve", "remap"] = "remap"
+
 # Response Models
 class Answer(BaseModel):
     question_id: str
@@ -329,10 +490,44 @@ async def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials]
     except:
         return None
 
+# ===================== RATE LIMITING =====================
+
+metrics.describe("rate_limit_decisions_total", "Decisões do rate limiter por política.")
+rate_limiter = RateLimiter(
+    MongoBackend(db.rate_limits) if RATE_LIMIT_BACKEND == "mongo" else MemoryBackend(),
+    metrics
+)
+
+def client_ip(request: Request) -> str:
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and RATE_LIMIT_PROXY_HOPS > 0:
+        hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+        if hops:
+            # A última entrada foi acrescentada pelo nosso proxy; as anteriores podem ser forjadas pelo cliente
+            return hops[-min(RATE_LIMIT_PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else "unknown"
+
+async def enforce_rate_limit(route: str, request: Request, user_key: Optional[str] = None):
+    """429 com Retry-After se o IP (ou o utilizador/email) esgotou o balde da rota"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    keys = [("ip", client_ip(request))]
+    if user_key and (route, "user") in RATE_LIMIT_POLICIES:
+        keys.append(("user", user_key.lower()))
+    for scope, key in keys:
+        allowed, retry_after = await rate_limiter.hit(RATE_LIMIT_POLICIES[(route, scope)], key)
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Demasiados pedidos. Tente novamente mais tarde.",
+                headers={"Retry-After": str(retry_after)}
+            )
+
 # ===================== AUTH ROUTES =====================
 
 @api_router.post("/auth/register", response_model=TokenResponse)
-async def register(user_data: UserCreate):
+async def register(user_data: UserCreate, request: Request):
+    await enforce_rate_limit("register", request)
     existing = await db.users.find_one({"email": user_data.email})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -393,7 +588,8 @@ async def register(user_data: UserCreate):
     )
 
 @api_router.post("/auth/login", response_model=TokenResponse)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, request: Request):
+    await enforce_rate_limit("login", request, credentials.email)
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
     if not user or not verify_password(credentials.password, user.get("password", "")):
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -453,9 +649,26 @@ async def change_password(
 
 # ===================== PASSWORD RECOVERY ROUTES =====================
 
+def _recovery_purge_at() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(days=RECOVERY_RETENTION_DAYS)
+
+async def expire_recovery_requests() -> int:
+    """Marca como expirados, de uma vez, os pedidos pendentes fora de prazo (expires_at é ISO em UTC)"""
+    result = await db.password_recovery.update_many(
+        {"status": "pending", "expires_at": {"$lt": datetime.now(timezone.utc).isoformat()}},
+        {"$set": {"status": "expired", "purge_at": _recovery_purge_at()}}
+    )
+    # Pedidos antigos, anteriores ao purge_at, também entram no prazo de retenção
+    await db.password_recovery.update_many(
+        {"status": {"$in": ["used", "expired"]}, "purge_at": None},
+        {"$set": {"purge_at": _recovery_purge_at()}}
+    )
+    return result.modified_count
+
 @api_router.post("/auth/request-recovery")
-async def request_password_recovery(data: PasswordRecoveryRequest):
+async def request_password_recovery(data: PasswordRecoveryRequest, request: Request):
     """Solicita recuperação de password - gera código para o admin fornecer"""
+    await enforce_rate_limit("recovery", request, data.email)
     # Verificar se o email existe
     user = await db.users.find_one({"email": data.email}, {"_id": 0, "password": 0})
     if not user:
@@ -465,7 +678,7 @@ async def request_password_recovery(data: PasswordRecoveryRequest):
     # Invalidar pedidos anteriores do mesmo utilizador
     await db.password_recovery.update_many(
         {"user_id": user["id"], "status": "pending"},
-        {"$set": {"status": "expired"}}
+        {"$set": {"status": "expired", "purge_at": _recovery_purge_at()}}
     )
     
     # Criar novo pedido de recuperação
@@ -480,60 +693,75 @@ async def request_password_recovery(data: PasswordRecoveryRequest):
     return {"message": "Se o email estiver registado, um pedido de recuperação foi criado. Contacte um administrador para obter o código."}
 
 @api_router.post("/auth/reset-with-code")
-async def reset_password_with_code(data: PasswordRecoveryReset):
+async def reset_password_with_code(data: PasswordRecoveryReset, request: Request):
     """Permite redefinir password usando código de recuperação"""
-    # Buscar pedido de recuperação válido
-    recovery = await db.password_recovery.find_one({
-        "user_email": data.email,
-        "recovery_code": data.recovery_code,
-        "status": "pending"
-    }, {"_id": 0})
-    
-    if not recovery:
-        raise HTTPException(status_code=400, detail="Código de recuperação inválido ou expirado")
-    
-    # Verificar se não expirou
-    expires_at = datetime.fromisoformat(recovery["expires_at"].replace('Z', '+00:00'))
-    if datetime.now(timezone.utc) > expires_at:
-        await db.password_recovery.update_one(
-            {"id": recovery["id"]},
-            {"$set": {"status": "expired"}}
-        )
-        raise HTTPException(status_code=400, detail="Código de recuperação expirado")
-    
+    await enforce_rate_limit("reset", request, data.email)
     # Validar nova password
     if len(data.new_password) < 6:
         raise HTTPException(status_code=400, detail="A palavra-passe deve ter pelo menos 6 caracteres")
     
+    # Consumir o código numa só operação: pendente, dentro do prazo e ainda não usado
+    recovery = await db.password_recovery.find_one_and_update(
+        {
+            "user_email": data.email,
+            "recovery_code": data.recovery_code,
+            "status": "pending",
+            "expires_at": {"$gt": datetime.now(timezone.utc).isoformat()}
+        },
+        {"$set": {"status": "used", "purge_at": _recovery_purge_at()}},
+        projection={"_id": 0, "id": 1}
+    )
+    
+    if not recovery:
+        raise HTTPException(status_code=400, detail="Código de recuperação inválido ou expirado")
+    
     # Atualizar password
     hashed_password = hash_password(data.new_password)
     await db.users.update_one({"email": data.email}, {"$set": {"password": hashed_password}})
     
-    # Marcar código como usado
-    await db.password_recovery.update_one(
-        {"id": recovery["id"]},
-        {"$set": {"status": "used"}}
-    )
-    
     return {"message": "Palavra-passe redefinida com sucesso"}
 
+def _recovery_status_query(status: Optional[str], now: str) -> dict:
+    # Pedidos que expiraram desde a última passagem do sweeper contam como expirados
+    if status == "pending":
+        return {"status": "pending", "expires_at": {"$gte": now}}
+    if status == "expired":
+        return {"$or": [{"status": "expired"}, {"status": "pending", "expires_at": {"$lt": now}}]}
+    return {"status": status} if status else {}
+
 @api_router.get("/admin/password-recovery-requests")
-async def get_password_recovery_requests(admin: dict = Depends(get_admin_user)):
-    """Lista pedidos de recuperação de password para admins"""
-    requests = await db.password_recovery.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
+async def get_password_recovery_requests(
+    response: Response,
+    status: Optional[Literal["pending", "used", "expired"]] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    before: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """Lista pedidos de recuperação de password para admins (mais recentes primeiro).
+    
+    Continua a devolver uma lista; a página seguinte pede-se com ?cursor=<X-Next-Cursor>, o mesmo
+    keyset em (created_at, id) do /admin/inbox. ?before=<X-Next-Before> fica para clientes antigos,
+    mas salta pedidos com o mesmo created_at que o último da página.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    filters = [_recovery_status_query(status, now)]
+    if cursor:
+        filters.append(_decode_inbox_cursor(cursor))
+    elif before:
+        filters.append({"created_at": {"$lt": before}})
+    limit = min(max(limit, 1), 500)
+    requests = await db.password_recovery.find(
+        {"$and": filters}, {"_id": 0, "purge_at": 0}
+    ).sort([("created_at", DESCENDING), ("id", DESCENDING)]).to_list(limit)
     
-    # Verificar e atualizar pedidos expirados
-    now = datetime.now(timezone.utc)
     for req in requests:
-        if req["status"] == "pending":
-            expires_at = datetime.fromisoformat(req["expires_at"].replace('Z', '+00:00'))
-            if now > expires_at:
-                await db.password_recovery.update_one(
-                    {"id": req["id"]},
-                    {"$set": {"status": "expired"}}
-                )
-                req["status"] = "expired"
+        if req["status"] == "pending" and req["expires_at"] < now:
+            req["status"] = "expired"
     
+    if len(requests) == limit:
+        response.headers["X-Next-Cursor"] = _encode_inbox_cursor(requests[-1])
+        response.headers["X-Next-Before"] = requests[-1]["created_at"]
     return requests
 
 @api_router.delete("/admin/password-recovery-requests/{request_id}")
@@ -544,6 +772,57 @@ async def delete_password_recovery_request(request_id: str, admin: dict = Depend
         raise HTTPException(status_code=404, detail="Pedido não encontrado")
     return {"message": "Pedido eliminado"}
 
+# ===================== HTTP CACHING =====================
+
+def make_etag(*parts) -> str:
+    """ETag forte a partir de metadados baratos (updated_at, response_count, tally_version...)"""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:24]
+    return f'"{digest}"'
+
+def cache_control_for(request: Request) -> str:
+    if request.headers.get("authorization"):
+        return "private, no-cache"
+    return f"public, max-age={PUBLIC_CACHE_MAX_AGE}"
+
+def set_cache_headers(response: Response, etag: str, cache_control: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Vary"] = "Authorization, Accept-Encoding"
+
+def not_modified(request: Request, etag: str, cache_control: str) -> Optional[Response]:
+    """Resposta 304 se o If-None-Match do cliente corresponder ao ETag atual"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # Aceita também o ETag da versão comprimida ("...-gzip") devolvido pelo CompressionMiddleware
+    matched = next((t for t in tags if t == "*" or base_etag(t) == etag), None)
+    if matched:
+        response = Response(status_code=304)
+        set_cache_headers(response, etag if matched == "*" else matched, cache_control)
+        return response
+    return None
+
+async def survey_list_etag(query: dict, *extra) -> str:
+    """ETag de uma listagem: agrega contagem, último updated_at e contadores das sondagens filtradas"""
+    stats = await db.surveys.aggregate([
+        {"$match": query},
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "updated_at": {"$max": "$updated_at"},
+            "responses": {"$sum": "$response_count"},
+            "tally": {"$sum": {"$ifNull": ["$tally_version", 0]}}
+        }}
+    ]).to_list(1)
+    # O número das sondagens depende do total existente
+    catalog_size = await db.surveys.estimated_document_count()
+    summary = stats[0] if stats else {}
+    return make_etag(
+        "list", catalog_size, summary.get("count"), summary.get("updated_at"),
+        summary.get("responses"), summary.get("tally"), *extra
+    )
+
 # ===================== SURVEY ROUTES =====================
 
 @api_router.post("/surveys", response_model=SurveyResponse)
@@ -570,18 +849,102 @@ async def create_survey(survey_data: SurveyCreate, current_user: dict = Depends(
         end_date=survey_data.end_date
     )
     
-    await db.surveys.insert_one(survey.model_dump())
+    survey_doc = survey.model_dump()
+    survey_doc["closes_at"] = archive.survey_closes_at(survey.end_date)
+    survey_doc.update(TALLY_READY)
+    await db.surveys.insert_one(survey_doc)
     
     return SurveyResponse(
         **survey.model_dump(),
         owner_name=current_user["name"]
     )
 
+# Campos disponíveis em ?fields= (os de SurveyResponse mais question_count)
+SURVEY_LIST_FIELDS = set(SurveyResponse.model_fields) | {"question_count"}
+SURVEY_SUMMARY_FIELDS = [
+    "id", "title", "description", "owner_id", "owner_name", "is_published", "is_featured",
+    "end_date", "created_at", "updated_at", "response_count", "question_count",
+    "user_has_responded", "survey_number"
+]
+# Campos calculados fora do documento da sondagem
+SURVEY_COMPUTED_FIELDS = {"owner_name", "user_has_responded", "survey_number"}
+
+def _parse_survey_fields(view: str, fields: Optional[str]) -> Optional[List[str]]:
+    """Lista de campos pedidos, ou None para a representação completa"""
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in SURVEY_LIST_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return ["id"] + [f for f in requested if f != "id"]
+    if view == "summary":
+        return SURVEY_SUMMARY_FIELDS
+    return None
+
+async def _survey_numbers() -> dict:
+    """Número de cada sondagem (ordem cronológica de criação)"""
+    all_surveys = await db.surveys.find({}, {"_id": 0, "id": 1, "created_at": 1}).sort("created_at", 1).to_list(10000)
+    return {s["id"]: idx + 1 for idx, s in enumerate(all_surveys)}
+
+async def _owner_names(owner_ids) -> dict:
+    owners = await db.users.find({"id": {"$in": list(set(owner_ids))}}, {"_id": 0, "id": 1, "name": 1}).to_list(None)
+    return {o["id"]: o["name"] for o in owners}
+
+async def _responded_survey_ids(user_id: str, survey_ids) -> set:
+    responses = await db.responses.find(
+        {"user_id": user_id, "survey_id": {"$in": list(survey_ids)}}, {"_id": 0, "survey_id": 1}
+    ).to_list(None)
+    return {r["survey_id"] for r in responses}
+
+async def _fill_survey_computed_fields(surveys: list, wanted, current_user: Optional[dict]):
+    """Preenche owner_name, survey_number e user_has_responded com uma query por campo (sem N+1)"""
+    if not surveys:
+        return
+    if "owner_name" in wanted:
+        names = await _owner_names(s["owner_id"] for s in surveys)
+        for s in surveys:
+            s["owner_name"] = names.get(s["owner_id"])
+    if "survey_number" in wanted:
+        numbers = await _survey_numbers()
+        for s in surveys:
+            s["survey_number"] = numbers.get(s["id"], 0)
+    if "user_has_responded" in wanted:
+        responded = await _responded_survey_ids(current_user["id"], [s["id"] for s in surveys]) if current_user else set()
+        for s in surveys:
+            s["user_has_responded"] = s["id"] in responded
+
+async def _projected_survey_list(query: dict, fields: List[str], current_user: Optional[dict], sort_desc: bool = True) -> FastJSONResponse:
+    """Lista de sondagens só com os campos pedidos; a projeção é feita no MongoDB e as perguntas não são serializadas"""
+    project = {"_id": 0}
+    stored = [f for f in fields if f not in SURVEY_COMPUTED_FIELDS and f != "question_count"]
+    for f in stored:
+        project[f] = 1
+    if "question_count" in fields:
+        project["question_count"] = {"$size": {"$ifNull": ["$questions", []]}}
+    # owner_id é necessário para calcular owner_name
+    if "owner_name" in fields and "owner_id" not in fields:
+        project["owner_id"] = 1
+    
+    pipeline = [{"$match": query}]
+    if sort_desc:
+        pipeline.append({"$sort": {"created_at": -1}})
+    pipeline += [{"$limit": 100}, {"$project": project}]
+    surveys = await db.surveys.aggregate(pipeline).to_list(100)
+    
+    await _fill_survey_computed_fields(surveys, set(fields), current_user)
+    if "owner_name" in fields and "owner_id" not in fields:
+        for s in surveys:
+            s.pop("owner_id", None)
+    return FastJSONResponse(content=surveys)
+
 @api_router.get("/surveys", response_model=List[SurveyResponse])
 async def get_surveys(
+    request: Request,
     featured: Optional[bool] = None,
     published: Optional[bool] = None,
     owner_id: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
     current_user: Optional[dict] = Depends(get_optional_user)
 ):
     query = {}
@@ -592,48 +955,60 @@ async def get_surveys(
     if owner_id:
         query["owner_id"] = owner_id
     
-    # Buscar todas as sondagens para calcular números
-    all_surveys = await db.surveys.find({}, {"_id": 0, "id": 1, "created_at": 1}).sort("created_at", 1).to_list(10000)
+    selected_fields = _parse_survey_fields(view, fields)
     
-    # Criar mapeamento de id para número (ordem cronológica)
-    survey_numbers = {s["id"]: idx + 1 for idx, s in enumerate(all_surveys)}
+    cache_control = cache_control_for(request)
+    etag = await survey_list_etag(
+        query, view, fields, current_user["id"] if current_user else None
+    )
+    cached = not_modified(request, etag, cache_control)
+    if cached:
+        return cached
+    
+    if selected_fields:
+        result = await _projected_survey_list(query, selected_fields, current_user)
+        set_cache_headers(result, etag, cache_control)
+        return result
     
     # Buscar sondagens filtradas e ordenadas (mais recente primeiro)
     surveys = await db.surveys.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
+    await _fill_survey_computed_fields(surveys, SURVEY_COMPUTED_FIELDS, current_user)
     
-    result = []
-    for s in surveys:
-        owner = await db.users.find_one({"id": s["owner_id"]}, {"_id": 0, "name": 1})
-        s["owner_name"] = owner["name"] if owner else None
-        
-        # Adicionar número da sondagem
-        s["survey_number"] = survey_numbers.get(s["id"], 0)
-        
-        # Adicionar flag se o utilizador já respondeu
-        if current_user:
-            response = await db.responses.find_one({
-                "survey_id": s["id"],
-                "user_id": current_user["id"]
-            }, {"_id": 0})
-            s["user_has_responded"] = response is not None
-        else:
-            s["user_has_responded"] = False
-            
-        result.append(SurveyResponse(**s))
-    
+    result = FastJSONResponse(content=[SurveyRead.from_doc(s) for s in surveys])
+    set_cache_headers(result, etag, cache_control)
     return result
 
 @api_router.get("/surveys/my", response_model=List[SurveyResponse])
-async def get_my_surveys(current_user: dict = Depends(get_current_user)):
-    surveys = await db.surveys.find({"owner_id": current_user["id"]}, {"_id": 0}).to_list(100)
-    return [SurveyResponse(**s, owner_name=current_user["name"]) for s in surveys]
+async def get_my_surveys(
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    query = {"owner_id": current_user["id"]}
+    selected_fields = _parse_survey_fields(view, fields)
+    if selected_fields:
+        return await _projected_survey_list(query, selected_fields, current_user, sort_desc=False)
+    
+    surveys = await db.surveys.find(query, {"_id": 0}).to_list(100)
+    for s in surveys:
+        s["owner_name"] = current_user["name"]
+    return FastJSONResponse(content=[SurveyRead.from_doc(s) for s in surveys])
 
 @api_router.get("/surveys/{survey_id}", response_model=SurveyResponse)
-async def get_survey(survey_id: str):
+async def get_survey(survey_id: str, request: Request):
     survey = await db.surveys.find_one({"id": survey_id}, {"_id": 0})
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
     
+    cache_control = cache_control_for(request)
+    etag = make_etag(
+        "survey", survey_id, survey.get("updated_at"), survey.get("response_count"),
+        await db.surveys.estimated_document_count()
+    )
+    cached = not_modified(request, etag, cache_control)
+    if cached:
+        return cached
+    
     owner = await db.users.find_one({"id": survey["owner_id"]}, {"_id": 0, "name": 1})
     survey["owner_name"] = owner["name"] if owner else None
     
@@ -643,7 +1018,9 @@ async def get_survey(survey_id: str):
     survey["survey_number"] = survey_numbers.get(survey["id"], 0)
     survey["user_has_responded"] = False
     
-    return SurveyResponse(**survey)
+    result = FastJSONResponse(content=SurveyRead.from_doc(survey))
+    set_cache_headers(result, etag, cache_control)
+    return result
 
 @api_router.put("/surveys/{survey_id}", response_model=SurveyResponse)
 async def update_survey(survey_id: str, update: SurveyUpdate, current_user: dict = Depends(get_current_user)):
@@ -680,6 +1057,7 @@ async def update_survey(survey_id: str, update: SurveyUpdate, current_user: dict
     update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     await db.surveys.update_one({"id": survey_id}, {"$set": update_data})
+    schedule_static_results(survey_id)
     
     updated = await db.surveys.find_one({"id": survey_id}, {"_id": 0})
     return SurveyResponse(**updated, owner_name=current_user["name"])
@@ -693,10 +1071,23 @@ async def delete_survey(survey_id: str, current_user: dict = Depends(get_current
     if survey["owner_id"] != current_user["id"] and current_user["role"] not in ["admin", "owner"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    # A sondagem sai logo das leituras; as respostas e agregados são apagados em lotes em segundo plano
+    await db.deleted_surveys.insert_one({
+        **survey, "deleted_at": datetime.now(timezone.utc).isoformat(), "deleted_by": current_user["id"]
+    })
     await db.surveys.delete_one({"id": survey_id})
-    await db.responses.delete_many({"survey_id": survey_id})
+    job = await job_runner.submit(
+        "purge_survey", {"survey_id": survey_id}, created_by=current_user["id"], dedupe=True
+    )
+    await db.deleted_surveys.update_one({"id": survey_id}, {"$set": {"purge_job_id": job["id"]}})
+    if results_publisher is not None:
+        # Melhor esforço: uma falha nos ficheiros estáticos não pode interromper a eliminação
+        try:
+            results_publisher.remove(survey_id)
+        except Exception:
+            logger.exception(f"Could not remove static results for survey {survey_id}")
     
-    return {"message": "Survey deleted"}
+    return {"message": "Survey deleted", "job_id": job["id"]}
 
 @api_router.put("/surveys/{survey_id}/toggle-featured")
 async def toggle_survey_featured(survey_id: str, admin: dict = Depends(get_admin_user)):
@@ -708,19 +1099,538 @@ async def toggle_survey_featured(survey_id: str, admin: dict = Depends(get_admin
     new_featured_status = not survey.get("is_featured", False)
     await db.surveys.update_one(
         {"id": survey_id}, 
-        {"$set": {"is_featured": new_featured_status}}
+        {"$set": {"is_featured": new_featured_status, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    # Publica ou remove os resultados estáticos
+    schedule_static_results(survey_id)
     
     return {"message": "Featured status updated", "is_featured": new_featured_status}
 
+# ===================== INCREMENTAL AGGREGATES =====================
+
+# Sondagens novas não têm respostas: os acumuladores começam completos
+TALLY_READY = {"rating_stats_ready": True, "text_index_ready": True, "term_index_ready": True}
+
+def _stats_bucket(submitted_at: str) -> str:
+    """Bucket diário (YYYY-MM-DD, UTC) usado para agregar estatísticas ao longo do tempo"""
+    return submitted_at[:10]
+
+def _rating_stat_updates(survey: dict, answers: list, bucket: str, sign: int) -> list:
+    rating_questions = {q["id"] for q in survey.get("questions", []) if q["type"] == "rating"}
+    updates = []
+    for ans in answers:
+        value = ans["value"]
+        if ans["question_id"] not in rating_questions or not value.isdigit():
+            continue
+        rating = int(value)
+        updates.append(UpdateOne(
+            {"survey_id": survey["id"], "question_id": ans["question_id"], "bucket": bucket},
+            {"$inc": {
+                "n": sign,
+                "sum": sign * rating,
+                "sumsq": sign * rating * rating,
+                f"hist.{rating}": sign
+            }},
+            upsert=True
+        ))
+    return updates
+
+async def update_rating_stats(survey: dict, new_response: dict, old_response: Optional[dict] = None):
+    """Atualiza os acumuladores de rating persistidos: +1 para a resposta nova, -1 para a substituída"""
+    updates = _rating_stat_updates(survey, new_response["answers"], _stats_bucket(new_response["submitted_at"]), 1)
+    if old_response:
+        updates += _rating_stat_updates(
+            survey, old_response.get("answers", []), _stats_bucket(old_response["submitted_at"]), -1
+        )
+    if updates:
+        await db.rating_stats.bulk_write(updates, ordered=False)
+
+async def _bump_tally(survey: dict, inc: dict) -> bool:
+    """Incrementa tally_version (e ``inc``) e diz se os acumuladores de rating devem ser atualizados.
+
+    Enquanto rating_stats_ready é falso a reconstrução é a única a escrever em rating_stats. Se a
+    reconstrução terminou durante o pedido (flag ou rating_stats_epoch mudaram desde que a sondagem
+    foi lida) não se sabe se a resposta entrou na leitura dela: volta a marcar-se para reconstruir.
+    """
+    after = await db.surveys.find_one_and_update(
+        {"id": survey["id"]},
+        {"$inc": {**inc, "tally_version": 1}},
+        projection={"_id": 0, "rating_stats_ready": 1, "rating_stats_epoch": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if not after or not after.get("rating_stats_ready"):
+        return False
+    if survey.get("rating_stats_ready") and survey.get("rating_stats_epoch", 0) == after.get("rating_stats_epoch", 0):
+        return True
+    await db.surveys.update_one(
+        {"id": survey["id"]}, {"$set": {"rating_stats_ready": False}, "$inc": {"rating_stats_epoch": 1}}
+    )
+    await job_runner.submit("rebuild_tallies", {"survey_id": survey["id"]}, dedupe=True)
+    return False
+
+def _text_answer_docs(survey: dict, response: dict) -> list:
+    text_questions = {q["id"] for q in survey.get("questions", []) if q["type"] == "text"}
+    return [
+        {
+            "survey_id": survey["id"],
+            "question_id": ans["question_id"],
+            "response_id": response["id"],
+            "user_id": response.get("user_id"),
+            "value": ans["value"],
+            "submitted_at": response["submitted_at"]
+        }
+        for ans in response.get("answers", [])
+        if ans["question_id"] in text_questions and ans["value"].strip()
+    ]
+
+async def sync_text_answers(survey: dict, response: dict):
+    """Mantém a coleção text_answers (com índice de texto) sincronizada com uma resposta"""
+    docs = _text_answer_docs(survey, response)
+    # Um documento por (resposta, pergunta), escrito com upsert: repetir a operação não duplica
+    ops = [DeleteMany({"response_id": response["id"], "question_id": {"$nin": [d["question_id"] for d in docs]}})]
+    ops += [
+        UpdateOne({"response_id": d["response_id"], "question_id": d["question_id"]}, {"$set": d}, upsert=True)
+        for d in docs
+    ]
+    await db.text_answers.bulk_write(ops)
+
+async def rebuild_text_answers(survey: dict):
+    """Reindexa as respostas de texto de uma sondagem a partir das respostas guardadas"""
+    # Só se apagam documentos que já existiam antes da leitura (os das submissões em curso ficam)
+    existing = {}
+    async for doc in db.text_answers.find({"survey_id": survey["id"]}, {"_id": 1, "response_id": 1, "question_id": 1}):
+        existing.setdefault((doc["response_id"], doc["question_id"]), []).append(doc["_id"])
+    ops = []
+    async for resp in iter_survey_responses(survey, {"_id": 0, "id": 1, "user_id": 1, "answers": 1, "submitted_at": 1}):
+        for doc in _text_answer_docs(survey, resp):
+            ids = existing.pop((doc["response_id"], doc["question_id"]), [])
+            key = {"_id": ids[0]} if ids else {"response_id": doc["response_id"], "question_id": doc["question_id"]}
+            ops.append(UpdateOne(key, {"$set": doc}, upsert=True))
+            # Duplicados deixados por versões anteriores
+            ops += [DeleteOne({"_id": _id}) for _id in ids[1:]]
+        if len(ops) >= 1000:
+            await db.text_answers.bulk_write(ops, ordered=False)
+            ops = []
+    ops += [DeleteOne({"_id": _id}) for ids in existing.values() for _id in ids]
+    for i in range(0, len(ops), 1000):
+        await db.text_answers.bulk_write(ops[i:i + 1000], ordered=False)
+    await db.surveys.update_one({"id": survey["id"]}, {"$set": {"text_index_ready": True}})
+
+def _term_updates(survey: dict, response: dict, sign: int) -> dict:
+    """Incrementos de frequência por (pergunta, termo) das respostas de texto de uma resposta"""
+    text_questions = {q["id"] for q in survey.get("questions", []) if q["type"] == "text"}
+    deltas = {}
+    for ans in response.get("answers", []):
+        if ans["question_id"] in text_questions:
+            for term, count in term_counts(ans["value"]).items():
+                key = (ans["question_id"], term)
+                deltas[key] = deltas.get(key, 0) + sign * count
+    return deltas
+
+async def update_term_frequencies(survey: dict, new_response: dict, old_response: Optional[dict] = None):
+    """Mantém as tabelas de frequência de termos por pergunta de texto (incrementais, sem re-tokenizar tudo)"""
+    deltas = _term_updates(survey, new_response, 1)
+    if old_response:
+        for key, delta in _term_updates(survey, old_response, -1).items():
+            deltas[key] = deltas.get(key, 0) + delta
+    await _apply_term_deltas(survey["id"], deltas)
+
+async def _apply_term_deltas(survey_id: str, deltas: dict):
+    updates = [
+        UpdateOne(
+            {"survey_id": survey_id, "question_id": q_id, "term": term},
+            {"$inc": {"count": delta}, "$setOnInsert": {"ngram": term.count(" ") + 1}},
+            upsert=True
+        )
+        for (q_id, term), delta in deltas.items() if delta
+    ]
+    if updates:
+        await db.term_frequencies.bulk_write(updates, ordered=False)
+
+async def remove_response_aggregates(survey: dict, responses: list):
+    """Desconta respostas apagadas dos acumuladores incrementais, do índice de texto e do response_count"""
+    rating_updates = []
+    term_deltas = {}
+    for resp in responses:
+        rating_updates += _rating_stat_updates(
+            survey, resp.get("answers", []), _stats_bucket(resp.get("submitted_at", "")), -1
+        )
+        for key, delta in _term_updates(survey, resp, -1).items():
+            term_deltas[key] = term_deltas.get(key, 0) + delta
+    if await _bump_tally(survey, {"response_count": -len(responses)}) and rating_updates:
+        await db.rating_stats.bulk_write(rating_updates, ordered=False)
+    await _apply_term_deltas(survey["id"], term_deltas)
+    await db.text_answers.delete_many({"response_id": {"$in": [r["id"] for r in responses]}})
+
+async def rebuild_term_frequencies(survey: dict):
+    """Recalcula as tabelas de frequência de termos de uma sondagem"""
+    existing = {
+        (doc["question_id"], doc["term"]): doc["_id"]
+        async for doc in db.term_frequencies.find({"survey_id": survey["id"]}, {"_id": 1, "question_id": 1, "term": 1})
+    }
+    totals = {}
+    async for resp in iter_survey_responses(survey, {"_id": 0, "answers": 1}):
+        for key, delta in _term_updates(survey, resp, 1).items():
+            totals[key] = totals.get(key, 0) + delta
+    
+    # Como nos ratings: $set com upsert e remoção só dos termos que existiam antes da leitura
+    updates = [
+        UpdateOne(
+            {"survey_id": survey["id"], "question_id": q_id, "term": term},
+            {"$set": {"ngram": term.count(" ") + 1, "count": count}},
+            upsert=True
+        )
+        for (q_id, term), count in totals.items()
+    ]
+    updates += [DeleteOne({"_id": _id}) for key, _id in existing.items() if key not in totals]
+    for i in range(0, len(updates), 1000):
+        await db.term_frequencies.bulk_write(updates[i:i + 1000], ordered=False)
+    await db.surveys.update_one({"id": survey["id"]}, {"$set": {"term_index_ready": True}})
+
+async def _rating_values(survey: dict, question_ids: set, from_bucket: Optional[str] = None, to_bucket: Optional[str] = None):
+    """(pergunta, bucket, valor) de cada resposta rating guardada, opcionalmente só num intervalo de buckets"""
+    async for resp in iter_survey_responses(survey, {"_id": 0, "answers": 1, "submitted_at": 1}):
+        bucket = _stats_bucket(resp.get("submitted_at", ""))
+        if (from_bucket and bucket < from_bucket) or (to_bucket and bucket > to_bucket):
+            continue
+        for ans in resp.get("answers", []):
+            if ans["question_id"] in question_ids and ans["value"].isdigit():
+                yield ans["question_id"], bucket, int(ans["value"])
+
+async def rebuild_rating_stats(survey: dict):
+    """Recalcula os acumuladores de rating de uma sondagem a partir das respostas guardadas"""
+    rating_questions = {q["id"] for q in survey.get("questions", []) if q["type"] == "rating"}
+    # Desliga as atualizações incrementais (ver _bump_tally): daqui em diante só esta tarefa escreve
+    await db.surveys.update_one(
+        {"id": survey["id"]}, {"$set": {"rating_stats_ready": False}, "$inc": {"rating_stats_epoch": 1}}
+    )
+    for _ in range(3):
+        current = await db.surveys.find_one({"id": survey["id"]}, {"_id": 0, "tally_version": 1})
+        if not current:
+            return
+        existing = {
+            (doc["question_id"], doc["bucket"]): doc["_id"]
+            async for doc in db.rating_stats.find({"survey_id": survey["id"]}, {"_id": 1, "question_id": 1, "bucket": 1})
+        }
+        buckets = {}
+        async for q_id, bucket, value in _rating_values(survey, rating_questions):
+            buckets.setdefault((q_id, bucket), RatingStats()).add(value)
+        
+        updates = [
+            UpdateOne(
+                {"survey_id": survey["id"], "question_id": q_id, "bucket": bucket}, {"$set": stats.to_doc()}, upsert=True
+            )
+            for (q_id, bucket), stats in buckets.items()
+        ]
+        updates += [
+            DeleteOne({"_id": _id}) for key, _id in existing.items() if key not in buckets
+        ]
+        for i in range(0, len(updates), 1000):
+            await db.rating_stats.bulk_write(updates[i:i + 1000], ordered=False)
+        # Só fica pronto se nenhuma resposta entrou ou saiu durante a leitura; senão volta a ler
+        result = await db.surveys.update_one(
+            {"id": survey["id"], "tally_version": current.get("tally_version")},
+            {"$set": {"rating_stats_ready": True}}
+        )
+        if result.matched_count:
+            return
+    raise RuntimeError("Survey kept receiving responses during the rating stats rebuild")
+
+# ===================== BULK IMPORT/EXPORT =====================
+
+SURVEY_EXPORT_FIELDS = ["id", "title", "description", "questions", "is_published", "is_featured", "end_date", "created_at"]
+SURVEY_IMPORT_MAX = 1000
+# IDs preservados acabam em URLs e nomes de ficheiros (resultados estáticos): só caracteres seguros
+SURVEY_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+@api_router.post("/admin/surveys/import")
+async def import_surveys(data: SurveyImportRequest, admin: dict = Depends(get_admin_user)):
+    """Importa definições de sondagens em lote (validação numa só passagem, escrita com insert_many)"""
+    if not data.surveys:
+        raise HTTPException(status_code=400, detail="No surveys to import")
+    if len(data.surveys) > SURVEY_IMPORT_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {SURVEY_IMPORT_MAX} surveys per import")
+    
+    remap = data.id_mode == "remap"
+    errors = []
+    if not remap:
+        seen = set()
+        for i, item in enumerate(data.surveys):
+            if not item.id:
+                errors.append({"index": i, "error": "Missing id (required with id_mode=preserve)"})
+            elif not SURVEY_ID_PATTERN.match(item.id):
+                errors.append({"index": i, "error": "Invalid survey id (letters, digits, '-' and '_' only)"})
+            elif item.id in seen:
+                errors.append({"index": i, "error": f"Duplicate survey id {item.id}"})
+            else:
+                seen.add(item.id)
+        existing = await db.surveys.find({"id": {"$in": list(seen)}}, {"_id": 0, "id": 1}).to_list(len(seen))
+        for doc in existing:
+            errors.append({"id": doc["id"], "error": "Survey id already exists"})
+        # Uma eliminação pendente apagaria as respostas da sondagem reimportada
+        deleted = await db.deleted_surveys.find({"id": {"$in": list(seen)}}, {"_id": 0, "id": 1}).to_list(len(seen))
+        for doc in deleted:
+            errors.append({"id": doc["id"], "error": "Survey id belongs to a deleted survey"})
+    if errors:
+        raise HTTPException(status_code=400, detail={"message": "Import validation failed", "errors": errors})
+    
+    now = datetime.now(timezone.utc).isoformat()
+    docs = []
+    id_map = {}
+    for item in data.surveys:
+        survey_id = str(uuid.uuid4()) if remap else item.id
+        if item.id:
+            id_map[item.id] = survey_id
+        questions = []
+        for i, q in enumerate(item.questions):
+            q_dict = q.model_dump()
+            q_dict["order"] = i
+            if remap:
+                q_dict["id"] = str(uuid.uuid4())
+            if q_dict["options"]:
+                for j, opt in enumerate(q_dict["options"]):
+                    opt["order"] = j
+                    if remap:
+                        opt["id"] = str(uuid.uuid4())
+            questions.append(q_dict)
+        docs.append({
+            "id": survey_id,
+            "title": item.title,
+            "description": item.description,
+            "owner_id": admin["id"],
+            "questions": questions,
+            "is_published": item.is_published,
+            "is_featured": item.is_featured,
+            "end_date": item.end_date,
+            "closes_at": archive.survey_closes_at(item.end_date),
+            **TALLY_READY,
+            "created_at": item.created_at or now,
+            "updated_at": now,
+            "response_count": 0
+        })
+    
+    try:
+        await db.surveys.insert_many(docs)
+    except BulkWriteError as e:
+        # Outro pedido criou um destes ids entre a verificação e a escrita: a importação é tudo ou nada,
+        # por isso apagam-se (pelo _id que o driver lhes atribuiu) os documentos já inseridos
+        failed = e.details["writeErrors"][0]["index"]
+        inserted = [d["_id"] for d in docs[:failed]]
+        if inserted:
+            await db.surveys.delete_many({"_id": {"$in": inserted}})
+        raise HTTPException(status_code=409, detail={
+            "message": "Import conflicted with a concurrent write; nothing was imported",
+            "errors": [{"id": docs[failed]["id"], "error": "Survey id already exists"}]
+        })
+    
+    return {
+        "imported": len(docs),
+        "id_mode": data.id_mode,
+        "ids": [d["id"] for d in docs],
+        "id_map": id_map
+    }
+
+@api_router.get("/admin/surveys/export")
+async def export_surveys(
+    ids: Optional[str] = None,
+    published: Optional[bool] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """Exporta definições de sondagens em JSON (formato aceite pelo import), em streaming"""
+    query = {}
+    if ids:
+        query["id"] = {"$in": [i for i in ids.split(",") if i]}
+    if published is not None:
+        query["is_published"] = published
+    
+    projection = {"_id": 0, **{f: 1 for f in SURVEY_EXPORT_FIELDS}}
+    
+    async def generate():
+        yield '{"version": 1, "exported_at": ' + json.dumps(datetime.now(timezone.utc).isoformat()) + ', "surveys": ['
+        first = True
+        async for survey in db.surveys.find(query, projection).sort("created_at", 1):
+            yield ("" if first else ",") + json.dumps(survey, ensure_ascii=False)
+            first = False
+        yield "]}"
+    
+    filename = f"impar_sondagens_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.json"
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/json",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}"
+        }
+    )
+
+# ===================== ARCHIVE =====================
+
+async def iter_survey_responses(survey: dict, projection: Optional[dict] = None):
+    """Respostas de uma sondagem, da coleção responses ou, se arquivada, dos lotes comprimidos"""
+    if survey.get("archive_state") == "archived":
+        async for bucket in db.response_archives.find({"survey_id": survey["id"]}, {"_id": 0, "data": 1}).sort("bucket", 1):
+            for resp in archive.unpack(bucket["data"]):
+                yield resp
+        return
+    async for resp in db.responses.find({"survey_id": survey["id"]}, projection or {"_id": 0}):
+        yield resp
+
+async def load_survey_responses(survey: dict, limit: int, newest_first: bool = False) -> list:
+    if survey.get("archive_state") != "archived":
+        cursor = db.responses.find({"survey_id": survey["id"]}, {"_id": 0})
+        if newest_first:
+            cursor = cursor.sort("submitted_at", -1)
+        return await cursor.to_list(limit)
+    # Os lotes estão por ordem de submissão
+    responses = [r async for r in iter_survey_responses(survey)]
+    if newest_first:
+        responses.reverse()
+    return responses[:limit]
+
+async def archived_responses_for_user(user_id: str) -> list:
+    """Respostas arquivadas de um utilizador (só descomprime os lotes que o contêm)"""
+    responses = []
+    async for bucket in db.response_archives.find({"user_ids": user_id}, {"_id": 0, "data": 1}):
+        responses.extend(r for r in archive.unpack(bucket["data"]) if r.get("user_id") == user_id)
+    return responses
+
+async def freeze_survey_results(survey: dict) -> dict:
+    """Fecha a sondagem e guarda o snapshot final dos resultados (nunca reescrito depois de criado)"""
+    survey_id = survey["id"]
+    snapshot = await db.survey_snapshots.find_one({"survey_id": survey_id}, {"_id": 0})
+    if not snapshot:
+        tally = SurveyTally(survey.get("questions", []))
+        async for resp in iter_survey_responses(survey, {"_id": 0, "answers": 1}):
+            tally.add(resp)
+        snapshot = {
+            "survey_id": survey_id,
+            "total_responses": tally.total_responses,
+            "public_results": analytics.format_public_results(tally, False),
+            "public_results_admin": analytics.format_public_results(tally, True),
+            "global_results": analytics.format_global_results(tally),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        # Dois workers a fechar a mesma sondagem: fica o primeiro snapshot
+        await db.survey_snapshots.update_one({"survey_id": survey_id}, {"$setOnInsert": snapshot}, upsert=True)
+    await db.surveys.update_one(
+        {"id": survey_id, "closed_at": None}, {"$set": {"closed_at": snapshot["created_at"]}}
+    )
+    schedule_static_results(survey_id)
+    return snapshot
+
+async def close_survey_job(ctx) -> dict:
+    survey = await db.surveys.find_one({"id": ctx.params["survey_id"]}, {"_id": 0})
+    if not survey:
+        raise ValueError("Survey not found")
+    snapshot = await freeze_survey_results(survey)
+    return {"survey_id": survey["id"], "total_responses": snapshot["total_responses"]}
+
+async def close_due_surveys():
+    """Fecha as sondagens cuja end_date já passou (mais a margem SURVEY_CLOSE_GRACE_SECONDS)"""
+    # Sondagens anteriores ao campo closes_at: calculá-lo uma vez a partir de end_date
+    async for survey in db.surveys.find(
+        {"end_date": {"$nin": [None, ""]}, "closes_at": {"$exists": False}}, {"_id": 0, "id": 1, "end_date": 1}
+    ):
+        await db.surveys.update_one(
+            {"id": survey["id"]}, {"$set": {"closes_at": archive.survey_closes_at(survey["end_date"])}}
+        )
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=SURVEY_CLOSE_GRACE_SECONDS)
+    async for survey in db.surveys.find({"closes_at": {"$lte": cutoff}, "closed_at": None}, {"_id": 0, "id": 1}):
+        await job_runner.submit("close_survey", {"survey_id": survey["id"]}, dedupe=True)
+
+async def archive_survey_job(ctx) -> dict:
+    """Move as respostas de uma sondagem fechada para lotes comprimidos e apaga-as da coleção responses"""
+    survey_id = ctx.params["survey_id"]
+    survey = await db.surveys.find_one({"id": survey_id}, {"_id": 0})
+    if not survey:
+        raise ValueError("Survey not found")
+    total = survey.get("response_count", 0)
+    
+    if not survey.get("closed_at"):
+        await freeze_survey_results(survey)
+    
+    if survey.get("archive_state") != "archived":
+        # Uma tentativa anterior interrompida recomeça do zero
+        await db.surveys.update_one({"id": survey_id}, {"$set": {"archive_state": "archiving"}})
+        await db.response_archives.delete_many({"survey_id": survey_id})
+        archived = 0
+        bucket_index = 0
+        batch = []
+        cursor = db.responses.find({"survey_id": survey_id}, {"_id": 0}).sort("submitted_at", 1)
+        async for resp in cursor:
+            batch.append(resp)
+            if len(batch) >= ARCHIVE_BUCKET_SIZE:
+                await db.response_archives.insert_one(archive.bucket_doc(survey_id, bucket_index, batch))
+                archived += len(batch)
+                bucket_index += 1
+                batch = []
+                await ctx.progress(archived, total)
+        if batch:
+            await db.response_archives.insert_one(archive.bucket_doc(survey_id, bucket_index, batch))
+            archived += len(batch)
+        
+        await db.surveys.update_one({"id": survey_id}, {"$set": {
+            "archive_state": "archived",
+            "archived_at": datetime.now(timezone.utc).isoformat(),
+            "archived_response_count": archived
+        }})
+    
+    # As leituras já usam o arquivo: apagar as respostas da coleção principal em lotes
+    await _delete_in_batches(db.responses, {"survey_id": survey_id})
+    await db.surveys.update_one(
+        {"id": survey_id}, {"$set": {"archive_purged_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    await ctx.progress(total, total, force=True)
+    return {"survey_id": survey_id, "buckets": await db.response_archives.count_documents({"survey_id": survey_id})}
+
+async def archive_closed_surveys():
+    """Lança o arquivo das sondagens encerradas há mais de ARCHIVE_AFTER_DAYS"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=ARCHIVE_AFTER_DAYS)
+    async for survey in db.surveys.find({"closes_at": {"$lt": cutoff}, "archive_purged_at": None}, {"_id": 0, "id": 1}):
+        await job_runner.submit("archive_survey", {"survey_id": survey["id"]}, dedupe=True)
+
+# ===================== STATIC RESULTS =====================
+
+async def compute_public_results(survey: dict, is_admin: bool) -> dict:
+    # Sondagens fechadas: resultados congelados no momento do fecho
+    if survey.get("closed_at") or survey.get("archive_state") == "archived":
+        snapshot = await db.survey_snapshots.find_one({"survey_id": survey["id"]}, {"_id": 0})
+        if snapshot:
+            return snapshot["public_results_admin" if is_admin else "public_results"]
+    responses = await db.responses.find({"survey_id": survey["id"]}, {"_id": 0}).to_list(1000)
+    return analytics.public_results(survey, responses, is_admin)
+
+def public_results_version(survey: dict) -> str:
+    """Versão dos resultados públicos (o mesmo valor do ETag enviado a visitantes anónimos)"""
+    return make_etag(
+        "results", survey["id"], survey.get("updated_at"), survey.get("response_count"),
+        survey.get("tally_version", 0), False
+    ).strip('"')
+
+async def render_static_results(survey_id: str):
+    survey = await db.surveys.find_one({"id": survey_id}, {"_id": 0})
+    if not survey or not survey.get("is_published") or not survey.get("is_featured"):
+        return None
+    return public_results_version(survey), dumps(await compute_public_results(survey, False))
+
+results_publisher = ResultsPublisher(
+    STATIC_RESULTS_DIR, render_static_results, debounce=STATIC_RESULTS_DEBOUNCE_SECONDS
+) if STATIC_RESULTS_ENABLED else None
+
+def schedule_static_results(survey_id: str):
+    if results_publisher is not None:
+        results_publisher.schedule(survey_id)
+
 # ===================== RESPONSE ROUTES =====================
 
 @api_router.post("/surveys/{survey_id}/respond", response_model=SurveyAnswer)
 async def submit_response(
     survey_id: str,
     response_data: SurveyAnswerCreate,
+    request: Request,
     current_user: Optional[dict] = Depends(get_optional_user)
 ):
+    await enforce_rate_limit("respond", request, current_user["id"] if current_user else None)
     survey = await db.surveys.find_one({"id": survey_id}, {"_id": 0})
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
@@ -728,6 +1638,10 @@ async def submit_response(
     if not survey.get("is_published"):
         raise HTTPException(status_code=400, detail="Survey is not published")
     
+    # Verificação só sobre o documento já lido: end_date passada, fecho agendado ou arquivo
+    if archive.survey_is_closed(survey):
+        raise HTTPException(status_code=400, detail="Survey is closed")
+    
     # Verificar se o utilizador já respondeu a esta sondagem
     user_id = current_user["id"] if current_user else None
     existing_response = None
@@ -743,23 +1657,34 @@ async def submit_response(
         user_id=user_id,
         answers=response_data.answers
     )
+    answer_doc = answer.model_dump()
     
     if existing_response:
         # Substituir resposta existente
         await db.responses.update_one(
             {"id": existing_response["id"]},
             {"$set": {
-                "answers": response_data.answers,
+                "answers": answer_doc["answers"],
                 "submitted_at": answer.submitted_at
             }}
         )
         # Manter o ID original da resposta
         answer.id = existing_response["id"]
+        # Os resultados mudam mesmo sem nova resposta: invalidar ETags
+        incremental = await _bump_tally(survey, {})
     else:
         # Criar nova resposta
-        await db.responses.insert_one(answer.model_dump())
+        await db.responses.insert_one(answer_doc)
         # Incrementar contador apenas para respostas novas
-        await db.surveys.update_one({"id": survey_id}, {"$inc": {"response_count": 1}})
+        incremental = await _bump_tally(survey, {"response_count": 1})
+    
+    answer_doc["id"] = answer.id
+    if incremental:
+        await update_rating_stats(survey, answer_doc, existing_response)
+    await sync_text_answers(survey, answer_doc)
+    await update_term_frequencies(survey, answer_doc, existing_response)
+    if survey.get("is_featured"):
+        schedule_static_results(survey_id)
     
     return answer
 
@@ -773,8 +1698,8 @@ async def get_survey_responses(survey_id: str, current_user: dict = Depends(get_
         raise HTTPException(status_code=403, detail="Not authorized")
     
     # Ordenar por data (última resposta primeiro)
-    responses = await db.responses.find({"survey_id": survey_id}, {"_id": 0}).sort("submitted_at", -1).to_list(1000)
-    return [SurveyAnswer(**r) for r in responses]
+    responses = await load_survey_responses(survey, limit=1000, newest_first=True)
+    return FastJSONResponse(content=[SurveyAnswerRead.from_doc(r) for r in responses])
 
 @api_router.get("/my-responses")
 async def get_my_responses(current_user: dict = Depends(get_current_user)):
@@ -783,6 +1708,9 @@ async def get_my_responses(current_user: dict = Depends(get_current_user)):
         {"user_id": current_user["id"]}, 
         {"_id": 0}
     ).sort("submitted_at", -1).to_list(1000)
+    archived = await archived_responses_for_user(current_user["id"])
+    if archived:
+        responses = sorted(responses + archived, key=lambda r: r["submitted_at"], reverse=True)
     
     # Buscar todas as sondagens para calcular números
     all_surveys = await db.surveys.find({}, {"_id": 0, "id": 1, "created_at": 1}).sort("created_at", 1).to_list(10000)
@@ -798,50 +1726,17 @@ async def get_my_responses(current_user: dict = Depends(get_current_user)):
         # Adicionar número da sondagem
         survey["survey_number"] = survey_numbers.get(survey["id"], 0)
             
-        # Calcular resultados globais em %
-        all_responses = await db.responses.find({"survey_id": response["survey_id"]}, {"_id": 0}).to_list(10000)
-        total_responses = len(all_responses)
-        
-        global_results = {}
-        for question in survey.get("questions", []):
-            q_id = question["id"]
-            q_type = question["type"]
-            
-            if q_type in ["multiple_choice", "yes_no"]:
-                option_counts = {}
-                for resp in all_responses:
-                    for ans in resp.get("answers", []):
-                        if ans["question_id"] == q_id:
-                            value = ans["value"]
-                            option_counts[value] = option_counts.get(value, 0) + 1
-                
-                # Calcular percentagens
-                option_percentages = {}
-                for opt_id, count in option_counts.items():
-                    percentage = (count / total_responses * 100) if total_responses > 0 else 0
-                    option_percentages[opt_id] = round(percentage, 1)
-                
-                global_results[q_id] = {
-                    "type": q_type,
-                    "percentages": option_percentages
-                }
-                
-            elif q_type == "rating":
-                ratings = []
-                for resp in all_responses:
-                    for ans in resp.get("answers", []):
-                        if ans["question_id"] == q_id:
-                            try:
-                                ratings.append(int(ans["value"]))
-                            except:
-                                pass
-                
-                avg_rating = sum(ratings) / len(ratings) if ratings else 0
-                global_results[q_id] = {
-                    "type": q_type,
-                    "average": round(avg_rating, 1),
-                    "total_votes": len(ratings)
-                }
+        # Calcular resultados globais em % (congelados se a sondagem estiver fechada)
+        snapshot = None
+        if survey.get("closed_at") or survey.get("archive_state") == "archived":
+            snapshot = await db.survey_snapshots.find_one({"survey_id": survey["id"]}, {"_id": 0})
+        if snapshot:
+            total_responses = snapshot["total_responses"]
+            global_results = snapshot["global_results"]
+        else:
+            all_responses = await db.responses.find({"survey_id": response["survey_id"]}, {"_id": 0}).to_list(10000)
+            total_responses = len(all_responses)
+            global_results = analytics.global_results(survey, all_responses)
         
         result.append({
             "response": response,
@@ -866,43 +1761,93 @@ async def get_survey_analytics(survey_id: str, current_user: dict = Depends(get_
     if survey["owner_id"] != current_user["id"] and current_user["role"] not in ["admin", "owner"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    responses = await db.responses.find({"survey_id": survey_id}, {"_id": 0}).to_list(1000)
+    responses = await load_survey_responses(survey, limit=1000)
+    
+    return analytics.survey_analytics(survey, responses)
+
+@api_router.get("/surveys/{survey_id}/text-search")
+async def search_text_answers(
+    survey_id: str,
+    q: str,
+    question_id: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20,
+    current_user: dict = Depends(get_current_user)
+):
+    """Pesquisa nas respostas de texto (português, sem distinção de acentos), ordenada por relevância"""
+    survey = await db.surveys.find_one({"id": survey_id}, {"_id": 0})
+    if not survey:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    
+    if survey["owner_id"] != current_user["id"] and current_user["role"] not in ["admin", "owner"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
     
-    analytics = {
-        "total_responses": len(responses),
-        "questions": {}
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query is required")
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 100)
+    
+    query = {"survey_id": survey_id, "$text": {"$search": q}}
+    if question_id:
+        query["question_id"] = question_id
+    
+    total = await db.text_answers.count_documents(query)
+    results = await db.text_answers.find(
+        query,
+        {"_id": 0, "user_id": 0, "survey_id": 0, "score": {"$meta": "textScore"}}
+    ).sort([("score", {"$meta": "textScore"})]).skip((page - 1) * page_size).limit(page_size).to_list(page_size)
+    
+    return {
+        "query": q,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "results": results
     }
+
+@api_router.get("/surveys/{survey_id}/text-terms")
+async def get_text_terms(
+    survey_id: str,
+    question_id: Optional[str] = None,
+    ngram: Optional[int] = None,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user)
+):
+    """Termos e expressões mais frequentes das perguntas de texto (para nuvem de palavras)"""
+    survey = await db.surveys.find_one({"id": survey_id}, {"_id": 0})
+    if not survey:
+        raise HTTPException(status_code=404, detail="Survey not found")
     
-    for question in survey.get("questions", []):
-        q_id = question["id"]
-        q_type = question["type"]
-        q_analytics = {"type": q_type, "responses": []}
-        
-        for resp in responses:
-            for ans in resp.get("answers", []):
-                if ans["question_id"] == q_id:
-                    q_analytics["responses"].append(ans["value"])
-        
-        if q_type == "multiple_choice":
-            option_counts = {}
-            for opt in question.get("options", []):
-                option_counts[opt["id"]] = {"text": opt["text"], "count": 0}
-            for val in q_analytics["responses"]:
-                if val in option_counts:
-                    option_counts[val]["count"] += 1
-            q_analytics["option_breakdown"] = option_counts
-        elif q_type == "rating":
-            ratings = [int(r) for r in q_analytics["responses"] if r.isdigit()]
-            q_analytics["average"] = sum(ratings) / len(ratings) if ratings else 0
-            q_analytics["distribution"] = {str(i): ratings.count(i) for i in range(1, 6)}
-        
-        analytics["questions"][q_id] = q_analytics
+    if survey["owner_id"] != current_user["id"] and current_user["role"] not in ["admin", "owner"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
     
-    return analytics
+    text_questions = [q["id"] for q in survey.get("questions", []) if q["type"] == "text"]
+    if question_id:
+        if question_id not in text_questions:
+            raise HTTPException(status_code=404, detail="Text question not found")
+        text_questions = [question_id]
+    limit = min(max(limit, 1), 500)
+    
+    result = {}
+    for q_id in text_questions:
+        query = {"survey_id": survey_id, "question_id": q_id, "count": {"$gt": 0}}
+        if ngram:
+            query["ngram"] = ngram
+        terms = await db.term_frequencies.find(
+            query, {"_id": 0, "term": 1, "count": 1, "ngram": 1}
+        ).sort("count", DESCENDING).limit(limit).to_list(limit)
+        result[q_id] = terms
+    
+    return {"survey_id": survey_id, "questions": result}
 
 # Public endpoint for viewing results (percentages only, no text responses)
 @api_router.get("/surveys/{survey_id}/public-results")
-async def get_public_survey_results(survey_id: str, current_user: Optional[dict] = Depends(get_optional_user)):
+async def get_public_survey_results(
+    survey_id: str,
+    request: Request,
+    response: Response,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
     survey = await db.surveys.find_one({"id": survey_id}, {"_id": 0})
     if not survey:
         raise HTTPException(status_code=404, detail="Survey not found")
@@ -910,112 +1855,310 @@ async def get_public_survey_results(survey_id: str, current_user: Optional[dict]
     if not survey.get("is_published"):
         raise HTTPException(status_code=400, detail="Survey is not published")
     
-    responses = await db.responses.find({"survey_id": survey_id}, {"_id": 0}).to_list(1000)
-    
     # Check if user is admin
     is_admin = current_user and current_user.get("role") in ["admin", "owner"]
     
-    analytics = {
-        "total_responses": len(responses),
-        "questions": {}
-    }
+    # Validar o ETag antes de ler as respostas
+    cache_control = cache_control_for(request)
+    etag = make_etag(
+        "results", survey_id, survey.get("updated_at"), survey.get("response_count"),
+        survey.get("tally_version", 0), bool(is_admin)
+    )
+    cached = not_modified(request, etag, cache_control)
+    if cached:
+        return cached
+    set_cache_headers(response, etag, cache_control)
+    
+    # Sondagens em destaque: servir o ficheiro já publicado para esta versão
+    if results_publisher is not None and survey.get("is_featured") and not is_admin:
+        body = results_publisher.read(survey_id, etag.strip('"'))
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers=dict(response.headers))
+        schedule_static_results(survey_id)
+    
+    return await compute_public_results(survey, is_admin)
+
+@api_router.get("/surveys/{survey_id}/rating-stats")
+async def get_rating_stats(
+    survey_id: str,
+    question_id: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    current_user: Optional[dict] = Depends(get_optional_user)
+):
+    """Mediana, quartis, desvio padrão e NPS das perguntas rating, combinando os buckets diários (YYYY-MM-DD)"""
+    survey = await db.surveys.find_one({"id": survey_id}, {"_id": 0})
+    if not survey:
+        raise HTTPException(status_code=404, detail="Survey not found")
     
-    for question in survey.get("questions", []):
-        q_id = question["id"]
-        q_type = question["type"]
-        total_answers = 0
-        q_analytics = {"type": q_type}
-        
-        answer_values = []
-        for resp in responses:
-            for ans in resp.get("answers", []):
-                if ans["question_id"] == q_id:
-                    answer_values.append(ans["value"])
-                    total_answers += 1
-        
-        q_analytics["total_answers"] = total_answers
-        
-        if q_type == "multiple_choice":
-            option_counts = {}
-            for opt in question.get("options", []):
-                option_counts[opt["id"]] = {"text": opt["text"], "count": 0}
-            for val in answer_values:
-                if val in option_counts:
-                    option_counts[val]["count"] += 1
-            
-            # Convert counts to percentages for non-admin users
-            if is_admin:
-                q_analytics["option_breakdown"] = option_counts
-            else:
-                option_percentages = {}
-                for opt_id, opt_data in option_counts.items():
-                    percentage = (opt_data["count"] / total_answers * 100) if total_answers > 0 else 0
-                    option_percentages[opt_id] = {"text": opt_data["text"], "percentage": round(percentage, 1)}
-                q_analytics["option_breakdown"] = option_percentages
-                
-        elif q_type == "yes_no":
-            yes_count = answer_values.count("Sim")
-            no_count = answer_values.count("Não")
-            yes_percentage = (yes_count / total_answers * 100) if total_answers > 0 else 0
-            no_percentage = (no_count / total_answers * 100) if total_answers > 0 else 0
-            
-            if is_admin:
-                q_analytics["yes_count"] = yes_count
-                q_analytics["no_count"] = no_count
-            q_analytics["yes_percentage"] = round(yes_percentage, 1)
-            q_analytics["no_percentage"] = round(no_percentage, 1)
-            
-        elif q_type == "checkbox":
-            option_counts = {}
-            for opt in question.get("options", []):
-                option_counts[opt["id"]] = {"text": opt["text"], "count": 0}
-            for val in answer_values:
-                selected = val.split(',')
-                for opt_id in selected:
-                    if opt_id in option_counts:
-                        option_counts[opt_id]["count"] += 1
-            
-            # Convert counts to percentages for non-admin users
-            if is_admin:
-                q_analytics["option_breakdown"] = option_counts
-            else:
-                option_percentages = {}
-                for opt_id, opt_data in option_counts.items():
-                    percentage = (opt_data["count"] / total_answers * 100) if total_answers > 0 else 0
-                    option_percentages[opt_id] = {"text": opt_data["text"], "percentage": round(percentage, 1)}
-                q_analytics["option_breakdown"] = option_percentages
-                
-        elif q_type == "rating":
-            ratings = [int(r) for r in answer_values if r.isdigit()]
-            q_analytics["average"] = round(sum(ratings) / len(ratings), 1) if ratings else 0
-            max_rating = question.get("max_rating", 5)
-            min_rating = question.get("min_rating", 1)
-            
-            if is_admin:
-                q_analytics["distribution"] = {str(i): ratings.count(i) for i in range(min_rating, max_rating + 1)}
-            else:
-                # Show distribution as percentages
-                distribution_percentages = {}
-                for i in range(min_rating, max_rating + 1):
-                    count = ratings.count(i)
-                    percentage = (count / len(ratings) * 100) if ratings else 0
-                    distribution_percentages[str(i)] = round(percentage, 1)
-                q_analytics["distribution"] = distribution_percentages
-                
-        elif q_type == "text":
-            # Don't expose text responses, just count
-            q_analytics["response_count"] = total_answers
-        
-        analytics["questions"][q_id] = q_analytics
+    is_admin = current_user and current_user.get("role") in ["admin", "owner"]
+    if not survey.get("is_published") and not is_admin:
+        raise HTTPException(status_code=400, detail="Survey is not published")
     
-    return analytics
+    rating_questions = {q["id"]: q for q in survey.get("questions", []) if q["type"] == "rating"}
+    if question_id:
+        if question_id not in rating_questions:
+            raise HTTPException(status_code=404, detail="Rating question not found")
+        rating_questions = {question_id: rating_questions[question_id]}
+    
+    merged = {q_id: RatingStats() for q_id in rating_questions}
+    if not survey.get("rating_stats_ready"):
+        # Acumuladores ainda em reconstrução: calcular a partir das respostas
+        from_bucket = from_date[:10] if from_date else None
+        to_bucket = to_date[:10] if to_date else None
+        async for q_id, _, value in _rating_values(survey, set(rating_questions), from_bucket, to_bucket):
+            merged[q_id].add(value)
+        return _rating_stats_result(survey_id, from_date, to_date, rating_questions, merged)
+    
+    query = {"survey_id": survey_id, "question_id": {"$in": list(rating_questions)}}
+    if from_date or to_date:
+        query["bucket"] = {}
+        if from_date:
+            query["bucket"]["$gte"] = from_date[:10]
+        if to_date:
+            query["bucket"]["$lte"] = to_date[:10]
+    
+    async for doc in db.rating_stats.find(query, {"_id": 0}):
+        merged[doc["question_id"]].merge(RatingStats.from_doc(doc))
+    return _rating_stats_result(survey_id, from_date, to_date, rating_questions, merged)
+
+def _rating_stats_result(survey_id: str, from_date, to_date, rating_questions: dict, merged: dict) -> dict:
+    return {
+        "survey_id": survey_id,
+        "from_date": from_date,
+        "to_date": to_date,
+        "questions": {
+            q_id: stats.summary(rating_questions[q_id].get("min_rating") or 1, rating_questions[q_id].get("max_rating") or 5)
+            for q_id, stats in merged.items()
+        }
+    }
 
 # ===================== ADMIN ROUTES =====================
 
 @api_router.get("/admin/users", response_model=List[UserResponse])
 async def get_all_users(admin: dict = Depends(get_admin_user)):
     users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(1000)
-    return [UserResponse(**u) for u in users]
+    return FastJSONResponse(content=[UserRead.from_doc(u) for u in users])
+
+# Filas de moderação (tipo = nome da coleção) reunidas na caixa de entrada dos admins
+INBOX_TYPES = ("suggestions", "team_applications", "password_recovery")
+INBOX_SORT = {"created_at": -1, "id": -1}
+INBOX_STATUSES = {"pending", "reviewed", "implemented", "accepted", "rejected", "used", "expired"}
+
+def _inbox_status_expr(kind: str, now: str):
+    if kind == "password_recovery":
+        return {"$cond": [
+            {"$and": [{"$eq": ["$status", "pending"]}, {"$lt": ["$expires_at", now]}]}, "expired", "$status"
+        ]}
+    return "$status"
+
+def _union_pipeline(kinds, stages_for) -> list:
+    """Pipeline sobre a primeira coleção com $unionWith das restantes (``stages_for(kind)`` em cada uma)"""
+    pipeline = stages_for(kinds[0])
+    for kind in kinds[1:]:
+        pipeline.append({"$unionWith": {"coll": kind, "pipeline": stages_for(kind)}})
+    return pipeline
+
+async def inbox_status_counts(kinds, match: dict, now: str) -> dict:
+    """{tipo: {estado: n}} numa só agregação"""
+    pipeline = _union_pipeline(kinds, lambda kind: [
+        {"$match": match},
+        {"$group": {"_id": {"kind": kind, "status": _inbox_status_expr(kind, now)}, "count": {"$sum": 1}}},
+    ])
+    counts = {kind: {} for kind in kinds}
+    async for group in db[kinds[0]].aggregate(pipeline):
+        counts[group["_id"]["kind"]][group["_id"]["status"]] = group["count"]
+    return counts
+
+_dashboard_cache = {"expires": 0.0, "data": None}
+_dashboard_lock = asyncio.Lock()
+
+def _facet_count(facet: list) -> int:
+    return facet[0]["n"] if facet else 0
+
+def _group_counts(groups: list) -> dict:
+    return {g["_id"]: g["count"] for g in groups if g["_id"] is not None}
+
+async def compute_dashboard_stats() -> dict:
+    now = datetime.now(timezone.utc)
+    now_iso = now.isoformat()
+    since_24h = (now - timedelta(hours=24)).isoformat()
+    since_7d = (now - timedelta(days=7)).isoformat()
+    
+    users_pipeline = [{"$facet": {
+        "total": [{"$count": "n"}],
+        "by_role": [{"$group": {"_id": "$role", "count": {"$sum": 1}}}],
+        "new_7d": [{"$match": {"created_at": {"$gte": since_7d}}}, {"$count": "n"}],
+    }}]
+    # Mesmo critério de submit_response: end_date passada conta como fechada antes de o agendador correr
+    survey_state = {"$switch": {"branches": [
+        {"case": {"$eq": ["$archive_state", "archived"]}, "then": "archived"},
+        {"case": {"$or": [
+            {"$gt": ["$closed_at", None]},
+            {"$and": [{"$gt": ["$closes_at", None]}, {"$lte": ["$closes_at", now]}]},
+        ]}, "then": "closed"},
+        {"case": {"$eq": [{"$ifNull": ["$is_published", False]}, False]}, "then": "draft"},
+    ], "default": "open"}}
+    surveys_pipeline = [{"$facet": {
+        "total": [{"$count": "n"}],
+        "by_state": [{"$group": {"_id": survey_state, "count": {"$sum": 1}}}],
+        "featured": [{"$match": {"is_featured": True}}, {"$count": "n"}],
+        # Inclui as respostas já arquivadas (response_count mantém-se)
+        "responses": [{"$group": {"_id": None, "count": {"$sum": {"$ifNull": ["$response_count", 0]}}}}],
+    }}]
+    responses_pipeline = [
+        {"$match": {"submitted_at": {"$gte": since_7d}}},
+        {"$facet": {
+            "last_24h": [{"$match": {"submitted_at": {"$gte": since_24h}}}, {"$count": "n"}],
+            "last_7d": [{"$count": "n"}],
+        }},
+    ]
+    users, surveys, responses, by_status = await asyncio.gather(
+        db.users.aggregate(users_pipeline).to_list(1),
+        db.surveys.aggregate(surveys_pipeline).to_list(1),
+        db.responses.aggregate(responses_pipeline).to_list(1),
+        inbox_status_counts(INBOX_TYPES, {}, now_iso),
+    )
+    users, surveys, responses = users[0], surveys[0], responses[0]
+    
+    return {
+        "generated_at": now_iso,
+        "users": {
+            "total": _facet_count(users["total"]),
+            "by_role": _group_counts(users["by_role"]),
+            "new_last_7d": _facet_count(users["new_7d"]),
+        },
+        "surveys": {
+            "total": _facet_count(surveys["total"]),
+            "by_state": {"draft": 0, "open": 0, "closed": 0, "archived": 0, **_group_counts(surveys["by_state"])},
+            "featured": _facet_count(surveys["featured"]),
+            "total_responses": surveys["responses"][0]["count"] if surveys["responses"] else 0,
+        },
+        "responses": {
+            "last_24h": _facet_count(responses["last_24h"]),
+            "last_7d": _facet_count(responses["last_7d"]),
+        },
+        "pending": {kind: counts.get("pending", 0) for kind, counts in by_status.items()},
+        "by_status": by_status,
+    }
+
+@api_router.get("/admin/dashboard-stats")
+async def get_dashboard_stats(admin: dict = Depends(get_admin_user)):
+    """Totais e atividade recente para o painel de administração (em cache durante DASHBOARD_CACHE_SECONDS)"""
+    if _dashboard_cache["data"] is None or time.monotonic() >= _dashboard_cache["expires"]:
+        async with _dashboard_lock:
+            # Pedidos simultâneos com a cache expirada fazem uma só agregação
+            if _dashboard_cache["data"] is None or time.monotonic() >= _dashboard_cache["expires"]:
+                _dashboard_cache["data"] = await compute_dashboard_stats()
+                _dashboard_cache["expires"] = time.monotonic() + DASHBOARD_CACHE_SECONDS
+    return _dashboard_cache["data"]
+
+def _encode_inbox_cursor(item: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps([item["created_at"], item["id"]]).encode()).decode()
+
+def _decode_inbox_cursor(cursor: str) -> dict:
+    try:
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Keyset em (created_at, id): continua depois do último item da página anterior
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": item_id}},
+    ]}
+
+@api_router.get("/admin/inbox")
+async def get_admin_inbox(
+    type: Optional[str] = None,
+    status: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+    admin: dict = Depends(get_admin_user)
+):
+    """Sugestões, candidaturas e pedidos de recuperação numa só lista (mais recentes primeiro).
+    
+    ?type= aceita vários tipos separados por vírgulas e a página seguinte pede-se com
+    ?cursor=<next_cursor>. As contagens por estado seguem os filtros de tipo e data, não o de estado.
+    """
+    kinds = [k for k in type.split(",") if k] if type else list(INBOX_TYPES)
+    if not kinds or any(k not in INBOX_TYPES for k in kinds):
+        raise HTTPException(status_code=400, detail="Invalid inbox type")
+    if status and status not in INBOX_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid status")
+    
+    now = datetime.now(timezone.utc).isoformat()
+    date_match = {}
+    if from_date:
+        date_match["$gte"] = from_date
+    if to_date:
+        # Inclusivo: "2025-03-01" abrange todos os created_at desse dia
+        date_match["$lte"] = to_date + "\uffff"
+    base_match = {"created_at": date_match} if date_match else {}
+    filters = [base_match] if base_match else []
+    if cursor:
+        filters.append(_decode_inbox_cursor(cursor))
+    limit = min(max(limit, 1), 200)
+    
+    def stages_for(kind):
+        match = list(filters)
+        if status:
+            match.append(_recovery_status_query(status, now) if kind == "password_recovery" else {"status": status})
+        # Cada coleção devolve no máximo uma página, pelo seu índice (estado, created_at, id)
+        return [
+            {"$match": {"$and": match} if match else {}},
+            {"$sort": INBOX_SORT},
+            {"$limit": limit},
+            {"$project": {"_id": 0, "purge_at": 0}},
+            {"$replaceWith": {
+                "type": {"$literal": kind},
+                "id": "$id",
+                "status": _inbox_status_expr(kind, now),
+                "created_at": "$created_at",
+                "user_id": "$user_id",
+                "user_name": "$user_name",
+                "item": "$$ROOT",
+            }},
+        ]
+    
+    pipeline = _union_pipeline(kinds, stages_for) + [{"$sort": INBOX_SORT}, {"$limit": limit}]
+    items, counts = await asyncio.gather(
+        db[kinds[0]].aggregate(pipeline).to_list(limit),
+        inbox_status_counts(kinds, base_match, now),
+    )
+    
+    return {
+        "items": items,
+        "next_cursor": _encode_inbox_cursor(items[-1]) if len(items) == limit else None,
+        "counts": counts,
+    }
+
+USERS_CSV_FIELDS = [
+    'id', 'name', 'email', 'phone', 'role', 
+    'date_of_birth', 'gender', 'nationality',
+    'district', 'municipality', 'parish',
+    'marital_status', 'religion', 'education_level', 'profession',
+    'lived_abroad', 'accept_notifications', 'created_at'
+]
+
+def _users_csv_row(user: dict) -> dict:
+    # Convert boolean to string for better readability
+    if 'lived_abroad' in user:
+        user['lived_abroad'] = 'Sim' if user['lived_abroad'] else 'Não'
+    if 'accept_notifications' in user:
+        user['accept_notifications'] = 'Sim' if user['accept_notifications'] else 'Não'
+    
+    # Format dates
+    if 'created_at' in user:
+        try:
+            user['created_at'] = datetime.fromisoformat(user['created_at']).strftime('%d/%m/%Y %H:%M:%S')
+        except:
+            pass
+    return user
+
+def _users_csv_filename() -> str:
+    return f"impar_utilizadores_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv"
 
 @api_router.get("/admin/users/export/csv")
 async def export_users_csv(admin: dict = Depends(get_admin_user)):
@@ -1027,47 +2170,19 @@ async def export_users_csv(admin: dict = Depends(get_admin_user)):
     
     # Create CSV in memory
     output = io.StringIO()
-    
-    # Define CSV columns (all user fields)
-    fieldnames = [
-        'id', 'name', 'email', 'phone', 'role', 
-        'date_of_birth', 'gender', 'nationality',
-        'district', 'municipality', 'parish',
-        'marital_status', 'religion', 'education_level', 'profession',
-        'lived_abroad', 'accept_notifications', 'created_at'
-    ]
-    
-    writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore')
+    writer = csv.DictWriter(output, fieldnames=USERS_CSV_FIELDS, extrasaction='ignore')
     writer.writeheader()
-    
-    # Write user data
     for user in users:
-        # Convert boolean to string for better readability
-        if 'lived_abroad' in user:
-            user['lived_abroad'] = 'Sim' if user['lived_abroad'] else 'Não'
-        if 'accept_notifications' in user:
-            user['accept_notifications'] = 'Sim' if user['accept_notifications'] else 'Não'
-        
-        # Format dates
-        if 'created_at' in user:
-            try:
-                user['created_at'] = datetime.fromisoformat(user['created_at']).strftime('%d/%m/%Y %H:%M:%S')
-            except:
-                pass
-        
-        writer.writerow(user)
+        writer.writerow(_users_csv_row(user))
     
     # Prepare response
     output.seek(0)
     
-    # Generate filename with current date
-    filename = f"impar_utilizadores_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.csv"
-    
     return StreamingResponse(
         iter([output.getvalue()]),
         media_type="text/csv",
         headers={
-            "Content-Disposition": f"attachment; filename={filename}"
+            "Content-Disposition": f"attachment; filename={_users_csv_filename()}"
         }
     )
 
@@ -1098,8 +2213,15 @@ async def delete_user(user_id: str, admin: dict = Depends(get_admin_user)):
     if user["role"] == "owner":
         raise HTTPException(status_code=400, detail="Cannot delete owner")
     
+    # O utilizador deixa logo de existir; respostas, sugestões e candidaturas são apagadas em segundo plano
+    user.pop("password", None)
+    await db.deleted_users.insert_one({
+        **user, "deleted_at": datetime.now(timezone.utc).isoformat(), "deleted_by": admin["id"]
+    })
     await db.users.delete_one({"id": user_id})
-    return {"message": "User deleted"}
+    job = await job_runner.submit("purge_user", {"user_id": user_id}, created_by=admin["id"], dedupe=True)
+    await db.deleted_users.update_one({"id": user_id}, {"$set": {"purge_job_id": job["id"]}})
+    return {"message": "User deleted", "job_id": job["id"]}
 
 @api_router.put("/admin/users/{user_id}/reset-password")
 async def reset_user_password(user_id: str, new_password: str, admin: dict = Depends(get_admin_user)):
@@ -1123,6 +2245,236 @@ async def reset_user_password(user_id: str, new_password: str, admin: dict = Dep
     
     return {"message": "Password reset successfully", "email": user["email"]}
 
+# ===================== BACKGROUND JOBS =====================
+
+job_runner = JobRunner(db.jobs, JOB_RESULTS_DIR, result_ttl=timedelta(hours=JOB_RESULT_TTL_HOURS))
+
+async def users_csv_job(ctx) -> dict:
+    """Exportação CSV dos utilizadores escrita em disco à medida que o cursor avança"""
+    total = await db.users.count_documents({})
+    path = ctx.result_path("utilizadores.csv")
+    done = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=USERS_CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        async for user in db.users.find({}, {"_id": 0, "password": 0}):
+            writer.writerow(_users_csv_row(user))
+            done += 1
+            await ctx.progress(done, total)
+    await ctx.progress(done, total, force=True)
+    return {"file": path.name, "filename": _users_csv_filename(), "media_type": "text/csv", "rows": done}
+
+async def survey_analytics_job(ctx) -> dict:
+    survey = await db.surveys.find_one({"id": ctx.params["survey_id"]}, {"_id": 0})
+    if not survey:
+        raise ValueError("Survey not found")
+    total = survey.get("response_count", 0)
+    responses = []
+    async for resp in iter_survey_responses(survey):
+        responses.append(resp)
+        await ctx.progress(len(responses), total)
+    path = ctx.result_path("analytics.json")
+    path.write_bytes(dumps(analytics.survey_analytics(survey, responses)))
+    await ctx.progress(len(responses), total, force=True)
+    return {"file": path.name, "filename": f"analytics_{survey['id']}.json", "media_type": "application/json"}
+
+async def backfill_legacy_tallies():
+    """Reconstrói, por tarefa, os acumuladores das sondagens criadas antes deles (nunca num pedido)"""
+    query = {"$or": [{flag: {"$ne": True}} for flag in TALLY_READY]}
+    async for survey in db.surveys.find(query, {"_id": 0, "id": 1}):
+        await job_runner.submit("rebuild_tallies", {"survey_id": survey["id"]}, dedupe=True)
+
+async def rebuild_tallies_job(ctx) -> dict:
+    """Recalcula os acumuladores incrementais (ratings, índice de texto e frequência de termos)"""
+    survey = await db.surveys.find_one({"id": ctx.params["survey_id"]}, {"_id": 0})
+    if not survey:
+        raise ValueError("Survey not found")
+    steps = [rebuild_rating_stats, rebuild_text_answers, rebuild_term_frequencies]
+    for i, step in enumerate(steps):
+        await step(survey)
+        await ctx.progress(i + 1, len(steps), force=True)
+    return {"survey_id": survey["id"]}
+
+async def _delete_in_batches(collection, query: dict, ctx=None, done: int = 0, total: int = None) -> int:
+    """Apaga os documentos de ``query`` em lotes de PURGE_BATCH_SIZE, com pausa entre lotes"""
+    while True:
+        batch = await collection.find(query, {"_id": 1}).limit(PURGE_BATCH_SIZE).to_list(PURGE_BATCH_SIZE)
+        if not batch:
+            return done
+        result = await collection.delete_many({"_id": {"$in": [d["_id"] for d in batch]}})
+        done += result.deleted_count
+        if ctx is not None:
+            await ctx.progress(done, total)
+        await asyncio.sleep(PURGE_BATCH_PAUSE_MS / 1000)
+
+async def purge_survey_job(ctx) -> dict:
+    """Apaga as respostas e os agregados de uma sondagem eliminada"""
+    survey_id = ctx.params["survey_id"]
+    total = await db.responses.count_documents({"survey_id": survey_id})
+    deleted = await _delete_in_batches(db.responses, {"survey_id": survey_id}, ctx, total=total)
+    for collection in (db.text_answers, db.rating_stats, db.term_frequencies, db.response_archives, db.survey_snapshots):
+        await _delete_in_batches(collection, {"survey_id": survey_id})
+    await ctx.progress(deleted, total, force=True)
+    await db.deleted_surveys.update_one(
+        {"id": survey_id}, {"$set": {"purged_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    return {"survey_id": survey_id, "responses_deleted": deleted}
+
+async def purge_user_job(ctx) -> dict:
+    """Apaga as respostas (descontando-as das sondagens), sugestões e candidaturas de um utilizador eliminado"""
+    user_id = ctx.params["user_id"]
+    total = await db.responses.count_documents({"user_id": user_id})
+    deleted = 0
+    surveys = {}
+    projection = {"_id": 1, "id": 1, "survey_id": 1, "answers": 1, "submitted_at": 1}
+    
+    async def survey_for(survey_id):
+        if survey_id not in surveys:
+            surveys[survey_id] = await db.surveys.find_one(
+                {"id": survey_id}, {"_id": 0, "id": 1, "questions": 1, "rating_stats_ready": 1, "rating_stats_epoch": 1}
+            )
+        return surveys[survey_id]
+    
+    # Apagar primeiro e descontar só o que foi de facto apagado: a tarefa pode ser interrompida
+    # e repetida (requeue/purge-resume) sem descontar duas vezes
+    while True:
+        ids = await db.responses.find({"user_id": user_id}, {"_id": 1}).limit(PURGE_BATCH_SIZE).to_list(PURGE_BATCH_SIZE)
+        if not ids:
+            break
+        by_survey = {}
+        for doc in ids:
+            resp = await db.responses.find_one_and_delete({"_id": doc["_id"]}, projection=projection)
+            if resp:
+                by_survey.setdefault(resp["survey_id"], []).append(resp)
+                deleted += 1
+        for survey_id, responses in by_survey.items():
+            # Sondagens já eliminadas não têm contadores a acertar
+            survey = await survey_for(survey_id)
+            if survey:
+                await remove_response_aggregates(survey, responses)
+        await ctx.progress(deleted, total)
+        await asyncio.sleep(PURGE_BATCH_PAUSE_MS / 1000)
+    
+    # Respostas em sondagens arquivadas: reescrever os lotes que contêm o utilizador
+    async for bucket in db.response_archives.find({"user_ids": user_id}, {"_id": 0}):
+        while bucket:
+            doc, removed = archive.without_user(bucket, user_id)
+            # Escrita condicionada ao conteúdo lido: só quem alterou o lote desconta as respostas
+            key = {"survey_id": bucket["survey_id"], "bucket": bucket["bucket"], "data": bucket["data"]}
+            if doc:
+                result = await db.response_archives.replace_one(key, doc)
+                written = result.matched_count
+            else:
+                result = await db.response_archives.delete_one(key)
+                written = result.deleted_count
+            if written:
+                survey = await survey_for(bucket["survey_id"])
+                if survey and removed:
+                    await remove_response_aggregates(survey, removed)
+                    await db.surveys.update_one(
+                        {"id": survey["id"]}, {"$inc": {"archived_response_count": -len(removed)}}
+                    )
+                deleted += len(removed)
+                break
+            # O lote mudou entretanto (outra eliminação): reler e tentar de novo, se ainda contiver o utilizador
+            bucket = await db.response_archives.find_one(
+                {"survey_id": key["survey_id"], "bucket": key["bucket"], "user_ids": user_id}, {"_id": 0}
+            )
+    
+    for collection in (db.suggestions, db.team_applications, db.password_recovery):
+        await _delete_in_batches(collection, {"user_id": user_id})
+    await ctx.progress(deleted, total, force=True)
+    await db.deleted_users.update_one(
+        {"id": user_id}, {"$set": {"purged_at": datetime.now(timezone.utc).isoformat()}}
+    )
+    return {"user_id": user_id, "responses_deleted": deleted}
+
+async def resume_pending_purges():
+    """Relança as eliminações em cascata que não terminaram (processo parado a meio ou antes de as submeter)"""
+    for tombstones, job_type, param in (
+        (db.deleted_surveys, "purge_survey", "survey_id"),
+        (db.deleted_users, "purge_user", "user_id"),
+    ):
+        async for doc in tombstones.find({"purged_at": None}, {"_id": 0, "id": 1}):
+            # Com dedupe, uma eliminação ainda ativa é devolvida em vez de duplicada
+            job = await job_runner.submit(job_type, {param: doc["id"]}, dedupe=True)
+            await tombstones.update_one({"id": doc["id"]}, {"$set": {"purge_job_id": job["id"]}})
+
+for job_type, handler in (
+    ("users_csv", users_csv_job),
+    ("survey_analytics", survey_analytics_job),
+    ("rebuild_tallies", rebuild_tallies_job),
+    ("purge_survey", purge_survey_job),
+    ("purge_user", purge_user_job),
+    ("archive_survey", archive_survey_job),
+    ("close_survey", close_survey_job),
+):
+    job_runner.register(
+        job_type, handler,
+        concurrency=int(os.environ.get(f'JOB_CONCURRENCY_{job_type.upper()}', JOB_CONCURRENCY[job_type])),
+        requeue_on_cancel=job_type in ("purge_survey", "purge_user")
+    )
+
+async def _survey_for_owner(survey_id: str, current_user: dict) -> dict:
+    survey = await db.surveys.find_one({"id": survey_id}, {"_id": 0, "id": 1, "owner_id": 1})
+    if not survey:
+        raise HTTPException(status_code=404, detail="Survey not found")
+    if survey["owner_id"] != current_user["id"] and current_user["role"] not in ["admin", "owner"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return survey
+
+async def _job_for_user(job_id: str, current_user: dict) -> dict:
+    job = await job_runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["created_by"] != current_user["id"] and current_user["role"] not in ["admin", "owner"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return job
+
+@api_router.post("/admin/users/export/csv/jobs", status_code=202)
+async def start_users_csv_job(admin: dict = Depends(get_admin_user)):
+    """Exportação CSV em segundo plano; acompanhar em /jobs/{id} e descarregar em /jobs/{id}/download"""
+    return await job_runner.submit("users_csv", created_by=admin["id"])
+
+@api_router.post("/surveys/{survey_id}/analytics/jobs", status_code=202)
+async def start_survey_analytics_job(survey_id: str, current_user: dict = Depends(get_current_user)):
+    await _survey_for_owner(survey_id, current_user)
+    return await job_runner.submit("survey_analytics", {"survey_id": survey_id}, created_by=current_user["id"], dedupe=True)
+
+@api_router.post("/surveys/{survey_id}/rebuild-tallies", status_code=202)
+async def start_rebuild_tallies_job(survey_id: str, current_user: dict = Depends(get_current_user)):
+    await _survey_for_owner(survey_id, current_user)
+    return await job_runner.submit("rebuild_tallies", {"survey_id": survey_id}, created_by=current_user["id"], dedupe=True)
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    return await _job_for_user(job_id, current_user)
+
+@api_router.get("/jobs/{job_id}/download")
+async def download_job_result(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = await _job_for_user(job_id, current_user)
+    result = job.get("result") or {}
+    if job["status"] != "completed" or not result.get("file"):
+        raise HTTPException(status_code=409, detail="Job has no downloadable result")
+    path = JOB_RESULTS_DIR / result["file"]
+    if not path.is_file():
+        raise HTTPException(status_code=410, detail="Job result expired")
+    return FileResponse(path, media_type=result.get("media_type"), filename=result.get("filename") or path.name)
+
+@api_router.get("/admin/jobs")
+async def list_jobs(
+    status: Optional[Literal["queued", "running", "completed", "failed"]] = None,
+    type: Optional[str] = None,
+    limit: int = 50,
+    admin: dict = Depends(get_admin_user)
+):
+    query = {}
+    if status:
+        query["status"] = status
+    if type:
+        query["type"] = type
+    return await db.jobs.find(query, {"_id": 0}).sort("created_at", -1).to_list(min(max(limit, 1), 200))
+
 # ===================== SUGGESTION ROUTES =====================
 
 @api_router.post("/suggestions", response_model=Suggestion)
@@ -1144,7 +2496,7 @@ async def create_suggestion(data: SuggestionCreate, current_user: dict = Depends
 @api_router.get("/suggestions", response_model=List[Suggestion])
 async def get_suggestions(admin: dict = Depends(get_admin_user)):
     suggestions = await db.suggestions.find({}, {"_id": 0}).to_list(1000)
-    return [Suggestion(**s) for s in suggestions]
+    return FastJSONResponse(content=[SuggestionRead.from_doc(s) for s in suggestions])
 
 @api_router.put("/suggestions/{suggestion_id}/status")
 async def update_suggestion_status(
@@ -1194,7 +2546,7 @@ async def create_team_application(data: TeamApplicationCreate, current_user: dic
 @api_router.get("/team-applications", response_model=List[TeamApplication])
 async def get_team_applications(admin: dict = Depends(get_admin_user)):
     applications = await db.team_applications.find({}, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return [TeamApplication(**app) for app in applications]
+    return FastJSONResponse(content=[TeamApplicationRead.from_doc(app) for app in applications])
 
 @api_router.put("/team-applications/{application_id}/status")
 async def update_team_application_status(
@@ -1227,9 +2579,96 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
 
+@api_router.get("/health/ready")
+async def readiness_check():
+    """Readiness probe: faz ping ao MongoDB e devolve 503 se o worker estiver sobrecarregado"""
+    failures = []
+    db_status = {"reachable": False, "latency_ms": None}
+    
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(client.admin.command("ping"), timeout=READINESS_PING_TIMEOUT_MS / 1000)
+        db_status["reachable"] = True
+        db_status["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if db_status["latency_ms"] > READINESS_MAX_DB_LATENCY_MS:
+            failures.append("db_latency")
+    except asyncio.TimeoutError:
+        failures.append("db_timeout")
+    except Exception as e:
+        logger.warning(f"Readiness ping failed: {e}")
+        failures.append("db_unreachable")
+    
+    pool = pool_monitor.snapshot()
+    if pool["max_size"] and pool["in_use"] / pool["max_size"] > READINESS_MAX_POOL_UTILIZATION:
+        failures.append("db_pool_saturated")
+    
+    loop = loop_lag_monitor.snapshot()
+    if loop["lag_ms"] > READINESS_MAX_LOOP_LAG_MS:
+        failures.append("event_loop_lag")
+    
+    return JSONResponse(
+        status_code=503 if failures else 200,
+        content={
+            "status": "unavailable" if failures else "ready",
+            "failures": failures,
+            "database": db_status,
+            "pool": pool,
+            "event_loop": loop,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        }
+    )
+
+@api_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Métricas no formato de texto do Prometheus"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    
+    pool = pool_monitor.snapshot()
+    loop = loop_lag_monitor.snapshot()
+    body = metrics.render() + "\n".join([
+        "# TYPE mongodb_pool_connections_in_use gauge",
+        f"mongodb_pool_connections_in_use {pool['in_use']}",
+        "# TYPE mongodb_pool_connections_available gauge",
+        f"mongodb_pool_connections_available {pool['available']}",
+        "# TYPE mongodb_pool_connections_open gauge",
+        f"mongodb_pool_connections_open {pool['open']}",
+        "# TYPE event_loop_lag_seconds gauge",
+        f"event_loop_lag_seconds {loop['lag_ms'] / 1000}",
+    ]) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 # Include the router in the main app
 app.include_router(api_router)
 
+if COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_level=COMPRESSION_GZIP_LEVEL,
+        brotli_quality=COMPRESSION_BROTLI_QUALITY
+    )
+app.add_middleware(QueryBudgetMiddleware, budget=DB_QUERY_BUDGET, debug_headers=DEBUG, logger=logger)
+if ADMISSION_ENABLED:
+    admission_classes = {
+        name: RouteClass(
+            name, priority,
+            int(os.environ.get(f'ADMISSION_{name.upper()}_LIMIT', limit)),
+            int(os.environ.get(f'ADMISSION_{name.upper()}_QUEUE', queue_size)),
+            timeout, ADMISSION_PATTERNS.get(name, ())
+        )
+        for name, (priority, limit, queue_size, timeout) in ADMISSION_DEFAULTS.items()
+    }
+    default_class = admission_classes.pop("default")
+    metrics.describe("admission_rejected_total", "Pedidos rejeitados (503) pelo controlo de admissão por classe de rota.")
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=AdmissionController(admission_classes.values(), default_class, ADMISSION_MAX_CONCURRENCY),
+        exempt_paths=("/api/health", "/api/health/ready", "/api/metrics"),
+        metrics=metrics
+    )
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1238,6 +2677,94 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+async def ensure_indexes():
+    """Cria os índices usados pelas coleções auxiliares (idempotente)"""
+    await db.rating_stats.create_index(
+        [("survey_id", ASCENDING), ("question_id", ASCENDING), ("bucket", ASCENDING)], unique=True
+    )
+    # Índice de texto com prefixo de igualdade em survey_id; a versão 3 ignora acentos e maiúsculas
+    await db.text_answers.create_index(
+        [("survey_id", ASCENDING), ("value", TEXT)],
+        default_language="portuguese",
+        name="text_answers_search"
+    )
+    await db.text_answers.create_index([("response_id", ASCENDING), ("question_id", ASCENDING)])
+    await db.term_frequencies.create_index(
+        [("survey_id", ASCENDING), ("question_id", ASCENDING), ("term", ASCENDING)], unique=True
+    )
+    await db.term_frequencies.create_index(
+        [("survey_id", ASCENDING), ("question_id", ASCENDING), ("count", DESCENDING)]
+    )
+    await db.term_frequencies.create_index(
+        [("survey_id", ASCENDING), ("question_id", ASCENDING), ("ngram", ASCENDING), ("count", DESCENDING)]
+    )
+    await db.password_recovery.create_index([("created_at", DESCENDING)])
+    await db.password_recovery.create_index([("status", ASCENDING), ("created_at", DESCENDING)])
+    await db.password_recovery.create_index([("status", ASCENDING), ("expires_at", ASCENDING)])
+    await db.password_recovery.create_index([("user_email", ASCENDING), ("recovery_code", ASCENDING)])
+    await db.password_recovery.create_index([("purge_at", ASCENDING)], expireAfterSeconds=0)
+    await db.responses.create_index([("user_id", ASCENDING), ("submitted_at", DESCENDING)])
+    await db.responses.create_index([("survey_id", ASCENDING), ("submitted_at", DESCENDING)])
+    await db.responses.create_index([("submitted_at", DESCENDING)])
+    await db.suggestions.create_index([("user_id", ASCENDING)])
+    await db.team_applications.create_index([("user_id", ASCENDING)])
+    for collection in (db.suggestions, db.team_applications, db.password_recovery):
+        # Caixa de entrada dos admins: keyset em (created_at, id), com ou sem filtro de estado
+        await collection.create_index([("created_at", DESCENDING), ("id", DESCENDING)])
+        await collection.create_index([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)])
+    await db.deleted_surveys.create_index([("id", ASCENDING)])
+    await db.deleted_users.create_index([("id", ASCENDING)])
+    await db.deleted_surveys.create_index([("purged_at", ASCENDING)])
+    await db.deleted_users.create_index([("purged_at", ASCENDING)])
+    await db.response_archives.create_index([("survey_id", ASCENDING), ("bucket", ASCENDING)], unique=True)
+    await db.response_archives.create_index([("user_ids", ASCENDING)])
+    await db.survey_snapshots.create_index([("survey_id", ASCENDING)], unique=True)
+    await db.surveys.create_index([("id", ASCENDING)], unique=True)
+    await db.surveys.create_index([("closes_at", ASCENDING), ("closed_at", ASCENDING)])
+    await db.jobs.create_index([("id", ASCENDING)], unique=True)
+    await db.jobs.create_index([("dedupe_key", ASCENDING)], unique=True, sparse=True)
+    await db.jobs.create_index([("status", ASCENDING), ("created_at", DESCENDING)])
+    await db.jobs.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+    await db.rate_limits.create_index([("key", ASCENDING)], unique=True)
+    await db.rate_limits.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+# Tarefas de manutenção periódicas (idempotentes: podem correr em vários workers)
+periodic_tasks = [
+    PeriodicTask("recovery-expiry", expire_recovery_requests, RECOVERY_SWEEP_INTERVAL_SECONDS),
+    PeriodicTask("survey-closer", close_due_surveys, SURVEY_CLOSE_INTERVAL_SECONDS),
+    PeriodicTask("tally-backfill", backfill_legacy_tallies, TALLY_BACKFILL_INTERVAL_SECONDS),
+    PeriodicTask("purge-resume", resume_pending_purges, PURGE_RESUME_INTERVAL_SECONDS),
+]
+if ARCHIVE_ENABLED:
+    periodic_tasks.append(PeriodicTask("survey-archiver", archive_closed_surveys, ARCHIVE_SCAN_INTERVAL_SECONDS))
+
+@app.on_event("startup")
+async def start_monitors():
+    loop_lag_monitor.start()
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to create indexes: {e}")
+    try:
+        await job_runner.start()
+    except Exception as e:
+        logger.error(f"Failed to start job runner: {e}")
+    for task in periodic_tasks:
+        task.start()
+    if results_publisher is not None:
+        # Os ficheiros são locais a cada servidor: publicar os destaques atuais ao arrancar
+        try:
+            async for survey in db.surveys.find({"is_featured": True, "is_published": True}, {"_id": 0, "id": 1}):
+                results_publisher.schedule(survey["id"])
+        except Exception as e:
+            logger.error(f"Failed to schedule static results: {e}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await loop_lag_monitor.stop()
+    for task in periodic_tasks:
+        await task.stop()
+    if results_publisher is not None:
+        await results_publisher.stop()
+    await job_runner.stop()
     client.close()
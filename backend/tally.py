@@ -0,0 +1,220 @@
+"""Motor de contagem partilhado pelos endpoints de resultados.
+
+Faz uma única passagem pelas respostas e alimenta um acumulador por pergunta
+(mapa question_id -> acumulador), em vez de percorrer todas as respostas uma
+vez por pergunta. Os formatadores em ``analytics`` leem apenas os acumuladores.
+
+A passagem agrupa os valores por pergunta e cada acumulador conta-os de uma vez
+com ``Counter`` (implementado em C), o que evita uma chamada Python por resposta.
+"""
+import math
+from collections import Counter
+
+
+class RatingStats:
+    """Acumulador combinável para perguntas ``rating``: histograma mais momentos (n, soma, soma dos quadrados).
+
+    Dois acumuladores (p.ex. de dias diferentes ou de células demográficas) combinam-se
+    com ``merge`` sem voltar a ler as respostas; mediana e quartis saem do histograma,
+    média e desvio padrão dos momentos.
+    """
+    __slots__ = ("histogram", "n", "total", "total_sq")
+
+    def __init__(self):
+        self.histogram = Counter()
+        self.n = 0
+        self.total = 0
+        self.total_sq = 0
+
+    def add(self, rating: int, weight: int = 1):
+        self.histogram[rating] += weight
+        self.n += weight
+        self.total += rating * weight
+        self.total_sq += rating * rating * weight
+
+    def merge(self, other: "RatingStats") -> "RatingStats":
+        self.histogram.update(other.histogram)
+        self.n += other.n
+        self.total += other.total
+        self.total_sq += other.total_sq
+        return self
+
+    @classmethod
+    def from_histogram(cls, histogram: dict) -> "RatingStats":
+        stats = cls()
+        for rating, count in histogram.items():
+            stats.add(rating, count)
+        return stats
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "RatingStats":
+        stats = cls()
+        stats.histogram.update({int(k): v for k, v in (doc.get("hist") or {}).items() if v})
+        stats.n = doc.get("n", 0)
+        stats.total = doc.get("sum", 0)
+        stats.total_sq = doc.get("sumsq", 0)
+        return stats
+
+    def to_doc(self) -> dict:
+        return {
+            "hist": {str(k): v for k, v in self.histogram.items() if v},
+            "n": self.n,
+            "sum": self.total,
+            "sumsq": self.total_sq,
+        }
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else 0
+
+    @property
+    def std_dev(self) -> float:
+        if not self.n:
+            return 0
+        return math.sqrt(max(self.total_sq / self.n - self.mean ** 2, 0))
+
+    def _value_at(self, index: int) -> int:
+        seen = 0
+        for rating in sorted(self.histogram):
+            seen += self.histogram[rating]
+            if index < seen:
+                return rating
+        return max(self.histogram)
+
+    def quantile(self, q: float):
+        """Quantil com interpolação linear entre posições (como o método por omissão do numpy)"""
+        if not self.n:
+            return None
+        position = q * (self.n - 1)
+        lower, upper = math.floor(position), math.ceil(position)
+        low_value = self._value_at(lower)
+        if lower == upper:
+            return low_value
+        return low_value + (self._value_at(upper) - low_value) * (position - lower)
+
+    def nps(self, min_rating: int, max_rating: int):
+        """Net-promoter-style: % no topo da escala (>= 90%) menos % na base (<= 60%)"""
+        if not self.n or max_rating <= min_rating:
+            return None
+        span = max_rating - min_rating
+        promoters = sum(c for r, c in self.histogram.items() if (r - min_rating) / span >= 0.9)
+        detractors = sum(c for r, c in self.histogram.items() if (r - min_rating) / span <= 0.6)
+        return round((promoters - detractors) / self.n * 100, 1)
+
+    def summary(self, min_rating: int = 1, max_rating: int = 5) -> dict:
+        quartiles = [self.quantile(q) for q in (0.25, 0.5, 0.75)]
+        return {
+            "count": self.n,
+            "mean": round(self.mean, 2),
+            "median": quartiles[1],
+            "quartiles": {"q1": quartiles[0], "q2": quartiles[1], "q3": quartiles[2]},
+            "std_dev": round(self.std_dev, 3),
+            "nps": self.nps(min_rating, max_rating),
+        }
+
+
+class QuestionTally:
+    """Acumulador base: conta respostas e, opcionalmente, guarda os valores em bruto"""
+    __slots__ = ("question", "total", "counts", "values")
+
+    def __init__(self, question: dict, keep_values: bool = False):
+        self.question = question
+        self.total = 0
+        self.counts = Counter()
+        self.values = [] if keep_values else None
+
+    def add(self, value: str):
+        self.extend([value])
+
+    def extend(self, values: list):
+        self.total += len(values)
+        if self.values is not None:
+            self.values.extend(values)
+
+
+class ChoiceTally(QuestionTally):
+    """multiple_choice / yes_no: contagem por valor escolhido"""
+    __slots__ = ()
+
+    def extend(self, values: list):
+        super().extend(values)
+        self.counts.update(values)
+
+
+class CheckboxTally(QuestionTally):
+    """checkbox: contagem por opção, com os IDs separados por vírgulas"""
+    __slots__ = ()
+
+    def extend(self, values: list):
+        super().extend(values)
+        if values:
+            self.counts.update(','.join(values).split(','))
+
+
+class RatingTally(QuestionTally):
+    """rating: histograma das classificações válidas (inteiros não negativos)"""
+    __slots__ = ()
+
+    def extend(self, values: list):
+        super().extend(values)
+        counts = self.counts
+        for value, count in Counter(values).items():
+            if value.isdigit():
+                counts[int(value)] += count
+
+    @property
+    def stats(self) -> RatingStats:
+        return RatingStats.from_histogram(self.counts)
+
+    @property
+    def votes(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def average(self) -> float:
+        votes = self.votes
+        return sum(r * c for r, c in self.counts.items()) / votes if votes else 0
+
+
+TALLY_TYPES = {
+    "multiple_choice": ChoiceTally,
+    "yes_no": ChoiceTally,
+    "checkbox": CheckboxTally,
+    "rating": RatingTally,
+    "text": QuestionTally,
+}
+
+
+class SurveyTally:
+    """Acumuladores de todas as perguntas de uma sondagem"""
+
+    def __init__(self, questions: list, keep_values: bool = False):
+        self.total_responses = 0
+        self.questions = {
+            q["id"]: TALLY_TYPES.get(q["type"], QuestionTally)(q, keep_values)
+            for q in questions
+        }
+
+    def add(self, response: dict):
+        self.extend([response])
+
+    def extend(self, responses):
+        """Uma passagem pelas respostas: agrupa os valores por pergunta e conta-os por lote"""
+        grouped = {q_id: [] for q_id in self.questions}
+        appenders = {q_id: values.append for q_id, values in grouped.items()}
+        count = 0
+        for response in responses:
+            count += 1
+            for ans in response.get("answers", ()):
+                append = appenders.get(ans["question_id"])
+                if append is not None:
+                    append(ans["value"])
+        self.total_responses += count
+        for q_id, values in grouped.items():
+            self.questions[q_id].extend(values)
+
+    @classmethod
+    def from_responses(cls, survey: dict, responses, keep_values: bool = False) -> "SurveyTally":
+        tally = cls(survey.get("questions", []), keep_values)
+        tally.extend(responses)
+        return tally
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Permite importar os módulos do backend (tally, analytics, ...) nos testes unitários
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,81 @@
+"""
+Unit tests for the concurrency-based admission controller
+"""
+import asyncio
+import json
+
+from admission import AdmissionController, AdmissionMiddleware, RouteClass
+
+
+def make_controller(total=2):
+    critical = RouteClass("critical", 0, 10, 10, 1.0, [(("POST",), r"^/api/surveys/[^/]+/respond$")])
+    heavy = RouteClass("heavy", 2, 1, 1, 0.05, [(None, r"^/api/admin/users/export")])
+    default = RouteClass("default", 1, 10, 10, 1.0)
+    return AdmissionController([critical, heavy], default, total), critical, heavy, default
+
+
+def test_classify():
+    controller, critical, heavy, default = make_controller()
+    assert controller.classify("POST", "/api/surveys/abc/respond") is critical
+    assert controller.classify("GET", "/api/surveys/abc/respond") is default
+    assert controller.classify("GET", "/api/admin/users/export/csv") is heavy
+
+
+def test_full_queue_is_rejected_immediately():
+    async def scenario():
+        controller, _, heavy, _ = make_controller()
+        assert await controller.acquire(heavy)
+        waiting = asyncio.create_task(controller.acquire(heavy))
+        await asyncio.sleep(0)
+        # Limite 1 e fila 1 ocupados: o terceiro é rejeitado sem esperar
+        assert not await controller.acquire(heavy)
+        # O que está na fila desiste ao fim do timeout
+        assert not await waiting
+        assert controller.queued["heavy"] == 0
+        controller.release(heavy)
+        assert controller.snapshot()["total_active"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_freed_slot_goes_to_highest_priority_waiter():
+    async def scenario():
+        controller, critical, heavy, default = make_controller(total=1)
+        assert await controller.acquire(default)
+        heavy.timeout = 1.0
+        low = asyncio.create_task(controller.acquire(heavy))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(controller.acquire(critical))
+        await asyncio.sleep(0)
+        controller.release(default)
+        assert await high
+        assert not low.done()
+        controller.release(critical)
+        assert await low
+        controller.release(heavy)
+
+    asyncio.run(scenario())
+
+
+def test_middleware_returns_503_with_retry_after():
+    async def scenario():
+        controller, _, heavy, _ = make_controller()
+        heavy.queue_size = 0
+        assert await controller.acquire(heavy)
+        sent = []
+
+        async def app(scope, receive, send):
+            raise AssertionError("should not be called")
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = AdmissionMiddleware(app, controller, retry_after=2)
+        scope = {"type": "http", "method": "GET", "path": "/api/admin/users/export/csv"}
+        await middleware(scope, None, send)
+        return sent
+
+    start, body = asyncio.run(scenario())
+    assert start["status"] == 503
+    assert (b"retry-after", b"2") in start["headers"]
+    assert "detail" in json.loads(body["body"])
@@ -0,0 +1,67 @@
+"""
+Unit tests for the compressed response archive helpers
+"""
+from datetime import datetime, timezone
+
+from archive import CODEC, bucket_doc, pack, survey_closes_at, survey_is_closed, unpack, without_user
+
+
+def make_responses(n):
+    return [
+        {"id": str(i), "survey_id": "s1", "user_id": f"u{i % 3}" if i % 4 else None,
+         "answers": [{"question_id": "q1", "value": "Saúde pública"}],
+         "submitted_at": f"2025-01-01T00:00:{i:02d}+00:00"}
+        for i in range(n)
+    ]
+
+
+def test_pack_roundtrip_and_compresses():
+    responses = make_responses(50)
+    data = pack(responses)
+    assert unpack(data) == responses
+    assert len(data) < len(repr(responses)) / 5
+
+
+def test_bucket_doc_indexes_users_and_range():
+    responses = make_responses(8)
+    doc = bucket_doc("s1", 2, responses)
+    assert doc["bucket"] == 2 and doc["count"] == 8 and doc["codec"] == CODEC
+    assert doc["user_ids"] == ["u0", "u1", "u2"]
+    assert doc["first_submitted_at"] == responses[0]["submitted_at"]
+    assert doc["last_submitted_at"] == responses[-1]["submitted_at"]
+    assert unpack(doc["data"]) == responses
+
+
+def test_survey_closes_at_end_of_date():
+    assert survey_closes_at("2025-03-01") == datetime(2025, 3, 2, tzinfo=timezone.utc)
+    assert survey_closes_at("2025-03-01T12:00:00Z") == datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+    assert survey_closes_at("2025-03-01T12:00:00") == datetime(2025, 3, 1, 12, tzinfo=timezone.utc)
+    assert survey_closes_at("") is None
+    assert survey_closes_at("amanhã") is None
+
+
+def test_survey_is_closed():
+    now = datetime(2025, 3, 2, 0, 0, 1, tzinfo=timezone.utc)
+    assert survey_is_closed({"end_date": "2025-03-01"}, now)
+    assert not survey_is_closed({"end_date": "2025-03-02"}, now)
+    assert not survey_is_closed({"end_date": None}, now)
+    assert survey_is_closed({"end_date": None, "closed_at": "2025-01-01T00:00:00+00:00"}, now)
+    assert survey_is_closed({"archive_state": "archiving"}, now)
+    # closes_at guardado tem precedência e pode vir sem fuso
+    assert survey_is_closed({"end_date": "2025-03-05", "closes_at": datetime(2025, 3, 1)}, now)
+
+
+def test_without_user_repacks_bucket():
+    responses = make_responses(8)
+    bucket = bucket_doc("s1", 1, responses)
+    doc, removed = without_user(bucket, "u1")
+    assert [r["id"] for r in removed] == ["1", "7"]
+    assert doc["bucket"] == 1 and doc["count"] == 6
+    assert doc["user_ids"] == ["u0", "u2"]
+    assert unpack(doc["data"]) == [r for r in responses if r["user_id"] != "u1"]
+
+
+def test_without_user_empties_bucket():
+    responses = [r for r in make_responses(8) if r["user_id"] == "u2"]
+    doc, removed = without_user(bucket_doc("s1", 0, responses), "u2")
+    assert doc is None and removed == responses
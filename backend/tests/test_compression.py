@@ -0,0 +1,109 @@
+"""
+Unit tests for the gzip/brotli compression middleware
+"""
+import asyncio
+import gzip
+import json
+
+from compression import CompressionMiddleware, base_etag, choose_encoding, encoded_etag, parse_accept_encoding
+
+
+def make_app(body: bytes, content_type: bytes = b"application/json", chunks: int = 0):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", content_type), (b"content-length", str(len(body)).encode())
+        ]})
+        if chunks:
+            size = len(body) // chunks + 1
+            for i in range(0, len(body), size):
+                await send({"type": "http.response.body", "body": body[i:i + size], "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        else:
+            await send({"type": "http.response.body", "body": body})
+    return app
+
+
+def call(app, accept: str = "gzip"):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept.encode())]}
+    asyncio.run(app(scope, receive, send))
+    headers = dict(messages[0]["headers"])
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return headers, body, messages
+
+
+BIG_BODY = json.dumps([{"question_id": "0f8fad5b-d9cb-469f-a165-70867728950e", "value": "Sim"}] * 200).encode()
+
+
+class TestAcceptEncoding:
+    def test_parse_quality_values(self):
+        assert parse_accept_encoding("gzip, br;q=0.5, *;q=0") == {"gzip": 1.0, "br": 0.5, "*": 0.0}
+
+    def test_gzip_refused(self):
+        assert choose_encoding("gzip;q=0", brotli_enabled=False) is None
+        assert choose_encoding("identity") is None
+
+
+class TestCompressionMiddleware:
+    def test_compresses_large_json(self):
+        app = CompressionMiddleware(make_app(BIG_BODY), minimum_size=500, brotli_enabled=False)
+        headers, body, _ = call(app)
+        assert headers[b"content-encoding"] == b"gzip"
+        assert headers[b"vary"] == b"Accept-Encoding"
+        assert int(headers[b"content-length"]) == len(body) < len(BIG_BODY)
+        assert gzip.decompress(body) == BIG_BODY
+
+    def test_small_body_untouched(self):
+        app = CompressionMiddleware(make_app(b'{"ok": true}'), minimum_size=500)
+        headers, body, _ = call(app)
+        assert b"content-encoding" not in headers
+        assert body == b'{"ok": true}'
+
+    def test_content_type_not_in_allowlist(self):
+        app = CompressionMiddleware(make_app(BIG_BODY, b"image/png"), minimum_size=10)
+        headers, body, _ = call(app)
+        assert b"content-encoding" not in headers
+        assert body == BIG_BODY
+
+    def test_no_accept_encoding(self):
+        app = CompressionMiddleware(make_app(BIG_BODY), minimum_size=10)
+        headers, body, _ = call(app, accept="identity")
+        assert b"content-encoding" not in headers
+
+    def test_streaming_is_compressed_incrementally(self):
+        app = CompressionMiddleware(make_app(BIG_BODY, b"text/csv; charset=utf-8", chunks=4), brotli_enabled=False)
+        headers, body, messages = call(app)
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+        # Cada bloco é enviado assim que é comprimido
+        assert len(messages) >= 5
+        assert gzip.decompress(body) == BIG_BODY
+
+
+def test_etag_gets_encoding_suffix_when_compressed():
+    body = json.dumps({"items": ["x" * 20] * 200}).encode()
+
+    def app_with_etag(scope, receive, send):
+        async def wrapped_send(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": message["headers"] + [(b"etag", b'"abc"')]}
+            await send(message)
+        return make_app(body)(scope, receive, wrapped_send)
+
+    headers, _, _ = call(CompressionMiddleware(app_with_etag), "gzip")
+    assert headers[b"etag"] == b'"abc-gzip"'
+    headers, _, _ = call(CompressionMiddleware(app_with_etag), "identity")
+    assert headers[b"etag"] == b'"abc"'
+
+
+def test_base_etag_matches_all_forms():
+    assert encoded_etag(b'"abc"', "br") == b'"abc-br"'
+    for tag in ('"abc"', '"abc-gzip"', '"abc-br"', 'W/"abc-gzip"', 'W/"abc"'):
+        assert base_etag(tag) == '"abc"'
@@ -0,0 +1,262 @@
+"""
+Unit tests for the background job runner (with an in-memory stand-in for the jobs collection)
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+from types import SimpleNamespace
+
+from jobs import JobRunner, PeriodicTask
+
+
+class MemoryCollection:
+    """Subconjunto mínimo da API do Motor usado pelo JobRunner (filtros por igualdade, $in e $lt)"""
+
+    def __init__(self):
+        self.docs = []
+
+    @staticmethod
+    def _match_value(value, cond):
+        if isinstance(cond, dict) and "$in" in cond:
+            return value in cond["$in"]
+        if isinstance(cond, dict) and "$lt" in cond:
+            return value is not None and value < cond["$lt"]
+        return value == cond
+
+    def _match(self, doc, query):
+        return all(self._match_value(doc.get(k), v) for k, v in query.items())
+
+    async def insert_one(self, doc):
+        self.docs.append(dict(doc))
+
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if self._match(d, query)), None)
+
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if self._match(doc, query):
+                doc.update(update["$set"])
+                for key in update.get("$unset", {}):
+                    doc.pop(key, None)
+                return
+
+    async def update_many(self, query, update):
+        matched = [doc for doc in self.docs if self._match(doc, query)]
+        for doc in matched:
+            doc.update(update["$set"])
+            for key in update.get("$unset", {}):
+                doc.pop(key, None)
+        return SimpleNamespace(modified_count=len(matched))
+
+    async def find_one_and_update(self, query, update, projection=None):
+        for doc in self.docs:
+            if self._match(doc, query):
+                doc.update(update["$set"])
+                return dict(doc)
+        return None
+
+
+async def wait_finished(collection, job_id):
+    for _ in range(200):
+        job = await collection.find_one({"id": job_id})
+        if job["status"] in ("completed", "failed"):
+            return job
+        await asyncio.sleep(0.005)
+    raise AssertionError("job did not finish")
+
+
+def test_job_runs_and_stores_result_and_progress(tmp_path):
+    async def handler(ctx):
+        ctx.result_path("out.txt").write_text(ctx.params["text"])
+        await ctx.progress(3, 3)
+        return {"file": ctx.result_path("out.txt").name}
+
+    async def scenario():
+        collection = MemoryCollection()
+        runner = JobRunner(collection, tmp_path)
+        runner.register("echo", handler)
+        job = await runner.submit("echo", {"text": "olá"}, created_by="u1")
+        assert job["status"] == "queued"
+        # Sem expires_at até terminar: o índice TTL não pode apagar uma tarefa a meio
+        assert "expires_at" not in job
+        return await wait_finished(collection, job["id"])
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "completed"
+    assert job["expires_at"] > datetime.now(timezone.utc)
+    assert job["progress"] == {"done": 3, "total": 3}
+    assert (tmp_path / job["result"]["file"]).read_text() == "olá"
+
+
+def test_failed_job_records_error(tmp_path):
+    async def handler(ctx):
+        raise ValueError("Survey not found")
+
+    async def scenario():
+        collection = MemoryCollection()
+        runner = JobRunner(collection, tmp_path)
+        runner.register("broken", handler)
+        job = await runner.submit("broken")
+        return await wait_finished(collection, job["id"])
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "failed"
+    assert job["error"] == "Survey not found"
+
+
+def test_concurrency_is_limited_per_type(tmp_path):
+    running = {"now": 0, "max": 0}
+
+    async def handler(ctx):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        return {}
+
+    async def scenario():
+        collection = MemoryCollection()
+        runner = JobRunner(collection, tmp_path)
+        runner.register("slow", handler, concurrency=2)
+        jobs = [await runner.submit("slow", {"n": i}) for i in range(5)]
+        for job in jobs:
+            await wait_finished(collection, job["id"])
+
+    asyncio.run(scenario())
+    assert running["max"] == 2
+
+
+def test_dedupe_returns_active_job(tmp_path):
+    async def handler(ctx):
+        await asyncio.sleep(0.01)
+        return {}
+
+    async def scenario():
+        collection = MemoryCollection()
+        runner = JobRunner(collection, tmp_path)
+        runner.register("rebuild", handler)
+        first = await runner.submit("rebuild", {"survey_id": "s1"}, dedupe=True)
+        second = await runner.submit("rebuild", {"survey_id": "s1"}, dedupe=True)
+        await wait_finished(collection, first["id"])
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first["id"] == second["id"]
+
+
+def test_periodic_task_keeps_running_after_errors():
+    calls = []
+
+    async def sweep():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("transient")
+
+    async def scenario():
+        task = PeriodicTask("sweep", sweep, 0.001)
+        task.start()
+        await asyncio.sleep(0.02)
+        await task.stop()
+
+    asyncio.run(scenario())
+    assert len(calls) >= 2
+
+
+def test_dedupe_falls_back_to_existing_job_on_duplicate_key(tmp_path):
+    class DuplicateKeyError(Exception):
+        code = 11000
+
+    class RacingCollection(MemoryCollection):
+        """Outro worker criou a mesma tarefa entre a verificação e a inserção"""
+
+        async def insert_one(self, doc):
+            if any(d.get("dedupe_key") == doc.get("dedupe_key") for d in self.docs):
+                raise DuplicateKeyError()
+            await super().insert_one(doc)
+
+        async def find_one(self, query, projection=None):
+            if "status" in query:
+                return None
+            return await super().find_one(query, projection)
+
+    async def handler(ctx):
+        await asyncio.sleep(0.01)
+        return {}
+
+    async def scenario():
+        collection = RacingCollection()
+        runner = JobRunner(collection, tmp_path)
+        runner.register("archive", handler)
+        first = await runner.submit("archive", {"survey_id": "s1"}, dedupe=True)
+        second = await runner.submit("archive", {"survey_id": "s1"}, dedupe=True)
+        finished = await wait_finished(collection, first["id"])
+        return first, second, finished
+
+    first, second, finished = asyncio.run(scenario())
+    assert second["id"] == first["id"]
+    assert "dedupe_key" not in finished
+
+
+def test_heartbeat_is_refreshed_without_progress(tmp_path):
+    seen = []
+
+    async def handler(ctx):
+        job = await ctx.runner.get(ctx.id)
+        first = job["heartbeat_at"]
+        await asyncio.sleep(0.05)
+        job = await ctx.runner.get(ctx.id)
+        seen.append(job["heartbeat_at"] > first)
+        return {}
+
+    async def scenario():
+        collection = MemoryCollection()
+        runner = JobRunner(collection, tmp_path, heartbeat_interval=0.005)
+        runner.register("long", handler)
+        job = await runner.submit("long")
+        return await wait_finished(collection, job["id"])
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "completed"
+    assert seen == [True]
+
+
+def test_sweep_fails_stale_running_jobs_and_frees_dedupe(tmp_path):
+    now = datetime.now(timezone.utc)
+
+    async def scenario():
+        collection = MemoryCollection()
+        collection.docs = [
+            {"id": "stale", "status": "running", "heartbeat_at": now - timedelta(minutes=30), "dedupe_key": "k1"},
+            {"id": "alive", "status": "running", "heartbeat_at": now, "dedupe_key": "k2"},
+        ]
+        runner = JobRunner(collection, tmp_path, stale_after=timedelta(minutes=10))
+        swept = await runner.sweep_stale()
+        return swept, {d["id"]: d for d in collection.docs}
+
+    swept, docs = asyncio.run(scenario())
+    assert swept == 1
+    assert docs["stale"]["status"] == "failed" and "dedupe_key" not in docs["stale"]
+    assert docs["stale"]["expires_at"] > now
+    assert docs["alive"]["status"] == "running" and docs["alive"]["dedupe_key"] == "k2"
+    assert "expires_at" not in docs["alive"]
+
+
+def test_cancelled_job_is_requeued_when_registered_so(tmp_path):
+    async def handler(ctx):
+        await asyncio.sleep(10)
+        return {}
+
+    async def scenario():
+        collection = MemoryCollection()
+        runner = JobRunner(collection, tmp_path)
+        runner.register("purge", handler, requeue_on_cancel=True)
+        runner.register("export", handler)
+        purge = await runner.submit("purge", {"survey_id": "s1"}, dedupe=True)
+        export = await runner.submit("export")
+        await asyncio.sleep(0.01)
+        await runner.stop()
+        return await collection.find_one({"id": purge["id"]}), await collection.find_one({"id": export["id"]})
+
+    purge, export = asyncio.run(scenario())
+    assert purge["status"] == "queued" and purge["started_at"] is None
+    assert "dedupe_key" in purge
+    assert export["status"] == "failed" and export["error"] == "Interrupted"
@@ -0,0 +1,145 @@
+"""
+Unit tests for the per-request MongoDB query accounting
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from observability import CommandMonitor, MetricsRegistry, QueryBudgetMiddleware, RequestDbStats, query_shape
+
+
+def command_event(command_name: str, command: dict, request_id: int, duration_micros: int = 1500):
+    return SimpleNamespace(
+        command_name=command_name, command=command, connection_id=("localhost", 27017),
+        request_id=request_id, duration_micros=duration_micros
+    )
+
+
+def run_query(monitor: CommandMonitor, request_id: int, collection: str = "users", filt: dict = None):
+    event = command_event("find", {"find": collection, "filter": filt or {"id": "u1"}}, request_id)
+    monitor.started(event)
+    monitor.succeeded(event)
+
+
+def make_app(monitor: CommandMonitor, before: int, after: int = 0, streaming: bool = False):
+    async def app(scope, receive, send):
+        for i in range(before):
+            run_query(monitor, i)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        if streaming:
+            await send({"type": "http.response.body", "body": b"[", "more_body": True})
+        for i in range(after):
+            run_query(monitor, before + i)
+        await send({"type": "http.response.body", "body": b"[]"})
+    return app
+
+
+def call(app):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    scope = {"type": "http", "method": "GET", "path": "/api/surveys", "headers": []}
+    asyncio.run(app(scope, receive, send))
+    return dict(messages[0]["headers"]), messages
+
+
+class TestQueryShape:
+    def test_find_uses_filter_keys_without_values(self):
+        assert query_shape("find", "users", {"find": "users", "filter": {"role": "admin", "id": "u1"}}) == "find users {id,role}"
+
+    def test_update_and_delete_use_first_statement(self):
+        command = {"update": "surveys", "updates": [{"q": {"id": "s1"}, "u": {"$inc": {"response_count": 1}}}]}
+        assert query_shape("update", "surveys", command) == "update surveys {id}"
+        assert query_shape("delete", "jobs", {"delete": "jobs", "deletes": [{"q": {"status": "done"}}]}) == "delete jobs {status}"
+
+    def test_aggregate_uses_leading_match(self):
+        command = {"aggregate": "responses", "pipeline": [{"$match": {"survey_id": "s1"}}, {"$group": {"_id": None}}]}
+        assert query_shape("aggregate", "responses", command) == "aggregate responses {survey_id}"
+        assert query_shape("aggregate", "responses", {"aggregate": "responses", "pipeline": []}) == "aggregate responses {}"
+
+
+class TestRequestDbStats:
+    def test_most_repeated(self):
+        stats = RequestDbStats()
+        assert stats.most_repeated() == (None, 0)
+        for shape in ["find users {id}", "find surveys {id}", "find users {id}"]:
+            stats.record(shape, 0.002)
+        assert stats.count == 3
+        assert stats.duration == pytest.approx(0.006)
+        assert stats.most_repeated() == ("find users {id}", 2)
+
+    def test_concurrent_records_are_not_lost(self):
+        stats = RequestDbStats()
+
+        def worker():
+            for _ in range(2000):
+                stats.record("find users {id}", 0.0)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert stats.count == stats.shapes["find users {id}"] == 16000
+
+
+class TestQueryBudgetMiddleware:
+    def test_debug_headers_count_queries(self):
+        monitor = CommandMonitor(MetricsRegistry())
+        app = QueryBudgetMiddleware(make_app(monitor, before=3), budget=10, debug_headers=True)
+        headers, _ = call(app)
+        assert headers[b"x-db-queries"] == b"3"
+        assert float(headers[b"x-db-time-ms"]) == pytest.approx(4.5)
+
+    def test_queries_before_first_body_chunk_are_counted(self):
+        monitor = CommandMonitor(MetricsRegistry())
+        app = QueryBudgetMiddleware(make_app(monitor, before=1, after=2), budget=10, debug_headers=True)
+        headers, _ = call(app)
+        assert headers[b"x-db-queries"] == b"3"
+
+    def test_streaming_responses_get_no_partial_headers(self):
+        monitor = CommandMonitor(MetricsRegistry())
+        app = QueryBudgetMiddleware(make_app(monitor, before=1, after=2, streaming=True), budget=10, debug_headers=True)
+        headers, messages = call(app)
+        assert b"x-db-queries" not in headers
+        assert b"".join(m.get("body", b"") for m in messages[1:]) == b"[[]"
+
+    def test_no_headers_without_debug(self):
+        monitor = CommandMonitor(MetricsRegistry())
+        headers, _ = call(QueryBudgetMiddleware(make_app(monitor, before=2), budget=10))
+        assert b"x-db-queries" not in headers
+
+    def test_warns_when_budget_exceeded(self, caplog):
+        monitor = CommandMonitor(MetricsRegistry())
+        logger = logging.getLogger("test_observability")
+        app = QueryBudgetMiddleware(make_app(monitor, before=4), budget=3, logger=logger)
+        with caplog.at_level(logging.WARNING, logger="test_observability"):
+            call(app)
+        assert "4 queries" in caplog.text
+        assert "most repeated: find users {id} x4" in caplog.text
+
+    def test_queries_from_executor_threads_are_attributed(self):
+        # O Motor corre o pymongo numa thread do executor com uma cópia do contexto do pedido
+        monitor = CommandMonitor(MetricsRegistry())
+
+        async def app(scope, receive, send):
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(
+                loop.run_in_executor(None, contextvars.copy_context().run, run_query, monitor, i) for i in range(5)
+            ))
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        headers, _ = call(QueryBudgetMiddleware(app, budget=10, debug_headers=True))
+        assert headers[b"x-db-queries"] == b"5"
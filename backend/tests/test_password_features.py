@@ -28,6 +28,16 @@ class TestHealthCheck:
         assert data["status"] == "healthy"
         print("✓ API health check passed")
 
+    def test_api_readiness(self):
+        response = requests.get(f"{BASE_URL}/api/health/ready")
+        assert response.status_code in (200, 503)
+        data = response.json()
+        assert data["status"] in ("ready", "unavailable")
+        assert "latency_ms" in data["database"]
+        assert "in_use" in data["pool"] and "available" in data["pool"]
+        assert "lag_ms" in data["event_loop"]
+        print(f"✓ API readiness check: {data['status']}")
+
 
 class TestPasswordChange:
     """Test password change from profile page"""
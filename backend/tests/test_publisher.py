@@ -0,0 +1,71 @@
+"""
+Unit tests for the static results publisher
+"""
+import asyncio
+import os
+
+import pytest
+
+from publisher import LATEST, ResultsPublisher
+
+
+def make_publisher(tmp_path, results, debounce=0.01, keep_versions=3):
+    calls = []
+
+    async def render(survey_id):
+        calls.append(survey_id)
+        return results.get(survey_id)
+
+    return ResultsPublisher(tmp_path, render, debounce=debounce, keep_versions=keep_versions), calls
+
+
+def test_publish_writes_versioned_and_latest(tmp_path):
+    publisher, _ = make_publisher(tmp_path, {"s1": ("v1", b'{"total":1}')})
+    assert asyncio.run(publisher.publish("s1")) == "v1"
+    survey_dir = publisher.survey_dir("s1")
+    assert (survey_dir / "results.v1.json").read_bytes() == b'{"total":1}'
+    assert (survey_dir / LATEST).read_bytes() == b'{"total":1}'
+    assert publisher.read("s1", "v1") == b'{"total":1}'
+    assert publisher.read("s1", "v2") is None
+
+
+def test_publish_none_removes_files(tmp_path):
+    results = {"s1": ("v1", b"{}")}
+    publisher, _ = make_publisher(tmp_path, results)
+    asyncio.run(publisher.publish("s1"))
+    results.pop("s1")
+    assert asyncio.run(publisher.publish("s1")) is None
+    assert not publisher.survey_dir("s1").exists()
+
+
+def test_old_versions_are_pruned(tmp_path):
+    publisher, _ = make_publisher(tmp_path, {}, keep_versions=2)
+    for i in range(4):
+        publisher.write("s1", f"v{i}", b"{}")
+        path = publisher.path_for("s1", f"v{i}")
+        stat = path.stat()
+        os.utime(path, (stat.st_atime, stat.st_mtime + i))
+    publisher.write("s1", "v3", b"{}")
+    names = sorted(p.name for p in publisher.survey_dir("s1").iterdir())
+    assert names == ["results.json", "results.v2.json", "results.v3.json"]
+
+
+def test_schedule_debounces_bursts(tmp_path):
+    publisher, calls = make_publisher(tmp_path, {"s1": ("v1", b"{}")})
+
+    async def scenario():
+        for _ in range(5):
+            publisher.schedule("s1")
+        await asyncio.sleep(0.05)
+        publisher.schedule("s1")
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert calls == ["s1", "s1"]
+
+
+def test_rejects_unsafe_names(tmp_path):
+    publisher, _ = make_publisher(tmp_path, {})
+    with pytest.raises(ValueError):
+        publisher.survey_dir("../etc")
+    assert publisher.read("s1", "../../x") is None
@@ -0,0 +1,89 @@
+"""
+Unit tests for the token-bucket rate limiter
+"""
+import asyncio
+
+import pytest
+
+from ratelimit import MemoryBackend, MongoBackend, Policy, RateLimiter, take
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeMetrics:
+    def __init__(self):
+        self.counts = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(labels.items()))
+        self.counts[key] = self.counts.get(key, 0) + value
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_policy_parse():
+    policy = Policy.parse("login_ip", "20/minute")
+    assert (policy.capacity, policy.period) == (20, 60)
+    assert Policy.parse("x", "3/hours").period == 3600
+    with pytest.raises(ValueError):
+        Policy.parse("x", "3/fortnight")
+
+
+def test_take_refills_up_to_capacity():
+    policy = Policy("p", 2, 2)  # 1 ficha por segundo
+    assert take(0, 0.5, policy) == (False, 0.5, 0.5)
+    allowed, tokens, _ = take(0, 100, policy)
+    assert allowed and tokens == 1
+
+
+def test_memory_backend_burst_then_limit_then_refill():
+    clock = FakeClock()
+    backend = MemoryBackend(clock=clock)
+    policy = Policy("login_user", 3, 60)
+    results = [run(backend.hit("k", policy))[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+    allowed, retry_after = run(backend.hit("k", policy))
+    assert not allowed and retry_after == pytest.approx(20)
+    clock.now += 20
+    assert run(backend.hit("k", policy))[0]
+    # Outras chaves têm o seu próprio balde
+    assert run(backend.hit("other", policy))[0]
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_keys=2, clock=FakeClock())
+    policy = Policy("p", 1, 60)
+    for key in ("a", "b", "c"):
+        run(backend.hit(key, policy))
+    assert list(backend._buckets) == ["b", "c"]
+
+
+def test_limiter_reports_retry_after_and_counts_decisions():
+    metrics = FakeMetrics()
+    limiter = RateLimiter(MemoryBackend(clock=FakeClock()), metrics)
+    policy = Policy("register_ip", 1, 90)
+    assert run(limiter.hit(policy, "1.2.3.4")) == (True, 0)
+    assert run(limiter.hit(policy, "1.2.3.4")) == (False, 90)
+    assert metrics.counts[("rate_limit_decisions_total", (("policy", "register_ip"), ("result", "limited")))] == 1
+
+
+def test_limiter_fails_open_on_backend_errors():
+    class Broken:
+        async def hit(self, key, policy, cost=1):
+            raise ConnectionError("down")
+
+    assert run(RateLimiter(Broken()).hit(Policy("p", 1, 1), "k")) == (True, 0)
+
+
+def test_mongo_pipeline_is_a_single_atomic_update():
+    pipeline = MongoBackend.pipeline(Policy("p", 10, 60))
+    assert [list(stage) for stage in pipeline] == [["$set"], ["$set"], ["$set"], ["$unset"]]
+    assert pipeline[2]["$set"]["expires_at"] == {"$add": ["$$NOW", 60000]}
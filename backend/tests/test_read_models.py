@@ -0,0 +1,42 @@
+"""
+Unit tests for the slotted read models used by the list endpoints
+"""
+from dataclasses import asdict
+
+import pytest
+
+from read_models import QuestionRead, SuggestionRead, SurveyRead, UserRead
+
+
+def test_from_doc_ignores_extra_fields_and_fills_defaults():
+    user = UserRead.from_doc({"_id": "x", "id": "u1", "email": "a@b.pt", "name": "Ana", "role": "user",
+                              "created_at": "2025-01-01", "password": "hash"})
+    data = asdict(user)
+    assert "password" not in data and "_id" not in data
+    assert data["accept_notifications"] is False
+    assert data["lived_abroad"] is None
+
+
+def test_nested_lists_become_read_models():
+    survey = SurveyRead.from_doc({
+        "id": "s1", "title": "T",
+        "questions": [{"id": "q1", "type": "multiple_choice", "text": "P", "options": [{"id": "o1", "text": "A"}]}],
+    })
+    question = survey.questions[0]
+    assert isinstance(question, QuestionRead)
+    assert question.options[0].id == "o1"
+    assert question.options[0].order == 0
+    assert question.required is True
+
+
+def test_field_order_follows_response_models():
+    survey_fields = list(asdict(SurveyRead.from_doc({"id": "s1"})))
+    assert survey_fields[:4] == ["id", "title", "description", "owner_id"]
+    assert survey_fields[-2:] == ["user_has_responded", "survey_number"]
+
+
+def test_read_models_have_no_instance_dict():
+    suggestion = SuggestionRead.from_doc({"id": "x", "user_id": "u", "content": "c"})
+    assert suggestion.status == "pending"
+    with pytest.raises(AttributeError):
+        suggestion.__dict__
@@ -0,0 +1,30 @@
+"""
+Unit tests for the orjson-backed response class
+"""
+import json
+
+import pytest
+
+pytest.importorskip("starlette")
+
+from read_models import AnswerRead, SurveyAnswerRead  # noqa: E402
+from serialization import FastJSONResponse, _json_default  # noqa: E402
+
+
+def test_fast_json_response_renders_utf8():
+    body = FastJSONResponse(content={"title": "Saúde", "n": [1, 2]}).body
+    assert json.loads(body) == {"title": "Saúde", "n": [1, 2]}
+    assert "Saúde".encode() in body
+
+
+def test_read_models_serialize_as_objects():
+    answer = SurveyAnswerRead.from_doc({"id": "r1", "survey_id": "s1", "answers": [{"question_id": "q", "value": "3"}]})
+    body = FastJSONResponse(content=[answer]).body
+    assert json.loads(body) == [{
+        "id": "r1", "survey_id": "s1", "user_id": None,
+        "answers": [{"question_id": "q", "value": "3"}], "submitted_at": None
+    }]
+
+
+def test_stdlib_fallback_handles_dataclasses():
+    assert _json_default(AnswerRead("q", "v")) == {"question_id": "q", "value": "v"}
@@ -0,0 +1,144 @@
+"""
+Unit tests for the shared tally engine and the analytics formatters built on it
+"""
+from tally import SurveyTally, ChoiceTally, CheckboxTally, RatingTally, QuestionTally, RatingStats
+import analytics
+
+SURVEY = {
+    "id": "s1",
+    "questions": [
+        {"id": "mc", "type": "multiple_choice", "options": [{"id": "a", "text": "A"}, {"id": "b", "text": "B"}]},
+        {"id": "yn", "type": "yes_no"},
+        {"id": "cb", "type": "checkbox", "options": [{"id": "x", "text": "X"}, {"id": "y", "text": "Y"}]},
+        {"id": "rt", "type": "rating", "min_rating": 1, "max_rating": 5},
+        {"id": "tx", "type": "text"},
+    ],
+}
+
+RESPONSES = [
+    {"answers": [
+        {"question_id": "mc", "value": "a"}, {"question_id": "yn", "value": "Sim"},
+        {"question_id": "cb", "value": "x,y"}, {"question_id": "rt", "value": "5"},
+        {"question_id": "tx", "value": "Bom"},
+    ]},
+    {"answers": [
+        {"question_id": "mc", "value": "a"}, {"question_id": "yn", "value": "Não"},
+        {"question_id": "cb", "value": "y"}, {"question_id": "rt", "value": "2"},
+    ]},
+    {"answers": [
+        {"question_id": "mc", "value": "b"}, {"question_id": "rt", "value": "n/a"},
+        {"question_id": "unknown", "value": "ignored"},
+    ]},
+]
+
+
+class TestSurveyTally:
+    def test_accumulator_types(self):
+        tally = SurveyTally(SURVEY["questions"])
+        assert isinstance(tally.questions["mc"], ChoiceTally)
+        assert isinstance(tally.questions["yn"], ChoiceTally)
+        assert isinstance(tally.questions["cb"], CheckboxTally)
+        assert isinstance(tally.questions["rt"], RatingTally)
+        assert type(tally.questions["tx"]) is QuestionTally
+
+    def test_single_pass_counts(self):
+        tally = SurveyTally.from_responses(SURVEY, RESPONSES)
+        assert tally.total_responses == 3
+        assert tally.questions["mc"].counts == {"a": 2, "b": 1}
+        assert tally.questions["yn"].counts == {"Sim": 1, "Não": 1}
+        assert tally.questions["cb"].counts == {"x": 1, "y": 2}
+        assert tally.questions["rt"].counts == {5: 1, 2: 1}
+        assert tally.questions["rt"].total == 3
+        assert tally.questions["rt"].votes == 2
+        assert tally.questions["rt"].average == 3.5
+        assert tally.questions["tx"].total == 1
+        assert tally.questions["tx"].values is None
+
+    def test_keep_values(self):
+        tally = SurveyTally.from_responses(SURVEY, RESPONSES, keep_values=True)
+        assert tally.questions["rt"].values == ["5", "2", "n/a"]
+        assert tally.questions["tx"].values == ["Bom"]
+
+
+class TestFormatters:
+    def test_survey_analytics(self):
+        result = analytics.survey_analytics(SURVEY, RESPONSES)
+        assert result["total_responses"] == 3
+        assert result["questions"]["mc"]["option_breakdown"] == {
+            "a": {"text": "A", "count": 2}, "b": {"text": "B", "count": 1}
+        }
+        assert result["questions"]["rt"]["distribution"] == {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1}
+        assert result["questions"]["tx"]["responses"] == ["Bom"]
+
+    def test_public_results_percentages(self):
+        result = analytics.public_results(SURVEY, RESPONSES, is_admin=False)
+        assert result["questions"]["mc"]["option_breakdown"]["a"] == {"text": "A", "percentage": 66.7}
+        assert result["questions"]["yn"]["yes_percentage"] == 50.0
+        assert "yes_count" not in result["questions"]["yn"]
+        assert result["questions"]["cb"]["option_breakdown"]["y"]["percentage"] == 100.0
+        assert result["questions"]["rt"]["average"] == 3.5
+        assert result["questions"]["rt"]["distribution"]["5"] == 50.0
+        assert result["questions"]["tx"] == {"type": "text", "total_answers": 1, "response_count": 1}
+
+    def test_public_results_admin_counts(self):
+        result = analytics.public_results(SURVEY, RESPONSES, is_admin=True)
+        assert result["questions"]["yn"]["yes_count"] == 1
+        assert result["questions"]["cb"]["option_breakdown"]["x"] == {"text": "X", "count": 1}
+        assert result["questions"]["rt"]["distribution"]["2"] == 1
+
+    def test_global_results(self):
+        result = analytics.global_results(SURVEY, RESPONSES)
+        assert result["mc"] == {"type": "multiple_choice", "percentages": {"a": 66.7, "b": 33.3}}
+        assert result["rt"] == {"type": "rating", "average": 3.5, "total_votes": 2}
+        assert "tx" not in result
+
+    def test_empty_survey(self):
+        result = analytics.public_results(SURVEY, [], is_admin=False)
+        assert result["total_responses"] == 0
+        assert result["questions"]["rt"]["average"] == 0
+        assert result["questions"]["mc"]["option_breakdown"]["a"]["percentage"] == 0
+
+
+class TestRatingStats:
+    def test_summary(self):
+        stats = RatingStats.from_histogram({1: 1, 2: 1, 3: 1, 4: 1, 5: 1})
+        summary = stats.summary(1, 5)
+        assert summary["count"] == 5
+        assert summary["mean"] == 3
+        assert summary["median"] == 3
+        assert summary["quartiles"] == {"q1": 2, "q2": 3, "q3": 4}
+        assert summary["std_dev"] == round(2 ** 0.5, 3)
+        # 1 promotor (5) e 3 detratores (1, 2, 3) em 5
+        assert summary["nps"] == -40.0
+
+    def test_quantile_interpolates(self):
+        stats = RatingStats.from_histogram({2: 1, 5: 1})
+        assert stats.quantile(0.5) == 3.5
+
+    def test_merge_matches_single_pass(self):
+        day1 = RatingStats.from_histogram({1: 3, 4: 2})
+        day2 = RatingStats.from_histogram({4: 1, 5: 4})
+        combined = RatingStats.from_histogram({1: 3, 4: 3, 5: 4})
+        merged = RatingStats().merge(day1).merge(day2)
+        assert merged.summary(1, 5) == combined.summary(1, 5)
+
+    def test_doc_roundtrip_and_decrement(self):
+        stats = RatingStats.from_histogram({9: 2, 10: 1, 3: 1})
+        restored = RatingStats.from_doc(stats.to_doc())
+        assert restored.summary(0, 10) == stats.summary(0, 10)
+        assert restored.nps(0, 10) == 50.0
+        restored.add(3, -1)
+        assert restored.to_doc()["hist"] == {"9": 2, "10": 1}
+        assert restored.n == 3
+
+    def test_empty(self):
+        summary = RatingStats().summary(1, 5)
+        assert summary["count"] == 0
+        assert summary["median"] is None
+        assert summary["nps"] is None
+
+    def test_rating_tally_exposes_stats(self):
+        tally = SurveyTally.from_responses(SURVEY, RESPONSES)
+        assert tally.questions["rt"].stats.quantile(0.5) == 3.5
+        result = analytics.public_results(SURVEY, RESPONSES, is_admin=False)
+        assert result["questions"]["rt"]["stats"]["median"] == 3.5
@@ -0,0 +1,39 @@
+"""
+Unit tests for Portuguese text normalization and term-frequency extraction
+"""
+from text_analysis import normalize, tokenize, term_counts, STOPWORDS
+
+
+class TestNormalization:
+    def test_strips_accents_and_case(self):
+        assert normalize("Saúde PÚBLICA, Educação e Habitação") == "saude publica, educacao e habitacao"
+
+    def test_stopwords_are_normalized(self):
+        assert "nao" in STOPWORDS
+        assert "não" not in STOPWORDS
+
+    def test_tokenize_drops_single_characters(self):
+        assert tokenize("A rua é 1 caos") == ["rua", "caos"]
+
+
+class TestTermCounts:
+    def test_unigrams_without_stopwords(self):
+        counts = term_counts("Não há transportes nem transportes públicos")
+        assert counts["transportes"] == 2
+        assert counts["publicos"] == 1
+        assert "nao" not in counts and "nem" not in counts
+
+    def test_bigrams_skip_stopwords_and_punctuation(self):
+        counts = term_counts("Saúde pública é importante; a saúde pública precisa de investimento.")
+        assert counts["saude publica"] == 2
+        assert counts["publica precisa"] == 1
+        assert "importante saude" not in counts
+        assert "a saude" not in counts
+
+    def test_unigrams_only(self):
+        counts = term_counts("habitação acessível", max_ngram=1)
+        assert set(counts) == {"habitacao", "acessivel"}
+
+    def test_empty_text(self):
+        assert term_counts("") == {}
+        assert term_counts("   de a o ") == {}
@@ -0,0 +1,51 @@
+"""Tokenização de respostas de texto em português para tabelas de frequência de termos"""
+import re
+import unicodedata
+from collections import Counter
+
+
+def normalize(text: str) -> str:
+    """Minúsculas e sem acentos ("Saúde Pública" -> "saude publica")"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+_STOPWORDS_RAW = """
+a à ao aos aquela aquelas aquele aqueles aquilo as às até com como da das de dela delas dele deles
+depois do dos e é ela elas ele eles em entre era eram essa essas esse esses esta está estão estas
+estava estavam este estes eu foi fomos for foram há isso isto já lhe lhes mais mas me mesmo meu
+meus minha minhas muito muita muitos muitas na nas não nem no nos nós nossa nossas nosso nossos num
+numa o os ou para pela pelas pelo pelos por qual quando que quem se sem ser será seu seus só sua
+suas também te tem têm tenho ter teu teus tu tua tuas um uma umas uns vai vão você vocês vos
+sim ser são estar acho deve devem pode podem porque sobre cada tudo todos todas toda todo assim
+ainda bem bom boa nada coisa coisas
+"""
+
+STOPWORDS = frozenset(normalize(w) for w in _STOPWORDS_RAW.split())
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CLAUSE_RE = re.compile(r"[.,;:!?()\[\]\n\"]+")
+
+
+def tokenize(text: str) -> list:
+    """Palavras normalizadas com pelo menos 2 caracteres (inclui stopwords, para formar n-gramas)"""
+    return [t for t in _TOKEN_RE.findall(normalize(text)) if len(t) > 1]
+
+
+def term_counts(text: str, max_ngram: int = 2) -> Counter:
+    """Frequência de unigramas e n-gramas (até ``max_ngram``) de um texto.
+
+    Os n-gramas só juntam palavras consecutivas que não sejam stopwords, para
+    que "saúde pública" conte como expressão mas "a saúde" não.
+    """
+    counts = Counter()
+    # N-gramas não atravessam pontuação ("importante; a saúde" não gera "importante saude")
+    for clause in _CLAUSE_RE.split(text):
+        tokens = tokenize(clause)
+        counts.update(t for t in tokens if t not in STOPWORDS and not t.isdigit())
+        for n in range(2, max_ngram + 1):
+            for i in range(len(tokens) - n + 1):
+                gram = tokens[i:i + n]
+                if not any(t in STOPWORDS for t in gram):
+                    counts[" ".join(gram)] += 1
+    return counts